@@ -1,192 +1,290 @@
+import sys
 import time
 import uuid
 import structlog
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers, URL
 from opentelemetry import trace
+from app.observability.config import (
+    get_flight_recorder_config,
+    get_geoip_config,
+    get_jwt_config,
+    get_metrics_config,
+    get_metrics_endpoint_config,
+    get_route_config,
+    get_runtime_monitor_config,
+    get_worker_config,
+)
+from app.observability.context import (
+    RequestContext,
+    publish_request_context,
+    reset_request_context,
+    set_request_context,
+    withdraw_request_context,
+)
+from app.observability.metrics_endpoint import app_metrics_path
+from app.observability.request_metrics import RequestMetrics
+from app.observability.routes import route_template
 
+_ZERO_TRACE_ID = "0" * 32
+_ZERO_SPAN_ID = "0" * 16
+_REQUEST_FINISHED_TEMPLATE = "Request finished {Protocol} {Method} {Scheme}://{Host}{Path} - {StatusCode} {ContentLength} {ContentType} {ElapsedMilliseconds}ms"
 
-class ObservabilityMiddleware(BaseHTTPMiddleware):
-    """Enhanced middleware for structured logging with OpenTelemetry integration."""
-    
-    def _extract_user_context(self, request: Request) -> dict:
-        """Extract user context from request (customize based on your auth implementation)."""
+
+class ObservabilityMiddleware:
+    """Pure ASGI middleware for structured logging with OpenTelemetry integration.
+
+    Works on ``scope``/``receive``/``send`` directly instead of going through
+    ``BaseHTTPMiddleware``, so no extra tasks or memory streams are created per
+    request and streaming responses and background tasks pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._log = structlog.get_logger("app.middleware.observability_middleware")
+        # Starlette builds the middleware stack on first request, after
+        # init_observability has installed the meter provider
+        self._metrics = RequestMetrics() if get_metrics_config()["request_metrics_enabled"] else None
+        # Optional features are imported only when enabled
+        self._geoip = None
+        geoip_config = get_geoip_config()
+        if geoip_config["database"]:
+            from app.observability.geoip import create_geoip_lookup
+            # Opened per worker, after fork; the mapped pages are shared via the page cache
+            self._geoip = create_geoip_lookup(geoip_config)
+        self._jwt_claims = None
+        jwt_config = get_jwt_config()
+        if jwt_config["mode"]:
+            from app.observability.jwt_claims import create_jwt_claims_cache
+            self._jwt_claims = create_jwt_claims_cache(jwt_config)
+        self._get_flight_recorder = None
+        if get_flight_recorder_config()["enabled"]:
+            # The recorder itself is looked up per request: with deferred
+            # init, init_logging installs it after this middleware is built
+            from app.observability.flight_recorder import get_flight_recorder
+            self._get_flight_recorder = get_flight_recorder
+        route_config = get_route_config()
+        self._template_paths = route_config["template_paths"]
+        self._route_cache_size = route_config["cache_size"]
+        self._metrics_path = app_metrics_path(get_metrics_endpoint_config())
+
+    def _extract_user_context(self, headers: Headers) -> dict:
+        """Extract user context from request headers (customize based on your auth implementation)."""
         user_context = {}
-        
-        # Example: Extract from JWT token or session
-        # This is a placeholder - implement based on your authentication method
-        auth_header = request.headers.get("authorization", "")
-        if auth_header:
-            # TODO: Decode JWT and extract user information
-            # user_context["id"] = decoded_token.get("sub")
-            # user_context["tenantId"] = decoded_token.get("tenant_id")
-            # user_context["role"] = decoded_token.get("role")
-            pass
-        
+
+        # id/tenantId/role from a Bearer JWT, when JWT_CLAIMS_MODE is set
+        auth_header = headers.get("authorization")
+        if auth_header and self._jwt_claims is not None:
+            claims = self._jwt_claims.user_context(auth_header)
+            if claims:
+                user_context.update(claims)
+
         # Example: Extract from custom headers
-        user_id = request.headers.get("x-user-id")
-        tenant_id = request.headers.get("x-tenant-id")
-        
+        user_id = headers.get("x-user-id")
+        tenant_id = headers.get("x-tenant-id")
+
         if user_id:
             user_context["id"] = user_id
         if tenant_id:
             user_context["tenantId"] = tenant_id
-            
+
         return user_context if user_context else None
-    
+
     def _get_client_country(self, ip: str) -> str:
-        """Get country from IP address (placeholder - requires GeoIP database)."""
-        # TODO: Implement GeoIP lookup if needed
-        # Example using geoip2:
-        # try:
-        #     import geoip2.database
-        #     reader = geoip2.database.Reader('/path/to/GeoLite2-Country.mmdb')
-        #     response = reader.country(ip)
-        #     return response.country.iso_code
-        # except:
-        #     return None
-        return None
-    
-    async def dispatch(self, request: Request, call_next):
+        """Get country ISO code from IP address (None without GEOIP_DATABASE or for private addresses)."""
+        if self._geoip is None:
+            return None
+        return self._geoip.country(ip)
+
+    def _request_started(self, scope) -> RequestContext:
+        """Build the request context once and log "Request started"."""
         start_time = time.time()
-        log = structlog.get_logger("app.middleware.observability_middleware")
-        
+
         # Extract trace context
         span = trace.get_current_span()
         ctx = span.get_span_context() if span else None
-        
-        trace_id = format(ctx.trace_id, "032x") if ctx and ctx.trace_id != 0 else "00000000000000000000000000000000"
-        span_id = format(ctx.span_id, "016x") if ctx and ctx.span_id != 0 else "0000000000000000"
-        
+
+        headers = Headers(scope=scope)
+        url = URL(scope=scope)
+
         # Extract client information
-        client_host = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "")
-        
-        # Generate unique request ID
-        request_id = str(uuid.uuid4())
-        
-        # Extract user context (if authenticated)
-        user_context = self._extract_user_context(request)
-        
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
+
         # Build client object
         client_info = {"ip": client_host}
         country = self._get_client_country(client_host)
         if country:
             client_info["country"] = country
-        
+
+        # Log the route template (/items/{item_id}) rather than the raw path,
+        # which would make every item a separate series downstream
+        route = route_template(scope, self._route_cache_size) if self._template_paths else None
+
         # Build HTTP object
         http_info = {
-            "method": request.method,
-            "path": str(request.url.path),
-            "scheme": request.url.scheme,
-            "host": request.url.hostname,
-            "userAgent": user_agent,
+            "method": scope["method"],
+            "path": route or url.path,
+            "scheme": url.scheme,
+            "host": url.hostname,
+            "userAgent": headers.get("user-agent", ""),
         }
-        
+
         # Add query string if present
-        if request.url.query:
-            http_info["queryString"] = str(request.url.query)
-        
-        # Build base log context
-        log_context = {
-            "traceId": trace_id,
-            "spanId": span_id,
-            "http": http_info,
-            "client": client_info,
-            "requestId": request_id,
-            "Protocol": f"HTTP/{request.scope.get('http_version', '1.1')}",
-        }
-        
-        # Add user context if available
-        if user_context:
-            log_context["user"] = user_context
-        
+        if url.query:
+            http_info["queryString"] = url.query
+
+        request_context = RequestContext(
+            span_context=ctx,
+            request_id=str(uuid.uuid4()),
+            method=http_info["method"],
+            path=url.path,
+            scheme=http_info["scheme"],
+            host=http_info["host"],
+            http_version=scope.get("http_version", "1.1"),
+            http=http_info,
+            client=client_info,
+            user=self._extract_user_context(headers),
+            start_time=start_time,
+            route=route,
+        )
+
         # Log request started
-        log.info("Request started", **log_context)
-        
+        self._log.info(
+            "Request started",
+            traceId=request_context.trace_id or _ZERO_TRACE_ID,
+            spanId=request_context.span_id or _ZERO_SPAN_ID,
+            http=http_info,
+            client=client_info,
+            requestId=request_context.request_id,
+            Protocol=request_context.protocol,
+            **({"user": request_context.user} if request_context.user else {}),
+        )
+        return request_context
+
+    def _request_finished(self, request_context: RequestContext, route: str, status_code: int, content_length: str, content_type: str):
+        """Log "Request finished" and record RED metrics with the response details taken from ``http.response.start``."""
+        duration_ms = (time.time() - request_context.start_time) * 1000
+        if self._metrics is not None:
+            self._metrics.record(request_context.method, route, status_code, duration_ms)
+
+        # Determine log level based on status code
+        if status_code >= 500:
+            log_method = self._log.error
+        elif status_code >= 400:
+            log_method = self._log.warning
+        else:
+            log_method = self._log.info
+
+        # Log request finished
+        log_method(
+            f"Request finished {request_context.http_version} {request_context.method} "
+            f"{request_context.scheme}://{request_context.host}{request_context.path} - "
+            f"{status_code} {content_length} {content_type} {duration_ms:.3f}ms",
+            traceId=request_context.trace_id or _ZERO_TRACE_ID,
+            spanId=request_context.span_id or _ZERO_SPAN_ID,
+            http={**request_context.http, "statusCode": status_code, "duration": duration_ms},
+            client=request_context.client,
+            requestId=request_context.request_id,
+            Protocol=request_context.protocol,
+            StatusCode=status_code,
+            ContentLength=content_length,
+            ContentType=content_type,
+            ElapsedMilliseconds=duration_ms,
+            RequestPath=request_context.route or request_context.path,
+            message_template_text=_REQUEST_FINISHED_TEMPLATE,
+            **({"user": request_context.user} if request_context.user else {}),
+        )
+
+    def _request_failed(self, request_context: RequestContext, route: str, exc: Exception):
+        """Log "Request failed" and record it as a 500 for an exception raised by the downstream app."""
+        duration_ms = (time.time() - request_context.start_time) * 1000
+        if self._metrics is not None:
+            self._metrics.record(request_context.method, route, 500, duration_ms)
+
+        # Log exception
+        self._log.error(
+            f"Request failed: {str(exc)}",
+            traceId=request_context.trace_id or _ZERO_TRACE_ID,
+            spanId=request_context.span_id or _ZERO_SPAN_ID,
+            http={**request_context.http, "duration": duration_ms},
+            client=request_context.client,
+            error={
+                "type": type(exc).__name__,
+                "message": str(exc),
+            },
+            requestId=request_context.request_id,
+            ElapsedMilliseconds=duration_ms,
+            RequestPath=request_context.route or request_context.path,
+            **({"user": request_context.user} if request_context.user else {}),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            if scope["type"] == "lifespan":
+                if get_worker_config()["init_after_fork"]:
+                    # Deferred (post-fork) observability init runs in each worker here
+                    from app.observability.workers import run_deferred_init
+                    run_deferred_init()
+                if get_runtime_monitor_config()["enabled"]:
+                    from app.observability.runtime_monitor import get_runtime_monitor
+                    monitor = get_runtime_monitor()
+                    if monitor is not None:
+                        monitor.watch_loop()
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == self._metrics_path:
+            # Scrapes are not service traffic: no request logs or RED metrics
+            await self.app(scope, receive, send)
+            return
+
+        request_context = self._request_started(scope)
+        token = set_request_context(request_context)
+        # The profiler and the stall watchdog find this request from our frame
+        published = publish_request_context(sys._getframe(), request_context)
+        response_start = None
+        # Debug events of this request are held until we know how it ended
+        recorder = self._get_flight_recorder() if self._get_flight_recorder is not None else None
+        recording = recorder.start() if recorder is not None else None
+
+        async def send_wrapper(message):
+            nonlocal response_start
+            if message["type"] == "http.response.start":
+                response_start = message
+            await send(message)
+
+        # Buffered events are discarded if the request is cancelled
+        flush = False
+        failure = None
         try:
-            response = await call_next(request)
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Get response details
-            status_code = response.status_code
-            content_length = response.headers.get("content-length", "0")
-            content_type = response.headers.get("content-type", "")
-            
-            # Determine log level based on status code
-            if status_code >= 500:
-                log_method = log.error
-            elif status_code >= 400:
-                log_method = log.warning
-            else:
-                log_method = log.info
-            
-            # Update HTTP info with response details
-            http_info_complete = http_info.copy()
-            http_info_complete.update({
-                "statusCode": status_code,
-                "duration": duration_ms,
-            })
-            
-            # Build complete log context
-            complete_context = {
-                "traceId": trace_id,
-                "spanId": span_id,
-                "http": http_info_complete,
-                "client": client_info,
-                "requestId": request_id,
-                "Protocol": f"HTTP/{request.scope.get('http_version', '1.1')}",
-                "StatusCode": status_code,
-                "ContentLength": content_length,
-                "ContentType": content_type,
-                "ElapsedMilliseconds": duration_ms,
-                "RequestPath": str(request.url.path),
-                "message_template_text": "Request finished {Protocol} {Method} {Scheme}://{Host}{Path} - {StatusCode} {ContentLength} {ContentType} {ElapsedMilliseconds}ms",
-            }
-            
-            # Add user context if available
-            if user_context:
-                complete_context["user"] = user_context
-            
-            # Log request finished
-            log_method(
-                f"Request finished {request.scope.get('http_version', 'HTTP/1.1')} {request.method} "
-                f"{request.url.scheme}://{request.url.hostname}{request.url.path} - "
-                f"{status_code} {content_length} {content_type} {duration_ms:.3f}ms",
-                **complete_context
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
+            if recording is not None:
+                status_code = response_start["status"] if response_start is not None else 500
+                duration_ms = (time.time() - request_context.start_time) * 1000
+                flush = recorder.should_flush(status_code, duration_ms)
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Update HTTP info with duration
-            http_info_error = http_info.copy()
-            http_info_error["duration"] = duration_ms
-            
-            # Build error log context
-            error_context = {
-                "traceId": trace_id,
-                "spanId": span_id,
-                "http": http_info_error,
-                "client": client_info,
-                "error": {
-                    "type": type(e).__name__,
-                    "message": str(e),
-                },
-                "requestId": request_id,
-                "ElapsedMilliseconds": duration_ms,
-                "RequestPath": str(request.url.path),
-            }
-            
-            # Add user context if available
-            if user_context:
-                error_context["user"] = user_context
-            
-            # Log exception
-            log.error(
-                f"Request failed: {str(e)}",
-                **error_context
-            )
-            raise
\ No newline at end of file
+            flush = True
+            failure = e
+            raise
+        finally:
+            if recording is not None:
+                recorder.finish(recording, flush)
+            if failure is not None:
+                # After the flush, so the request's buffered events come first
+                self._request_failed(request_context, route_template(scope, self._route_cache_size), failure)
+                failure = None
+            withdraw_request_context(published)
+            reset_request_context(token)
+
+        # Get response details
+        status_code = 500
+        content_length = "0"
+        content_type = ""
+        if response_start is not None:
+            status_code = response_start["status"]
+            for key, value in response_start.get("headers", ()):
+                if key == b"content-length":
+                    content_length = value.decode("latin-1")
+                elif key == b"content-type":
+                    content_type = value.decode("latin-1")
+
+        self._request_finished(request_context, route_template(scope, self._route_cache_size), status_code, content_length, content_type)
@@ -1,9 +1,33 @@
-from .initialization import init_observability
-from .instrumentation import instrument_app
-from .telemetry import TelemetryHelper
+import importlib
+
+# Public name -> submodule. Submodules are imported on first attribute
+# access, so importing e.g. ``app.observability.context`` does not pull in
+# the OpenTelemetry SDK and exporters.
+_EXPORTS = {
+    "init_observability": ".initialization",
+    "instrument_app": ".instrumentation",
+    "TelemetryHelper": ".telemetry",
+    "RequestContext": ".context",
+    "get_request_context": ".context",
+}
 
 __all__ = [
     "init_observability",
     "instrument_app",
     "TelemetryHelper",
-]
\ No newline at end of file
+    "RequestContext",
+    "get_request_context",
+]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
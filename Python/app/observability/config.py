@@ -1,27 +1,49 @@
 import os
 import sys
+import importlib.util
+import tempfile
+import warnings
+from typing import Optional
 
-try:
-    from opentelemetry.sdk._logs import LoggerProvider, LogRecord
-    from opentelemetry._logs import SeverityNumber
-    from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
-    from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
-    _LOGS_AVAILABLE = True
-    print("✓ OpenTelemetry Logs SDK loaded successfully", file=sys.stderr)
-except Exception as e:
-    print(f"✗ Failed to import logs SDK: {e}", file=sys.stderr)
-    _LOGS_AVAILABLE = False
-    BatchLogRecordProcessor = None
-    OTLPLogExporter = None
-    LoggerProvider = None
-    LogRecord = None
-    SeverityNumber = None
-
-try:
-    from opentelemetry.exporter.prometheus import PrometheusMetricReader
-    _PROM_AVAILABLE = True
-except Exception:
-    _PROM_AVAILABLE = False
+# The logs SDK is only imported by code that forwards or exports logs, on
+# first access to one of these names (see ``__getattr__``)
+_LOGS_SDK_NAMES = ("_LOGS_AVAILABLE", "LoggerProvider", "LogRecord", "SeverityNumber", "BatchLogRecordProcessor")
+
+
+def _load_logs_sdk() -> dict:
+    try:
+        from opentelemetry.sdk._logs import LoggerProvider, LogRecord
+        from opentelemetry._logs import SeverityNumber
+        from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+    except Exception as e:
+        print(f"✗ Failed to import logs SDK: {e}", file=sys.stderr)
+        return dict.fromkeys(_LOGS_SDK_NAMES, None) | {"_LOGS_AVAILABLE": False}
+    try:
+        # The forwarder builds SDK LogRecords directly; without this the SDK
+        # re-emits its deprecation warning to stderr on every log line.
+        from opentelemetry.sdk._logs import LogDeprecatedInitWarning
+        warnings.filterwarnings("ignore", category=LogDeprecatedInitWarning)
+    except ImportError:
+        pass
+    startup_print("✓ OpenTelemetry Logs SDK loaded successfully")
+    return {
+        "_LOGS_AVAILABLE": True,
+        "LoggerProvider": LoggerProvider,
+        "LogRecord": LogRecord,
+        "SeverityNumber": SeverityNumber,
+        "BatchLogRecordProcessor": BatchLogRecordProcessor,
+    }
+
+
+def __getattr__(name):
+    if name in _LOGS_SDK_NAMES:
+        globals().update(_load_logs_sdk())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Only checks that the exporter is installed; init_metrics imports it if selected
+_PROM_AVAILABLE = importlib.util.find_spec("opentelemetry.exporter.prometheus") is not None
 
 _otel_logger_provider = None
 
@@ -37,16 +59,57 @@ def set_otel_logger_provider(provider):
     _otel_logger_provider = provider
 
 
+def _env_bool(name: str, default: Optional[bool] = False) -> Optional[bool]:
+    """Read a boolean flag from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment, falling back to ``default`` if unset or invalid."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    """Read a float from the environment, falling back to ``default`` if unset or invalid."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_otlp_endpoint():
+    """Get the OTLP collector base URL; unset, the collector's default port for ``OTEL_EXPORTER_OTLP_PROTOCOL``."""
+    protocol = os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc").strip().lower()
+    default = "http://localhost:4318" if protocol == "http/protobuf" else "http://localhost:4317"
+    return os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", os.getenv("OpenTelemetry__OtlpEndpoint", default))
+
+
 def get_service_config():
     """Get service configuration from environment variables."""
     return {
         "service_name": os.getenv("OTEL_SERVICE_NAME", "SampleServicePython"),
-        "otlp_endpoint": os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", os.getenv("OpenTelemetry__OtlpEndpoint", "http://localhost:4317")),
+        "otlp_endpoint": get_otlp_endpoint(),
         "environment": os.getenv("ENVIRONMENT", "development"),
         "sampling_ratio_env": os.getenv("OPEN_TELEMETRY_SAMPLING_RATIO", os.getenv("OpenTelemetry__SamplingRatio")),
     }
 
 
+def get_sampling_config():
+    """Get head sampler selection from environment variables (``ratio`` or ``adaptive``)."""
+    return {
+        "mode": os.getenv("OPEN_TELEMETRY_SAMPLING_MODE", "ratio").strip().lower(),
+        "target_per_second": _env_float("OPEN_TELEMETRY_SAMPLING_TARGET_PER_SECOND", 10.0),
+        "window_seconds": _env_float("OPEN_TELEMETRY_SAMPLING_WINDOW_SECONDS", 10.0),
+        "adjust_interval_seconds": _env_float("OPEN_TELEMETRY_SAMPLING_ADJUST_INTERVAL_SECONDS", 1.0),
+    }
+
+
 def get_sampling_ratio(environment: str, sampling_ratio_env: str = None) -> float:
     """Calculate sampling ratio based on environment."""
     try:
@@ -57,4 +120,242 @@ def get_sampling_ratio(environment: str, sampling_ratio_env: str = None) -> floa
         else:
             return 0.1
     except Exception:
-        return 1.0
\ No newline at end of file
+        return 1.0
+
+
+def get_logging_config():
+    """Get log pipeline configuration from environment variables."""
+    return {
+        "async_enabled": _env_bool("LOG_ASYNC"),
+        "queue_size": _env_int("LOG_QUEUE_SIZE", 10000),
+        "batch_size": _env_int("LOG_BATCH_SIZE", 256),
+        "overflow_policy": os.getenv("LOG_QUEUE_OVERFLOW", "block").strip().lower(),
+        "flush_interval": _env_float("LOG_FLUSH_INTERVAL", 0.5),
+        "renderer": os.getenv("LOG_RENDERER", "json"),
+        "sort_keys": _env_bool("LOG_SORT_KEYS", None),
+    }
+
+
+def get_log_sampling_config():
+    """Get log sampling and rate limiting configuration from environment variables."""
+    rules = os.getenv("LOG_SAMPLING_RULES", "")
+    return {
+        "enabled": _env_bool("LOG_SAMPLING_ENABLED"),
+        "rules": [r.strip() for r in rules.split(";") if r.strip()],
+        "keep_level": os.getenv("LOG_SAMPLING_KEEP_LEVEL", "warning").strip().lower(),
+        "default_per_second": _env_float("LOG_RATE_LIMIT_PER_SECOND", None),
+        "default_burst": _env_float("LOG_RATE_LIMIT_BURST", None),
+        "suppress_request_started": _env_bool("LOG_SUPPRESS_REQUEST_STARTED"),
+        "summary_interval_seconds": _env_float("LOG_SAMPLING_SUMMARY_SECONDS", 60.0),
+    }
+
+
+def get_flight_recorder_config():
+    """Get per-request flight recorder configuration from environment variables."""
+    return {
+        "enabled": _env_bool("FLIGHT_RECORDER_ENABLED"),
+        "level": os.getenv("FLIGHT_RECORDER_LEVEL", "info").strip().lower(),
+        "max_events": _env_int("FLIGHT_RECORDER_MAX_EVENTS", 200),
+        "max_buffered_events": _env_int("FLIGHT_RECORDER_MAX_BUFFERED_EVENTS", 50000),
+        "slow_request_ms": _env_float("FLIGHT_RECORDER_SLOW_MS", 1000.0),
+    }
+
+
+def get_redaction_config():
+    """Get in-process redaction configuration from environment variables."""
+    extra_keys = os.getenv("REDACTION_KEYS", "")
+    key_patterns = os.getenv("REDACTION_KEY_PATTERNS", "")
+    scanners = os.getenv("REDACTION_VALUE_SCANNERS", "jwt,bearer,email,dsn").strip().lower()
+    return {
+        "enabled": _env_bool("REDACTION_ENABLED"),
+        "keys_file": os.getenv("REDACTION_KEYS_FILE") or None,
+        "extra_keys": [k.strip() for k in extra_keys.split(",") if k.strip()],
+        "key_patterns": [p.strip() for p in key_patterns.split(";") if p.strip()],
+        "value_scanners": [] if scanners == "none" else [s.strip() for s in scanners.split(",") if s.strip()],
+        "placeholder": os.getenv("REDACTION_PLACEHOLDER", "[REDACTED]"),
+    }
+
+
+def get_tail_sampling_config():
+    """Get tail sampling configuration from environment variables."""
+    routes = os.getenv("TAIL_SAMPLING_ROUTES", "")
+    return {
+        "enabled": _env_bool("TAIL_SAMPLING_ENABLED"),
+        "latency_threshold_ms": _env_float("TAIL_SAMPLING_LATENCY_MS", 500.0),
+        "route_allowlist": [r.strip() for r in routes.split(",") if r.strip()],
+        "baseline_ratio": _env_float("TAIL_SAMPLING_BASELINE_RATIO", None),
+        "max_buffered_spans": _env_int("TAIL_SAMPLING_MAX_SPANS", 50000),
+        "decision_wait_seconds": _env_float("TAIL_SAMPLING_DECISION_WAIT_SECONDS", 30.0),
+    }
+
+
+def get_metrics_config():
+    """Get HTTP server and telemetry pipeline metrics configuration from environment variables."""
+    buckets = os.getenv("HTTP_DURATION_BUCKETS_MS", "")
+    try:
+        boundaries = sorted(float(b) for b in buckets.split(",") if b.strip())
+    except ValueError:
+        boundaries = []
+    return {
+        "request_metrics_enabled": _env_bool("HTTP_METRICS_ENABLED", True),
+        "pipeline_metrics_enabled": _env_bool("OTEL_PIPELINE_METRICS_ENABLED", True),
+        "duration_buckets_ms": boundaries or None,
+    }
+
+
+def get_metrics_endpoint_config():
+    """Get Prometheus scrape endpoint configuration from environment variables.
+
+    Off unless ``METRICS_ENDPOINT_ENABLED`` is set, or ``METRICS_MULTIPROCESS_DIR``
+    is, whose merged worker metrics are only readable through the endpoint.
+    """
+    port = _env_int("METRICS_PORT", 0)
+    return {
+        "enabled": _env_bool("METRICS_ENDPOINT_ENABLED", bool(os.getenv("METRICS_MULTIPROCESS_DIR"))),
+        "path": os.getenv("METRICS_PATH", "/metrics"),
+        "port": port if port > 0 else None,
+        "host": os.getenv("METRICS_HOST", "0.0.0.0"),
+        "cache_ttl_seconds": _env_float("METRICS_CACHE_TTL_SECONDS", 5.0),
+    }
+
+
+def get_span_metrics_config():
+    """Get span-to-metrics configuration from environment variables.
+
+    Enabling it wraps the sampler in ``RecordUnsampledSampler``: spans the
+    sampler drops are still created and recorded (not exported), so every
+    request pays for its spans at any sampling ratio. ``bench_overhead``'s
+    ``span-metrics`` profile measures that cost against tracing alone.
+    """
+    return {
+        "enabled": _env_bool("SPAN_METRICS_ENABLED"),
+        "max_series": _env_int("SPAN_METRICS_MAX_SERIES", 2048),
+        "flush_spans": _env_int("SPAN_METRICS_FLUSH_SPANS", 10000),
+    }
+
+
+def get_profiler_config():
+    """Get sampling profiler configuration from environment variables."""
+    outputs = os.getenv("PROFILER_OUTPUT", "collapsed").strip().lower()
+    return {
+        "enabled": _env_bool("PROFILER_ENABLED"),
+        "hz": _env_float("PROFILER_HZ", 49.0),
+        "export_interval_seconds": _env_float("PROFILER_EXPORT_INTERVAL_SECONDS", 60.0),
+        "outputs": [o.strip() for o in outputs.split(",") if o.strip()],
+        "output_dir": os.getenv("PROFILER_OUTPUT_DIR", "profiles"),
+        "max_files": _env_int("PROFILER_MAX_FILES", 60),
+        "max_depth": _env_int("PROFILER_MAX_DEPTH", 64),
+        "max_overhead": _env_float("PROFILER_MAX_OVERHEAD", 0.01),
+        "all_threads": _env_bool("PROFILER_ALL_THREADS"),
+    }
+
+
+def get_runtime_monitor_config():
+    """Get event loop, threadpool and GC monitor configuration from environment variables."""
+    return {
+        "enabled": _env_bool("RUNTIME_MONITOR_ENABLED", True),
+        "interval_ms": _env_float("RUNTIME_MONITOR_INTERVAL_MS", 100.0),
+        "stall_ms": _env_float("RUNTIME_LOOP_STALL_MS", None),
+    }
+
+
+def get_geoip_config():
+    """Get client GeoIP lookup configuration from environment variables."""
+    return {
+        "database": os.getenv("GEOIP_DATABASE") or None,
+        "cache_size": _env_int("GEOIP_CACHE_SIZE", 10000),
+    }
+
+
+def get_jwt_config():
+    """Get JWT user context configuration from environment variables."""
+    mode = os.getenv("JWT_CLAIMS_MODE", "off").strip().lower()
+    algorithms = os.getenv("JWT_ALGORITHMS", "RS256")
+    return {
+        "mode": None if mode in ("", "off", "false", "none") else mode,
+        "jwks_file": os.getenv("JWT_JWKS_FILE") or None,
+        "algorithms": [a.strip() for a in algorithms.split(",") if a.strip()],
+        "audience": os.getenv("JWT_AUDIENCE") or None,
+        "issuer": os.getenv("JWT_ISSUER") or None,
+        "tenant_claim": os.getenv("JWT_TENANT_CLAIM", "tenant_id"),
+        "role_claim": os.getenv("JWT_ROLE_CLAIM", "role"),
+        "cache_size": _env_int("JWT_CACHE_SIZE", 10000),
+        "ttl_seconds": _env_float("JWT_CACHE_TTL_SECONDS", 300.0),
+    }
+
+
+def get_route_config():
+    """Get route template resolution configuration from environment variables."""
+    return {
+        "template_paths": _env_bool("HTTP_PATH_ROUTE_TEMPLATE", True),
+        "cache_size": _env_int("ROUTE_TEMPLATE_CACHE_SIZE", 1024),
+    }
+
+
+def get_spill_config():
+    """Get OTLP disk spill configuration from environment variables."""
+    return {
+        "enabled": _env_bool("OTLP_SPILL_ENABLED"),
+        "directory": os.getenv("OTLP_SPILL_DIR", os.path.join(tempfile.gettempdir(), "otlp-spill")),
+        "max_bytes": _env_int("OTLP_SPILL_MAX_MB", 256) * 1024 * 1024,
+        "segment_bytes": _env_int("OTLP_SPILL_SEGMENT_MB", 8) * 1024 * 1024,
+        "replay_per_second": _env_float("OTLP_SPILL_REPLAY_PER_SECOND", 20.0),
+        "retry_interval_seconds": _env_float("OTLP_SPILL_RETRY_SECONDS", 5.0),
+    }
+
+
+def _batch_config(prefix: str, schedule_delay_millis: float) -> dict:
+    """Batch processor settings from the standard ``OTEL_BSP_*`` / ``OTEL_BLRP_*`` variables."""
+    return {
+        "max_queue_size": _env_int(f"{prefix}_MAX_QUEUE_SIZE", 2048),
+        "max_export_batch_size": _env_int(f"{prefix}_MAX_EXPORT_BATCH_SIZE", 512),
+        "schedule_delay_millis": _env_float(f"{prefix}_SCHEDULE_DELAY", schedule_delay_millis),
+        "export_timeout_millis": _env_float(f"{prefix}_EXPORT_TIMEOUT", 30000.0),
+    }
+
+
+def get_exporter_config():
+    """Get OTLP exporter transport and batch processor configuration from environment variables."""
+    return {
+        "protocol": os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc").strip().lower(),
+        "compression": os.getenv("OTEL_EXPORTER_OTLP_COMPRESSION", "none").strip().lower(),
+        "headers": os.getenv("OTEL_EXPORTER_OTLP_HEADERS", ""),
+        "timeout_seconds": _env_float("OTEL_EXPORTER_OTLP_TIMEOUT", 10.0),
+        "share_connection": _env_bool("OTEL_EXPORTER_OTLP_SHARE_CONNECTION", True),
+        "endpoints": {
+            signal: os.getenv(f"OTEL_EXPORTER_OTLP_{signal.upper()}_ENDPOINT") or None
+            for signal in ("traces", "logs", "metrics")
+        },
+        "span_batch": _batch_config("OTEL_BSP", 5000.0),
+        "log_batch": _batch_config("OTEL_BLRP", 1000.0),
+        "metric_export_interval_millis": _env_float("OTEL_METRIC_EXPORT_INTERVAL", 60000.0),
+        "metric_export_timeout_millis": _env_float("OTEL_METRIC_EXPORT_TIMEOUT", 30000.0),
+    }
+
+
+def get_worker_config():
+    """Get multi-worker deployment configuration from environment variables."""
+    return {
+        "workers": _env_int("WEB_CONCURRENCY", 1),
+        "init_after_fork": _env_bool("OBSERVABILITY_INIT_AFTER_FORK"),
+        "metrics_dir": os.getenv("METRICS_MULTIPROCESS_DIR") or None,
+        "snapshot_interval_millis": _env_float("METRICS_MULTIPROCESS_INTERVAL", 5000.0),
+    }
+
+
+def get_startup_config():
+    """Get startup behaviour (diagnostics, boot-time test span, instrumentations) from environment variables."""
+    fast = _env_bool("OBSERVABILITY_FAST_STARTUP")
+    disabled = os.getenv("OTEL_PYTHON_DISABLED_INSTRUMENTATIONS", "")
+    return {
+        "diagnostics": _env_bool("OBSERVABILITY_STARTUP_DIAGNOSTICS", not fast),
+        "test_span": _env_bool("OBSERVABILITY_STARTUP_TEST_SPAN", not fast),
+        "disabled_instrumentations": {name.strip().lower() for name in disabled.split(",") if name.strip()},
+    }
+
+
+def startup_print(message: str):
+    """Print a startup diagnostic line to stderr unless diagnostics are turned off."""
+    if get_startup_config()["diagnostics"]:
+        print(message, file=sys.stderr)
+
@@ -0,0 +1,95 @@
+from contextvars import Context, ContextVar
+from typing import Optional
+
+
+class RequestContext:
+    """Per-request values computed once by ObservabilityMiddleware.
+
+    Held in a ``ContextVar`` so structlog processors and route handlers can
+    read the already-formatted trace/span IDs and request metadata instead of
+    recomputing them on every log call.
+    """
+
+    __slots__ = (
+        "span_context",
+        "trace_id",
+        "span_id",
+        "request_id",
+        "method",
+        "path",
+        "route",
+        "scheme",
+        "host",
+        "http_version",
+        "protocol",
+        "http",
+        "client",
+        "user",
+        "start_time",
+    )
+
+    def __init__(self, span_context, request_id: str, method: str, path: str, scheme: str, host: str,
+                 http_version: str, http: dict, client: dict, user: Optional[dict], start_time: float,
+                 route: Optional[str] = None):
+        self.span_context = span_context
+        if span_context is not None and span_context.trace_id != 0:
+            self.trace_id = format(span_context.trace_id, "032x")
+            self.span_id = format(span_context.span_id, "016x") if span_context.span_id != 0 else None
+        else:
+            self.trace_id = None
+            self.span_id = None
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route = route
+        self.scheme = scheme
+        self.host = host
+        self.http_version = http_version
+        self.protocol = f"HTTP/{http_version}"
+        self.http = http
+        self.client = client
+        self.user = user
+        self.start_time = start_time
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("observability_request_context", default=None)
+# Requests being served, by the id of the middleware frame serving them, so
+# samplers looking at other threads' stacks need not read those frames' locals
+_published = {}
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Get the context of the request being handled, or None outside a request."""
+    return _request_context.get()
+
+
+def set_request_context(request_context: Optional[RequestContext]):
+    """Set the current request context; returns a token for ``reset_request_context``."""
+    return _request_context.set(request_context)
+
+
+def reset_request_context(token):
+    """Restore the request context that was current before ``set_request_context``."""
+    _request_context.reset(token)
+
+
+def get_request_context_in(context: Context) -> Optional[RequestContext]:
+    """The request context held by ``context`` (e.g. the one a worker thread is running in), or None."""
+    return context.get(_request_context)
+
+
+def publish_request_context(frame, request_context: RequestContext) -> int:
+    """Publish ``request_context`` for readers of ``frame``'s stack; returns the key for ``withdraw_request_context``."""
+    key = id(frame)
+    _published[key] = request_context
+    return key
+
+
+def withdraw_request_context(key: int):
+    """Withdraw a request context published by ``publish_request_context``."""
+    _published.pop(key, None)
+
+
+def get_published_request_context(frame) -> Optional[RequestContext]:
+    """The request context published for ``frame`` (a live frame on some thread's stack), or None."""
+    return _published.get(id(frame))
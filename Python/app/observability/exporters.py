@@ -0,0 +1,178 @@
+import sys
+import importlib
+import threading
+from typing import Optional
+from .config import get_exporter_config, get_metrics_config, get_spill_config
+from .spill import GrpcReplaySender, HttpReplaySender, with_spill
+
+PROTOCOL_GRPC = "grpc"
+PROTOCOL_HTTP = "http/protobuf"
+
+# (module, class) per protocol and signal, imported only when selected
+_EXPORTER_CLASSES = {
+    PROTOCOL_GRPC: {
+        "traces": ("opentelemetry.exporter.otlp.proto.grpc.trace_exporter", "OTLPSpanExporter"),
+        "logs": ("opentelemetry.exporter.otlp.proto.grpc._log_exporter", "OTLPLogExporter"),
+        "metrics": ("opentelemetry.exporter.otlp.proto.grpc.metric_exporter", "OTLPMetricExporter"),
+    },
+    PROTOCOL_HTTP: {
+        "traces": ("opentelemetry.exporter.otlp.proto.http.trace_exporter", "OTLPSpanExporter"),
+        "logs": ("opentelemetry.exporter.otlp.proto.http._log_exporter", "OTLPLogExporter"),
+        "metrics": ("opentelemetry.exporter.otlp.proto.http.metric_exporter", "OTLPMetricExporter"),
+    },
+}
+
+# Private fields of the gRPC exporters swapped to share a channel
+# (opentelemetry-exporter-otlp-proto-grpc 1.38)
+_GRPC_EXPORTER_INTERNALS = ("_channel", "_client", "_stub")
+
+_lock = threading.Lock()
+_grpc_channels = {}
+_http_session = None
+
+
+class _SharedChannel:
+    """gRPC channel shared by several exporters; closed when the last user closes it."""
+
+    def __init__(self, channel):
+        self._channel = channel
+        self._refs = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def close(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        self._channel.close()
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+
+def _exporter_class(protocol: str, signal: str):
+    module, name = _EXPORTER_CLASSES[protocol][signal]
+    return getattr(importlib.import_module(module), name)
+
+
+def _parse_headers(headers: str) -> dict:
+    return {
+        key.strip().lower(): value.strip()
+        for key, _, value in (h.partition("=") for h in headers.split(","))
+        if key.strip()
+    }
+
+
+def _create_grpc_exporter(signal: str, endpoint: str, config: dict):
+    import grpc
+
+    compression = grpc.Compression.Gzip if config["compression"] == "gzip" else grpc.Compression.NoCompression
+    exporter = _exporter_class(PROTOCOL_GRPC, signal)(
+        endpoint=endpoint,
+        headers=config["headers"] or None,
+        timeout=config["timeout_seconds"],
+        compression=compression,
+    )
+    channel = None
+    if config["share_connection"] and not all(hasattr(exporter, name) for name in _GRPC_EXPORTER_INTERNALS):
+        print(
+            f"Warning: this OTLP gRPC exporter cannot share its channel; {signal} uses a connection of its own",
+            file=sys.stderr,
+        )
+    elif config["share_connection"]:
+        # The exporters take no channel argument, so the first exporter's
+        # channel is adopted by the others for the same endpoint
+        key = (endpoint, compression)
+        with _lock:
+            channel = _grpc_channels.get(key)
+            adopted = channel is None
+            if adopted:
+                channel = _SharedChannel(exporter._channel)
+            try:
+                client = exporter._stub(channel)
+            except Exception as e:
+                # The private fields exist but no longer mean what they did
+                print(f"Warning: could not share the OTLP gRPC channel ({e}); {signal} uses a connection of its own", file=sys.stderr)
+                return exporter, None
+            if adopted:
+                _grpc_channels[key] = channel
+            else:
+                exporter._channel.close()
+            exporter._channel = channel.acquire()
+            exporter._client = client
+    return exporter, channel
+
+
+def _create_http_exporter(signal: str, endpoint: str, explicit_endpoint: bool, config: dict):
+    global _http_session
+    from opentelemetry.exporter.otlp.proto.http import Compression
+
+    if not explicit_endpoint:
+        # Per-signal endpoints are full URLs; the shared one is a base URL
+        endpoint = f"{endpoint.rstrip('/')}/v1/{signal}"
+    session = None
+    if config["share_connection"]:
+        import requests
+
+        with _lock:
+            if _http_session is None:
+                _http_session = requests.Session()
+            session = _http_session
+    exporter = _exporter_class(PROTOCOL_HTTP, signal)(
+        endpoint=endpoint,
+        headers=_parse_headers(config["headers"]) or None,
+        timeout=config["timeout_seconds"],
+        compression=Compression.Gzip if config["compression"] == "gzip" else Compression.NoCompression,
+        session=session,
+    )
+    return exporter, endpoint, session
+
+
+def create_exporter(signal: str, otlp_endpoint: str, exporter_config: Optional[dict] = None):
+    """Build the OTLP exporter for ``signal`` (``traces``, ``logs`` or ``metrics``).
+
+    Protocol, compression, headers, timeout and per-signal endpoints come
+    from ``exporter_config`` (see ``get_exporter_config``). Exporters for the
+    same endpoint share one gRPC channel, or one HTTP session, unless
+    ``OTEL_EXPORTER_OTLP_SHARE_CONNECTION=false``. The result is wrapped in
+    the disk spill buffer when that is enabled. Unless
+    ``OTEL_PIPELINE_METRICS_ENABLED=false``, each export call is measured
+    (see ``InstrumentedExporter``); with spilling, that is the export to the
+    collector, before a failed batch is written to disk.
+    """
+    config = exporter_config or get_exporter_config()
+    protocol = config["protocol"]
+    if protocol not in _EXPORTER_CLASSES:
+        print(f"Warning: unsupported OTLP protocol '{protocol}', using '{PROTOCOL_GRPC}'", file=sys.stderr)
+        protocol = PROTOCOL_GRPC
+
+    explicit_endpoint = config["endpoints"].get(signal)
+    endpoint = explicit_endpoint or otlp_endpoint
+    if protocol == PROTOCOL_HTTP:
+        exporter, endpoint, session = _create_http_exporter(signal, endpoint, bool(explicit_endpoint), config)
+    else:
+        exporter, channel = _create_grpc_exporter(signal, endpoint, config)
+    if get_metrics_config()["pipeline_metrics_enabled"]:
+        from .pipeline_metrics import InstrumentedExporter
+
+        exporter = InstrumentedExporter(exporter, signal)
+
+    spill_config = get_spill_config()
+    if not spill_config["enabled"]:
+        return exporter
+    if protocol == PROTOCOL_HTTP:
+        sender = HttpReplaySender(endpoint, _parse_headers(config["headers"]), config["timeout_seconds"], session=session)
+    else:
+        sender = GrpcReplaySender(
+            endpoint,
+            signal,
+            headers=config["headers"],
+            timeout_seconds=config["timeout_seconds"],
+            channel=channel.acquire() if channel is not None else None,
+        )
+    return with_spill(exporter, signal, endpoint, spill_config, sender=sender)
@@ -0,0 +1,248 @@
+import sys
+import time
+import threading
+import structlog
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from opentelemetry import context, metrics
+
+_LEVELS = {
+    "debug": 10,
+    "info": 20,
+    "warn": 30,
+    "warning": 30,
+    "error": 40,
+    "exception": 40,
+    "critical": 50,
+}
+# Level of the loggers without the recorder: anything below is dropped outside a request
+_NORMAL_LEVEL = _LEVELS["info"]
+_RECORDED_AT_KEY = "_flight_recorder_recorded_at"
+
+_recording: ContextVar[Optional["_Recording"]] = ContextVar("observability_flight_recording", default=None)
+
+
+class _Recording:
+    """Events buffered for one request; created by ``FlightRecorder.start``."""
+
+    __slots__ = ("events", "capacity", "token", "replaying", "closed", "overflowed")
+
+    def __init__(self):
+        self.events = None
+        # Reserved on the first buffered event, so requests that log nothing
+        # below the level never touch the recorder's lock
+        self.capacity = None
+        self.token = None
+        self.replaying = False
+        self.closed = False
+        self.overflowed = 0
+
+
+class FlightRecorder:
+    """structlog processor that holds a request's low-level events until the request ends.
+
+    Events below ``level`` logged while a request is being handled are
+    appended, unrendered, to that request's ring buffer of at most
+    ``max_events`` (oldest overwritten) and dropped from the chain. When
+    the request ends, ``ObservabilityMiddleware`` calls ``finish``: for a
+    5xx, an exception or a request slower than ``slow_request_ms`` the
+    buffer is replayed through the rest of the chain, with its original
+    timestamps and spans, before "Request finished"; otherwise it is
+    discarded without being rendered.
+
+    A request reserves its buffer when it buffers its first event, so later
+    events take no lock: at most ``max_buffered_events`` slots are reserved
+    across in-flight requests, and a request that finds them taken gets a
+    smaller buffer or none. Outside a request, events below INFO are
+    dropped as before.
+
+    Must be the first processor; ``set_replay_processors`` gives it the
+    processors that follow it. ``wrap_class`` adds a faster path for the
+    bound logger's ``debug``/``info``/... methods; the processor still
+    catches events logged any other way.
+    """
+
+    def __init__(
+        self,
+        level: str = "info",
+        max_events: int = 200,
+        max_buffered_events: int = 50000,
+        slow_request_ms: float = 1000.0,
+    ):
+        self._level = _LEVELS.get(level.lower(), _LEVELS["info"])
+        self._max_events = max(max_events, 1)
+        self._max_buffered_events = max(max_buffered_events, 0)
+        self._slow_request_ms = slow_request_ms
+        self._replay_processors = []
+        self._reserved = 0
+        self._lock = threading.Lock()
+        self.flushed = 0
+        self.discarded = 0
+        self.dropped = 0
+
+        meter = metrics.get_meter("app.observability.flight_recorder")
+        meter.create_observable_counter(
+            "log.flight_recorder.events",
+            callbacks=[self._observe_events],
+            unit="{event}",
+            description="Buffered events by outcome (flushed, discarded, dropped over a memory cap)",
+        )
+        meter.create_observable_gauge(
+            "log.flight_recorder.reserved",
+            callbacks=[lambda options: [metrics.Observation(self._reserved)]],
+            unit="{event}",
+            description="Buffer slots reserved by in-flight requests",
+        )
+
+    def set_replay_processors(self, processors: list, timestamper=None):
+        """Processors a flushed event runs through; ``timestamper`` is replaced by one stamping the recorded time."""
+        self._replay_processors = [self._stamp if p is timestamper else p for p in processors]
+
+    def _observe_events(self, options):
+        return [
+            metrics.Observation(self.flushed, {"outcome": "flushed"}),
+            metrics.Observation(self.discarded, {"outcome": "discarded"}),
+            metrics.Observation(self.dropped, {"outcome": "dropped"}),
+        ]
+
+    def __call__(self, logger, method_name, event_dict):
+        level = _LEVELS.get(method_name, _NORMAL_LEVEL)
+        if level >= self._level:
+            return event_dict
+        recording = _recording.get()
+        if recording is None:
+            if level < _NORMAL_LEVEL:
+                raise structlog.DropEvent
+            return event_dict
+        if recording.replaying:
+            return event_dict
+        self._buffer(recording, logger, method_name, event_dict, None)
+        raise structlog.DropEvent
+
+    def _buffer(self, recording: _Recording, logger, method_name: str, event_dict: dict, kw: Optional[dict]):
+        events = recording.events
+        if events is None:
+            with self._lock:
+                if recording.capacity is None:
+                    recording.capacity = max(0, min(self._max_events, self._max_buffered_events - self._reserved))
+                    self._reserved += recording.capacity
+                    if recording.capacity:
+                        recording.events = deque(maxlen=recording.capacity)
+            events = recording.events
+            if events is None:
+                recording.overflowed += 1
+                return
+        if len(events) == recording.capacity:
+            recording.overflowed += 1
+        events.append((logger, method_name, event_dict, kw, time.time(), context.get_current()))
+
+    def wrap_class(self, wrapper_class: type) -> type:
+        """Subclass of the structlog ``wrapper_class`` whose methods below ``level`` buffer the event directly.
+
+        Building the event dict and running it through the chain up to this
+        processor's ``DropEvent`` costs several microseconds per event; the
+        subclass keeps the bound context and the call's keyword arguments
+        and merges them only if the buffer is flushed.
+        """
+        methods = {}
+        for name in ("debug", "info", "warning", "warn", "error"):
+            base = getattr(wrapper_class, name, None)
+            if base is not None and _LEVELS[name] < self._level:
+                methods[name] = self._recording_method(name, base)
+        return type(f"Recording{wrapper_class.__name__}", (wrapper_class,), methods)
+
+    def _recording_method(self, method_name: str, base):
+        buffer = self._buffer
+        below_normal = _LEVELS[method_name] < _NORMAL_LEVEL
+
+        def method(bound, event=None, *args, **kw):
+            recording = _recording.get()
+            if recording is None or recording.replaying:
+                return None if below_normal else base(bound, event, *args, **kw)
+            # Bound contexts are never mutated (bind() copies), so no copy here
+            kw["event"] = event % args if args else event
+            buffer(recording, bound._logger, method_name, bound._context, kw)
+
+        method.__name__ = method_name
+        return method
+
+    def start(self) -> _Recording:
+        """Begin buffering for the current request."""
+        recording = _Recording()
+        recording.token = _recording.set(recording)
+        return recording
+
+    def should_flush(self, status_code: int, duration_ms: float) -> bool:
+        """Whether a request that ended this way gets its buffer written."""
+        return status_code >= 500 or duration_ms >= self._slow_request_ms
+
+    def finish(self, recording: _Recording, flush: bool):
+        """Write (``flush``) or discard the buffer of ``recording`` and stop buffering; later calls are no-ops."""
+        if recording.closed:
+            return
+        recording.closed = True
+        events = recording.events or ()
+        if recording.capacity:
+            with self._lock:
+                self._reserved -= recording.capacity
+        try:
+            # Overwritten or unbuffered events are lost either way
+            self.dropped += recording.overflowed
+            if not flush:
+                self.discarded += len(events)
+                return
+            recording.replaying = True
+            for entry in events:
+                self._replay(*entry)
+            self.flushed += len(events)
+            if recording.overflowed:
+                structlog.get_logger(__name__).warning(
+                    "Flight recorder buffer overflowed",
+                    lost=recording.overflowed,
+                    capacity=recording.capacity,
+                )
+        finally:
+            if recording.events is not None:
+                recording.events.clear()
+            _recording.reset(recording.token)
+
+    def _replay(self, logger, method_name, event_dict, kw, recorded_at, otel_context):
+        event_dict = {**event_dict, **kw} if kw is not None else event_dict
+        event_dict[_RECORDED_AT_KEY] = recorded_at
+        token = context.attach(otel_context)
+        try:
+            for processor in self._replay_processors:
+                event_dict = processor(logger, method_name, event_dict)
+        except structlog.DropEvent:
+            return
+        except Exception as e:
+            print(f"Error replaying flight recorder event: {e}", file=sys.stderr)
+            return
+        finally:
+            context.detach(token)
+        # The logger's own level would drop what was below it; the level is in the rendered event
+        if isinstance(event_dict, (str, bytes)):
+            logger.info(event_dict)
+        elif isinstance(event_dict, tuple):
+            logger.info(*event_dict[0], **event_dict[1])
+
+    @staticmethod
+    def _stamp(logger, method_name, event_dict):
+        recorded_at = datetime.fromtimestamp(event_dict.pop(_RECORDED_AT_KEY), tz=timezone.utc)
+        event_dict["timestamp"] = recorded_at.isoformat().replace("+00:00", "Z")
+        return event_dict
+
+
+_flight_recorder: Optional[FlightRecorder] = None
+
+
+def get_flight_recorder() -> Optional[FlightRecorder]:
+    """The recorder installed by ``init_logging``, or None when it is off."""
+    return _flight_recorder
+
+
+def set_flight_recorder(recorder: Optional[FlightRecorder]):
+    global _flight_recorder
+    _flight_recorder = recorder
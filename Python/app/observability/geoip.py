@@ -0,0 +1,90 @@
+import sys
+import functools
+import ipaddress
+from typing import Optional
+from opentelemetry import metrics
+
+
+class GeoIpLookup:
+    """Client IP -> ISO country code from a MaxMind-format country database (``.mmdb``).
+
+    The database is opened once and memory-mapped, so worker processes that
+    open the same file share its pages through the OS page cache instead of
+    each holding a copy. An LRU cache of ``cache_size`` IPs sits in front of
+    it; addresses that are not globally routable (private, loopback,
+    link-local, reserved) are never looked up.
+    """
+
+    def __init__(self, database_path: str, cache_size: int = 10000, meter=None):
+        import maxminddb
+
+        self._reader = maxminddb.open_database(database_path, maxminddb.MODE_AUTO)
+        self._lookup_errors = (ValueError, maxminddb.InvalidDatabaseError)
+        self.country = functools.lru_cache(maxsize=cache_size)(self._country)
+
+        meter = meter or metrics.get_meter("app.observability.geoip")
+        meter.create_observable_counter(
+            "geoip.cache.lookups",
+            callbacks=[self._observe_lookups],
+            unit="{lookup}",
+            description="GeoIP country lookups by cache result (hit, miss)",
+        )
+        meter.create_observable_gauge(
+            "geoip.cache.size",
+            callbacks=[lambda options: [metrics.Observation(self.country.cache_info().currsize)]],
+            unit="{entry}",
+            description="IPs held in the GeoIP lookup cache",
+        )
+
+    def _observe_lookups(self, options):
+        info = self.country.cache_info()
+        return [
+            metrics.Observation(info.hits, {"result": "hit"}),
+            metrics.Observation(info.misses, {"result": "miss"}),
+        ]
+
+    def _country(self, ip: str) -> Optional[str]:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if not address.is_global:
+            return None
+        try:
+            record = self._reader.get(address)
+        except self._lookup_errors:
+            # e.g. an IPv6 client against an IPv4-only database
+            return None
+        if not record:
+            return None
+        country = record.get("country") or record.get("registered_country")
+        return country.get("iso_code") if country else None
+
+    @property
+    def stats(self) -> dict:
+        """Cache hits, misses, current size and hit rate since start."""
+        info = self.country.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.country.cache_clear()
+        self._reader.close()
+
+
+def create_geoip_lookup(geoip_config: dict) -> Optional[GeoIpLookup]:
+    """Open the database named by ``get_geoip_config()``, or None if none is configured or it cannot be opened."""
+    if not geoip_config["database"]:
+        return None
+    try:
+        return GeoIpLookup(geoip_config["database"], cache_size=geoip_config["cache_size"])
+    except ImportError:
+        print("Warning: GEOIP_DATABASE is set but maxminddb is not installed; client country disabled", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not open GeoIP database {geoip_config['database']}: {e}", file=sys.stderr)
+    return None
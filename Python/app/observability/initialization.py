@@ -1,38 +1,82 @@
 import sys
+import atexit
 from typing import Optional
 from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
 from opentelemetry.propagate import set_global_textmap
-from .config import get_service_config, get_sampling_ratio
-from .tracing import init_tracing
-from .logs import init_logs
-from .logging import init_logging
-from .metrics import init_metrics
-from .instrumentation import instrument_app
+from .config import get_service_config, get_sampling_config, get_sampling_ratio, get_worker_config, get_profiler_config, get_runtime_monitor_config, get_metrics_endpoint_config, startup_print
 
 
 def init_observability(service_name: Optional[str] = None):
-    """Initialize all observability components in correct order."""
+    """Initialize all observability components in correct order.
+
+    With ``OBSERVABILITY_INIT_AFTER_FORK=true`` (pre-fork servers such as
+    ``gunicorn --preload``) nothing is started here; each worker initializes
+    its own providers and exporters at ASGI lifespan startup, after it has
+    been forked (``ObservabilityMiddleware`` triggers it).
+    """
+    if get_worker_config()["init_after_fork"]:
+        from .workers import defer_until_startup
+        defer_until_startup(lambda: _start_observability(service_name))
+        startup_print("Observability init deferred until worker startup")
+        return
+    _start_observability(service_name)
+
+
+def _start_observability(service_name: Optional[str] = None):
+    # Imported here so that a deferred init loads the SDK and exporters only
+    # in the workers, after the fork
+    from .tracing import init_tracing
+    from .logs import init_logs
+    from .logging import init_logging
+    from .metrics import init_metrics
+
     config = get_service_config()
     
     service_name = service_name or config["service_name"]
     otlp = config["otlp_endpoint"]
     environment = config["environment"]
     sampling_ratio = get_sampling_ratio(environment, config["sampling_ratio_env"])
+    sampling_config = get_sampling_config()
     
-    print(f"Environment: {environment}", file=sys.stderr)
-    print(f"Sampling ratio: {sampling_ratio}", file=sys.stderr)
+    startup_print(f"Environment: {environment}")
+    startup_print(f"Sampling ratio: {sampling_ratio}")
+    if sampling_config["mode"] == "adaptive":
+        startup_print(f"Adaptive sampling: target={sampling_config['target_per_second']} traces/s")
 
     try:
         set_global_textmap(TraceContextTextMapPropagator())
-        print("✓ W3C trace context propagation set", file=sys.stderr)
+        startup_print("✓ W3C trace context propagation set")
     except Exception as e:
         print(f"Warning: Could not set trace propagation: {e}", file=sys.stderr)
 
-    init_tracing(service_name=service_name, otlp_endpoint=otlp, sampling_ratio=sampling_ratio)
+    init_tracing(service_name=service_name, otlp_endpoint=otlp, sampling_ratio=sampling_ratio, sampling_config=sampling_config)
     init_logs(service_name=service_name, otlp_endpoint=otlp)
     log = init_logging(service_name=service_name, environment=environment)
     init_metrics(service_name=service_name, otlp_endpoint=otlp)
 
+    endpoint_config = get_metrics_endpoint_config()
+    if endpoint_config["enabled"] and endpoint_config["port"] is not None:
+        _start_metrics_server(endpoint_config)
+
+    runtime_config = get_runtime_monitor_config()
+    if runtime_config["enabled"]:
+        try:
+            from .runtime_monitor import RuntimeMonitor, set_runtime_monitor
+            set_runtime_monitor(RuntimeMonitor(interval_ms=runtime_config["interval_ms"], stall_ms=runtime_config["stall_ms"]))
+            startup_print("✓ Runtime monitor started (event loop lag, threadpool, GC)")
+        except Exception as e:
+            print(f"Warning: Could not start runtime monitor: {e}", file=sys.stderr)
+
+    profiler_config = get_profiler_config()
+    if profiler_config["enabled"]:
+        try:
+            from .profiler import create_profiler
+            profiler = create_profiler(profiler_config)
+            if profiler is not None:
+                atexit.register(profiler.shutdown)
+        except Exception as e:
+            print(f"Warning: Could not start profiler: {e}", file=sys.stderr)
+
     try:
         log.info("Observability initialized", 
                 service_name=service_name, 
@@ -40,4 +84,27 @@ def init_observability(service_name: Optional[str] = None):
                 sampling_ratio=sampling_ratio,
                 environment=environment)
     except Exception:
-        pass
\ No newline at end of file
+        pass
+
+
+def _start_metrics_server(endpoint_config: dict):
+    # Started here rather than in instrument_app so that, with init deferred
+    # to after the fork, the listener belongs to the worker serving it
+    from .metrics_endpoint import MetricsServer, ScrapeCache, metrics_registry
+
+    try:
+        registry = metrics_registry()
+        if registry is None:
+            return
+        server = MetricsServer(
+            ScrapeCache(registry, endpoint_config["cache_ttl_seconds"]),
+            host=endpoint_config["host"],
+            port=endpoint_config["port"],
+            path=endpoint_config["path"],
+        )
+        startup_print(f"✓ Metrics endpoint listening on {endpoint_config['host']}:{server.port}{endpoint_config['path']}")
+    except OSError as e:
+        # Another worker already serves the (merged) metrics on this port
+        startup_print(f"Metrics endpoint not started on port {endpoint_config['port']}: {e}")
+    except Exception as e:
+        print(f"Warning: Could not start metrics endpoint: {e}", file=sys.stderr)
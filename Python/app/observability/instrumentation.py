@@ -1,62 +1,115 @@
+import os
+import re
 import sys
 import inspect
+from .config import get_route_config, get_worker_config, get_startup_config, get_metrics_endpoint_config, startup_print
+from .metrics_endpoint import app_metrics_path
 
 
 def instrument_app(app):
-    """Instrument FastAPI application with OpenTelemetry."""
-    try:
-        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-        from opentelemetry.instrumentation.requests import RequestsInstrumentor
-        from opentelemetry.instrumentation.logging import LoggingInstrumentor
-    except Exception:
-        raise
+    """Instrument FastAPI application with OpenTelemetry.
+
+    Instrumentations named in ``OTEL_PYTHON_DISABLED_INSTRUMENTATIONS`` are
+    skipped without being imported.
+    """
+    disabled = get_startup_config()["disabled_instrumentations"]
+    if "fastapi" not in disabled:
+        _instrument_fastapi(app)
+    if "requests" not in disabled:
+        _instrument_requests()
+    if "logging" not in disabled:
+        _instrument_logging()
+
+    endpoint_config = get_metrics_endpoint_config()
+    # With METRICS_PORT the endpoint has its own listener (see init_observability)
+    if app_metrics_path(endpoint_config) is not None:
+        try:
+            from .metrics_endpoint import ScrapeCache, create_metrics_endpoint, metrics_registry
+            registry = metrics_registry()
+            if registry is not None:
+                cache = ScrapeCache(registry, endpoint_config["cache_ttl_seconds"])
+                app.add_route(endpoint_config["path"], create_metrics_endpoint(cache), include_in_schema=False)
+                metrics_dir = get_worker_config()["metrics_dir"]
+                source = f"all workers, {metrics_dir}" if metrics_dir else "this process"
+                startup_print(f"✓ Metrics endpoint added at {endpoint_config['path']} ({source})")
+        except Exception as e:
+            print(f"Warning: Could not mount metrics endpoint: {e}", file=sys.stderr)
+
+
+def _instrument_fastapi(app):
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
     try:
         sig = inspect.signature(FastAPIInstrumentor().instrument_app)
         params = sig.parameters
-        
+
         instrument_kwargs = {}
-        
+
         if 'server_request_hook' in params:
+            from .routes import route_template
+
+            route_config = get_route_config()
+
             def server_request_hook(span, scope):
                 try:
                     method = scope.get("method")
                     path = scope.get("path")
                     if method:
                         span.set_attribute("http.method", method)
-                    if path:
+                    # Route template instead of the raw path keeps http.target low-cardinality
+                    route = route_template(scope, route_config["cache_size"]) if route_config["template_paths"] else None
+                    if route:
+                        span.set_attribute("http.route", route)
+                        span.set_attribute("http.target", route)
+                    elif path:
                         span.set_attribute("http.target", path)
                 except Exception:
                     pass
             instrument_kwargs['server_request_hook'] = server_request_hook
-        
+
+        metrics_path = app_metrics_path(get_metrics_endpoint_config())
+        if 'excluded_urls' in params and metrics_path is not None:
+            # Scrapes are not traced; passing excluded_urls replaces the
+            # environment variables the instrumentor would read, so keep them
+            excluded = os.getenv("OTEL_PYTHON_FASTAPI_EXCLUDED_URLS") or os.getenv("OTEL_PYTHON_EXCLUDED_URLS") or ""
+            own = f"^[^/]*//[^/]*{re.escape(metrics_path)}$"
+            instrument_kwargs['excluded_urls'] = f"{excluded},{own}" if excluded.strip() else own
+
         if 'client_request_hook' in params:
             instrument_kwargs['client_request_hook'] = None
-        
+
         if 'client_response_hook' in params:
             instrument_kwargs['client_response_hook'] = None
-        
-        print(f"Instrumenting FastAPI with params: {list(instrument_kwargs.keys())}", file=sys.stderr)
-        
+
+        startup_print(f"Instrumenting FastAPI with params: {list(instrument_kwargs.keys())}")
+
         FastAPIInstrumentor().instrument_app(app, **instrument_kwargs)
-        print("✓ FastAPI instrumented successfully", file=sys.stderr)
+        startup_print("✓ FastAPI instrumented successfully")
     except Exception as e:
         print(f"Warning: FastAPI instrumentation failed: {e}", file=sys.stderr)
         print("Falling back to basic instrumentation", file=sys.stderr)
         try:
             FastAPIInstrumentor().instrument_app(app)
-            print("✓ FastAPI instrumented (basic mode)", file=sys.stderr)
+            startup_print("✓ FastAPI instrumented (basic mode)")
         except Exception as e2:
             print(f"✗ Failed to instrument FastAPI: {e2}", file=sys.stderr)
 
+
+def _instrument_requests():
     try:
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+
         RequestsInstrumentor().instrument()
-        print("✓ Requests library instrumented", file=sys.stderr)
+        startup_print("✓ Requests library instrumented")
     except Exception as e:
         print(f"Warning: Requests instrumentation failed: {e}", file=sys.stderr)
-    
+
+
+def _instrument_logging():
     try:
+        from opentelemetry.instrumentation.logging import LoggingInstrumentor
+
         LoggingInstrumentor().instrument(set_logging_format=True)
-        print("✓ Logging instrumented", file=sys.stderr)
+        startup_print("✓ Logging instrumented")
     except Exception as e:
-        print(f"Warning: Logging instrumentation failed: {e}", file=sys.stderr)
\ No newline at end of file
+        print(f"Warning: Logging instrumentation failed: {e}", file=sys.stderr)
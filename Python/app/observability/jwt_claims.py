@@ -0,0 +1,193 @@
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Iterable, Optional
+from opentelemetry import metrics
+
+MODES = ("unverified", "verified")
+
+
+def _decode_unverified(token: str) -> dict:
+    """Claims of a compact JWS without checking the signature (logging-only use)."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise ValueError("not a compact JWT")
+    payload = parts[1]
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    if not isinstance(claims, dict):
+        raise ValueError("JWT payload is not an object")
+    return claims
+
+
+class JwtClaimsCache:
+    """User context (``id``, ``tenantId``, ``role``) from ``Authorization: Bearer`` JWTs, cached per token.
+
+    ``mode="unverified"`` only base64-decodes the payload and is meant for
+    attributing logs; ``mode="verified"`` checks the signature (PyJWT) against
+    keys from a local JWKS file, which are loaded once and reloaded only when
+    a token names an unknown ``kid`` and the file has changed.
+
+    Results, including "no usable claims", are cached under a BLAKE2 hash of
+    the token (the token itself is not kept) for ``ttl_seconds``, never past
+    the token's ``exp``. The cache holds at most ``cache_size`` tokens and
+    evicts the oldest entry when full; ``cache_size=0`` disables it.
+    """
+
+    def __init__(
+        self,
+        mode: str = "unverified",
+        jwks_file: Optional[str] = None,
+        algorithms: Iterable[str] = ("RS256",),
+        audience: Optional[str] = None,
+        issuer: Optional[str] = None,
+        tenant_claim: str = "tenant_id",
+        role_claim: str = "role",
+        cache_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        meter=None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"unknown JWT claims mode '{mode}', expected one of {', '.join(MODES)}")
+        self._verified = mode == "verified"
+        self._decode_errors = (ValueError,)
+        if self._verified:
+            import jwt
+
+            if not jwks_file:
+                raise ValueError("verified JWT claims need a JWKS file")
+            self._jwt = jwt
+            self._jwks_file = jwks_file
+            self._jwks_mtime = None
+            self._keys = {}
+            self._load_jwks()
+            self._decode_options = {"verify_aud": audience is not None}
+            self._decode_errors = (ValueError, OSError, jwt.PyJWTError)
+        self._algorithms = list(algorithms)
+        self._audience = audience
+        self._issuer = issuer
+        self._claims = (("id", "sub"), ("tenantId", tenant_claim), ("role", role_claim))
+        self._cache_size = cache_size
+        self._ttl = ttl_seconds
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        meter = meter or metrics.get_meter("app.observability.jwt_claims")
+        meter.create_observable_counter(
+            "jwt.cache.lookups",
+            callbacks=[self._observe_lookups],
+            unit="{lookup}",
+            description="JWT user context lookups by cache result (hit, miss)",
+        )
+
+    def _observe_lookups(self, options):
+        return [
+            metrics.Observation(self._hits, {"result": "hit"}),
+            metrics.Observation(self._misses, {"result": "miss"}),
+        ]
+
+    def _load_jwks(self):
+        mtime = os.stat(self._jwks_file).st_mtime
+        if mtime == self._jwks_mtime:
+            return
+        with open(self._jwks_file) as f:
+            jwks = self._jwt.PyJWKSet.from_json(f.read())
+        self._keys = {key.key_id: key for key in jwks.keys}
+        self._jwks_mtime = mtime
+
+    def _signing_key(self, token: str):
+        kid = self._jwt.get_unverified_header(token).get("kid")
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+        if key is None:
+            self._load_jwks()
+            key = self._keys.get(kid)
+        if key is None:
+            raise self._jwt.InvalidKeyError(f"no JWKS key with kid {kid!r}")
+        return key.key
+
+    def decode(self, token: str) -> Optional[dict]:
+        """Claims of ``token`` (signature checked in verified mode), or None if it is not usable. Not cached."""
+        try:
+            if not self._verified:
+                return _decode_unverified(token)
+            return self._jwt.decode(
+                token,
+                self._signing_key(token),
+                algorithms=self._algorithms,
+                audience=self._audience,
+                issuer=self._issuer,
+                options=self._decode_options,
+            )
+        except self._decode_errors:
+            return None
+
+    def user_context(self, authorization: str) -> Optional[dict]:
+        """User context for an ``Authorization`` header value, or None. The returned dict is shared; do not modify it."""
+        scheme, _, token = authorization.partition(" ")
+        if not token or scheme.lower() != "bearer":
+            return None
+        token = token.strip()
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            self._hits += 1
+            return entry[1]
+        self._misses += 1
+
+        claims = self.decode(token)
+        context = None
+        expires_at = now + self._ttl
+        if claims is not None:
+            context = {name: str(claims[claim]) for name, claim in self._claims if claims.get(claim) is not None} or None
+            exp = claims.get("exp")
+            if isinstance(exp, (int, float)):
+                expires_at = min(expires_at, exp)
+        if self._cache_size > 0 and expires_at > now:
+            with self._lock:
+                if key not in self._cache and len(self._cache) >= self._cache_size:
+                    # Oldest insert first: entries expire in roughly insertion order
+                    del self._cache[next(iter(self._cache))]
+                self._cache[key] = (expires_at, context)
+        return context
+
+    @property
+    def stats(self) -> dict:
+        """Cache hits, misses, current size and hit rate since start."""
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "size": len(self._cache),
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+        }
+
+
+def create_jwt_claims_cache(jwt_config: dict) -> Optional[JwtClaimsCache]:
+    """Build the ``JwtClaimsCache`` described by ``get_jwt_config()``, or None if JWT claims are off or unusable."""
+    if not jwt_config["mode"]:
+        return None
+    try:
+        return JwtClaimsCache(
+            mode=jwt_config["mode"],
+            jwks_file=jwt_config["jwks_file"],
+            algorithms=jwt_config["algorithms"],
+            audience=jwt_config["audience"],
+            issuer=jwt_config["issuer"],
+            tenant_claim=jwt_config["tenant_claim"],
+            role_claim=jwt_config["role_claim"],
+            cache_size=jwt_config["cache_size"],
+            ttl_seconds=jwt_config["ttl_seconds"],
+        )
+    except ImportError:
+        print("Warning: JWT_CLAIMS_MODE=verified needs PyJWT[crypto]; JWT user context disabled", file=sys.stderr)
+    except Exception as e:
+        print(f"Warning: JWT user context disabled: {e}", file=sys.stderr)
+    return None
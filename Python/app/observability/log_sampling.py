@@ -0,0 +1,321 @@
+import sys
+import time
+import zlib
+import random
+import threading
+import structlog
+from typing import Iterable, Optional
+from opentelemetry import metrics
+from .context import get_request_context
+
+SUMMARY_LOGGER = "app.observability.log_sampling"
+REQUEST_STARTED = "Request started"
+REQUEST_LOGGER = "app.middleware.observability_middleware"
+
+_LEVELS = {
+    "debug": 10,
+    "info": 20,
+    "warn": 30,
+    "warning": 30,
+    "error": 40,
+    "exception": 40,
+    "critical": 50,
+}
+_LEVEL_NAMES = {10: "debug", 20: "info", 30: "warning", 40: "error", 50: "critical"}
+_HASH_LIMIT = 1 << 32
+# Template buckets per rule before further templates share one bucket
+_MAX_BUCKETS = 1024
+_OVERFLOW_TEMPLATE = "other"
+_SUMMARY_TOP = 20
+
+REASON_SAMPLED = "sampled"
+REASON_RATE_LIMITED = "rate_limited"
+REASON_REQUEST_STARTED = "request_started"
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class _KeptCount:
+    """Kept events of one thread; only that thread writes ``count``."""
+
+    __slots__ = ("thread", "count")
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.count = 0
+
+
+class LogSamplingRule:
+    """Which events a rule applies to and how many of them it keeps.
+
+    ``logger`` and ``route`` match exactly, or by prefix with a trailing
+    ``*``; ``route`` is the route template (``/items/{item_id}``) when the
+    path matched one, else the raw path. ``level`` matches events at that level and below. Matching
+    events are kept with probability ``rate`` (decided per request, so the
+    lines of one request are kept or dropped together) and then limited to
+    ``per_second`` per message template, with bursts up to ``burst``.
+    """
+
+    __slots__ = ("logger", "level", "route", "rate", "per_second", "burst", "_sample_bound")
+
+    def __init__(
+        self,
+        logger: Optional[str] = None,
+        level: Optional[str] = None,
+        route: Optional[str] = None,
+        rate: float = 1.0,
+        per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+    ):
+        if level is not None and level.lower() not in _LEVELS:
+            raise ValueError(f"unknown level '{level}'")
+        self.logger = logger
+        self.level = _LEVELS[level.lower()] if level is not None else None
+        self.route = route
+        self.rate = max(0.0, min(rate, 1.0))
+        self.per_second = per_second if per_second and per_second > 0 else None
+        self.burst = max(burst or 0.0, 1.0, self.per_second or 0.0)
+        self._sample_bound = round(self.rate * _HASH_LIMIT)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LogSamplingRule":
+        """Build a rule from ``key=value`` pairs, e.g. ``route=/health,rate=0.01``."""
+        fields = {}
+        for pair in spec.split(","):
+            key, sep, value = pair.partition("=")
+            if not sep or not key.strip():
+                raise ValueError(f"expected key=value, got '{pair.strip()}'")
+            fields[key.strip().lower()] = value.strip()
+        unknown = set(fields) - {"logger", "level", "route", "rate", "per_second", "burst"}
+        if unknown:
+            raise ValueError(f"unknown keys {sorted(unknown)}")
+        return cls(
+            logger=fields.get("logger") or None,
+            level=fields.get("level") or None,
+            route=fields.get("route") or None,
+            rate=float(fields.get("rate", 1.0)),
+            per_second=float(fields["per_second"]) if fields.get("per_second") else None,
+            burst=float(fields["burst"]) if fields.get("burst") else None,
+        )
+
+    def matches(self, logger_name: str, level: int, route: Optional[str]) -> bool:
+        if self.level is not None and level > self.level:
+            return False
+        if self.logger is not None and not _match(self.logger, logger_name):
+            return False
+        if self.route is not None and (route is None or not _match(self.route, route)):
+            return False
+        return True
+
+    def sampled_in(self, request_id: Optional[str]) -> bool:
+        if self.rate >= 1.0:
+            return True
+        if request_id:
+            return zlib.crc32(request_id.encode()) < self._sample_bound
+        return random.random() < self.rate
+
+
+def _match(pattern: str, value: str) -> bool:
+    if pattern.endswith("*"):
+        return value.startswith(pattern[:-1])
+    return value == pattern
+
+
+def parse_rules(specs: Iterable[str]) -> list:
+    """Parse rule specs (see ``LogSamplingRule.parse``), skipping invalid ones with a warning."""
+    rules = []
+    for spec in specs:
+        try:
+            rules.append(LogSamplingRule.parse(spec))
+        except ValueError as e:
+            print(f"Warning: ignoring log sampling rule '{spec}': {e}", file=sys.stderr)
+    return rules
+
+
+class LogSamplingProcessor:
+    """structlog processor that drops or samples events before they are rendered or forwarded.
+
+    Events at ``keep_level`` and above always pass. Below it, the first
+    rule that matches the event's logger, level and route decides; events
+    no rule matches are limited to ``default_per_second`` per message
+    template when that is set. ``suppress_request_started`` drops the
+    middleware's "Request started" line, since "Request finished" (or
+    "Request failed") carries the same fields.
+
+    Kept events are counted per thread without a lock, since most events
+    are kept; the lock is only taken to drop an event, take a rate-limit
+    token or build the summary. Dropped events are counted per logger,
+    level and template, and every ``summary_interval_seconds`` one "Log
+    events suppressed" line reports them. The summary is written by the next event after the interval, so
+    no extra thread is needed.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Iterable[LogSamplingRule]] = None,
+        keep_level: str = "warning",
+        default_per_second: Optional[float] = None,
+        default_burst: Optional[float] = None,
+        suppress_request_started: bool = False,
+        summary_interval_seconds: float = 60.0,
+    ):
+        self._rules = list(rules or ())
+        self._keep_level = _LEVELS.get(keep_level.lower(), _LEVELS["warning"])
+        self._default_rule = LogSamplingRule(per_second=default_per_second, burst=default_burst)
+        self._suppress_request_started = suppress_request_started
+        self._summary_interval = summary_interval_seconds
+        self._summary_log = structlog.get_logger(SUMMARY_LOGGER)
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._suppressed = {}
+        self._next_summary = time.monotonic() + summary_interval_seconds
+
+        self._local = threading.local()
+        self._kept_counts = []
+        self._kept_finished = 0
+        self.dropped = {REASON_SAMPLED: 0, REASON_RATE_LIMITED: 0, REASON_REQUEST_STARTED: 0}
+
+        meter = metrics.get_meter(SUMMARY_LOGGER)
+        meter.create_observable_counter(
+            "log.sampling.events",
+            callbacks=[self._observe_events],
+            unit="{event}",
+            description="Log events by sampling outcome (kept, sampled, rate_limited, request_started)",
+        )
+
+    @property
+    def rules(self) -> list:
+        """The sampling rules, in match order."""
+        return list(self._rules)
+
+    @property
+    def kept(self) -> int:
+        """Events passed on so far; counts of finished threads are folded in."""
+        with self._lock:
+            # Checked first: a thread seen finished cannot count another event
+            finished = [c for c in self._kept_counts if not c.thread.is_alive()]
+            if finished:
+                self._kept_finished += sum(c.count for c in finished)
+                self._kept_counts = [c for c in self._kept_counts if c not in finished]
+            return self._kept_finished + sum(c.count for c in self._kept_counts)
+
+    def _observe_events(self, options):
+        observations = [metrics.Observation(self.kept, {"decision": "kept"})]
+        observations.extend(metrics.Observation(count, {"decision": reason}) for reason, count in self.dropped.items())
+        return observations
+
+    def __call__(self, logger, method_name, event_dict):
+        level = _LEVELS.get(event_dict.get("level", method_name), _LEVELS["info"])
+        logger_name = event_dict.get("logger", "")
+        if level >= self._keep_level or logger_name == SUMMARY_LOGGER:
+            self._count_kept()
+            return event_dict
+
+        now = time.monotonic()
+        if now >= self._next_summary:
+            self._emit_summary(now)
+
+        event = event_dict.get("event", "")
+        if self._suppress_request_started and event == REQUEST_STARTED and logger_name == REQUEST_LOGGER:
+            self._drop(REASON_REQUEST_STARTED, logger_name, level, event)
+
+        route, request_id = _request_fields(event_dict)
+        rule = self._default_rule
+        for candidate in self._rules:
+            if candidate.matches(logger_name, level, route):
+                rule = candidate
+                break
+
+        template = event_dict.get("message_template_text") or event
+        if not rule.sampled_in(request_id):
+            self._drop(REASON_SAMPLED, logger_name, level, template)
+        if rule.per_second is not None and not self._take_token(rule, template, now):
+            self._drop(REASON_RATE_LIMITED, logger_name, level, template)
+
+        self._count_kept()
+        return event_dict
+
+    def _count_kept(self):
+        counter = getattr(self._local, "kept", None)
+        if counter is None:
+            counter = self._local.kept = _KeptCount(threading.current_thread())
+            with self._lock:
+                self._kept_counts.append(counter)
+        counter.count += 1
+
+    def _take_token(self, rule: LogSamplingRule, template: str, now: float) -> bool:
+        with self._lock:
+            bucket = self._buckets.get((rule, template))
+            if bucket is None:
+                if len(self._buckets) >= _MAX_BUCKETS:
+                    template = _OVERFLOW_TEMPLATE
+                bucket = self._buckets.setdefault((rule, template), _TokenBucket(rule.burst, now))
+            bucket.tokens = min(rule.burst, bucket.tokens + (now - bucket.updated) * rule.per_second)
+            bucket.updated = now
+            if bucket.tokens < 1.0:
+                return False
+            bucket.tokens -= 1.0
+            return True
+
+    def _drop(self, reason: str, logger_name: str, level: int, template: str):
+        key = (logger_name, level, template)
+        with self._lock:
+            self.dropped[reason] += 1
+            if key in self._suppressed or len(self._suppressed) < _MAX_BUCKETS:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            else:
+                overflow = (_OVERFLOW_TEMPLATE, level, _OVERFLOW_TEMPLATE)
+                self._suppressed[overflow] = self._suppressed.get(overflow, 0) + 1
+        raise structlog.DropEvent
+
+    def _emit_summary(self, now: float):
+        with self._lock:
+            if now < self._next_summary:
+                return
+            self._next_summary = now + self._summary_interval
+            suppressed, self._suppressed = self._suppressed, {}
+        if suppressed:
+            self._log_summary(suppressed)
+
+    def _log_summary(self, suppressed: dict):
+        top = sorted(suppressed.items(), key=lambda item: item[1], reverse=True)[:_SUMMARY_TOP]
+        self._summary_log.info(
+            "Log events suppressed",
+            suppressed=sum(suppressed.values()),
+            intervalSeconds=self._summary_interval,
+            top=[
+                {"logger": logger_name, "level": _LEVEL_NAMES.get(level, str(level)), "template": template, "count": count}
+                for (logger_name, level, template), count in top
+            ],
+        )
+
+    def flush_summary(self):
+        """Log the pending summary now (called at shutdown)."""
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, {}
+            self._next_summary = time.monotonic() + self._summary_interval
+        if suppressed:
+            self._log_summary(suppressed)
+
+
+def _request_fields(event_dict: dict) -> tuple:
+    """(route, request id) of the event: from the middleware's fields, else the current request."""
+    route = event_dict.get("RequestPath")
+    if route is None:
+        http = event_dict.get("http")
+        if isinstance(http, dict):
+            route = http.get("path")
+    request_id = event_dict.get("requestId")
+    if route is None or request_id is None:
+        request_context = get_request_context()
+        if request_context is not None:
+            route = route or request_context.route or request_context.path
+            request_id = request_id or request_context.request_id
+    return route, request_id
@@ -0,0 +1,204 @@
+import sys
+import queue
+import threading
+import structlog
+from typing import Optional
+from opentelemetry import metrics
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEW = "drop_new"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEW)
+
+_STOP = object()
+
+
+class _QueueClosed(Exception):
+    pass
+
+
+class _LogQueue(queue.Queue):
+    """Queue that refuses items once ``close`` has enqueued the stop marker.
+
+    ``close`` and every put hold the queue's mutex, so nothing can be
+    enqueued behind the marker, and producers blocked on a full queue wake
+    up and fail instead of waiting for a writer that has gone.
+    """
+
+    closed = False
+
+    def put(self, item, block=True):
+        with self.not_full:
+            if self.closed:
+                raise _QueueClosed
+            while 0 < self.maxsize <= self._qsize():
+                if not block:
+                    raise queue.Full
+                self.not_full.wait()
+                if self.closed:
+                    raise _QueueClosed
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def put_dropping_oldest(self, item) -> bool:
+        """Enqueue ``item``, dropping the oldest item if the queue is full; True if one was dropped."""
+        with self.not_full:
+            if self.closed:
+                raise _QueueClosed
+            dropped = 0 < self.maxsize <= self._qsize()
+            if dropped:
+                self._get()
+            else:
+                self.unfinished_tasks += 1
+            self._put(item)
+            self.not_empty.notify()
+            return dropped
+
+    def close(self, marker) -> bool:
+        """Enqueue ``marker`` past ``maxsize`` as the last item; False if already closed."""
+        with self.not_full:
+            if self.closed:
+                return False
+            self.closed = True
+            self._put(marker)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            self.not_full.notify_all()
+            return True
+
+
+class AsyncLogWriter:
+    """Final structlog processor that hands event dicts to a background writer.
+
+    The calling thread only enqueues the event dict into a bounded queue and
+    drops the event from the structlog chain. A dedicated writer thread runs
+    the remaining ``render_processors`` and writes the rendered lines to
+    ``stream`` in batches (``stream`` must be binary if the renderer
+    produces bytes).
+    """
+
+    def __init__(
+        self,
+        render_processors: list,
+        stream=None,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        overflow_policy: str = OVERFLOW_BLOCK,
+        flush_interval: float = 0.5,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            print(f"Warning: unknown log queue overflow policy '{overflow_policy}', using '{OVERFLOW_BLOCK}'", file=sys.stderr)
+            overflow_policy = OVERFLOW_BLOCK
+
+        self._render_processors = render_processors
+        self._stream = stream or sys.stdout
+        self._queue = _LogQueue(maxsize=max(queue_size, 1))
+        self._batch_size = max(batch_size, 1)
+        self._overflow_policy = overflow_policy
+        self._flush_interval = flush_interval
+        self._dropped = 0
+        self._closed = False
+
+        meter = metrics.get_meter("app.observability.log_writer")
+        meter.create_observable_counter(
+            "log.queue.dropped",
+            callbacks=[self._observe_dropped],
+            unit="{record}",
+            description="Log records dropped because the async log queue was full",
+        )
+        meter.create_observable_gauge(
+            "log.queue.size",
+            callbacks=[self._observe_size],
+            unit="{record}",
+            description="Log records waiting in the async log queue",
+        )
+
+        self._thread = threading.Thread(target=self._run, name="AsyncLogWriter", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self) -> int:
+        """Number of events dropped by the overflow policy."""
+        return self._dropped
+
+    def _observe_dropped(self, options):
+        return [metrics.Observation(self._dropped)]
+
+    def _observe_size(self, options):
+        return [metrics.Observation(self._queue.qsize())]
+
+    def __call__(self, logger, method_name, event_dict):
+        if self._closed:
+            # Writer already shut down: fall back to rendering inline
+            self._write([self._render(logger, method_name, event_dict)])
+            raise structlog.DropEvent
+
+        item = (logger, method_name, event_dict)
+        try:
+            if self._overflow_policy == OVERFLOW_BLOCK:
+                self._queue.put(item)
+            elif self._overflow_policy == OVERFLOW_DROP_NEW:
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    self._count_dropped()
+            elif self._queue.put_dropping_oldest(item):
+                self._count_dropped()
+        except _QueueClosed:
+            # Shut down while this event was on its way in
+            self._write([self._render(logger, method_name, event_dict)])
+        raise structlog.DropEvent
+
+    def _count_dropped(self):
+        # Many threads log at once; the queue's own lock keeps the count exact
+        with self._queue.mutex:
+            self._dropped += 1
+
+    def _render(self, logger, method_name, event_dict) -> str:
+        for processor in self._render_processors:
+            event_dict = processor(logger, method_name, event_dict)
+        return event_dict
+
+    def _write(self, lines: list):
+        try:
+            newline = b"\n" if isinstance(lines[0], bytes) else "\n"
+            self._stream.write(newline.join(lines) + newline)
+            self._stream.flush()
+        except Exception as e:
+            print(f"Error writing log batch: {e}", file=sys.stderr)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [item]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            lines = []
+            for entry in batch:
+                if entry is _STOP:
+                    stop = True
+                    continue
+                try:
+                    lines.append(self._render(*entry))
+                except Exception as e:
+                    print(f"Error rendering log event: {e}", file=sys.stderr)
+            if lines:
+                self._write(lines)
+            if stop:
+                return
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Flush queued events and stop the writer thread."""
+        self._closed = True
+        if self._queue.close(_STOP):
+            self._thread.join(timeout)
@@ -1,5 +1,7 @@
 import sys
+import atexit
 import logging
+import threading
 import structlog
 from typing import Optional
 from opentelemetry import trace
@@ -7,136 +9,291 @@ from .config import (
     _LOGS_AVAILABLE, 
     SeverityNumber, 
     LogRecord,
-    get_otel_logger_provider
+    get_otel_logger_provider,
+    get_flight_recorder_config,
+    get_logging_config,
+    get_log_sampling_config,
+    get_redaction_config,
+    startup_print,
 )
+from .context import get_request_context
+from .flight_recorder import FlightRecorder, set_flight_recorder
+from .log_sampling import LogSamplingProcessor, parse_rules
+from .log_writer import AsyncLogWriter
+from .pipeline_metrics import get_pipeline_metrics
+from .redaction import build_redactor
+from .renderers import BytesLoggerFactory, get_json_renderer
+
+
+_SPAN_CONTEXT_KEY = "_otel_span_context"
+
+if _LOGS_AVAILABLE:
+    _SEVERITY_TABLE = {
+        "debug": (SeverityNumber.DEBUG, "DEBUG"),
+        "info": (SeverityNumber.INFO, "INFO"),
+        "warning": (SeverityNumber.WARN, "WARNING"),
+        "error": (SeverityNumber.ERROR, "ERROR"),
+        "critical": (SeverityNumber.FATAL, "CRITICAL"),
+    }
+    _DEFAULT_SEVERITY = _SEVERITY_TABLE["info"]
+else:
+    _SEVERITY_TABLE = {}
+    _DEFAULT_SEVERITY = None
+
+_async_writer = None
+
+_EXCLUDED_KEYS = frozenset({"event", "level", "timestamp", "logger"})
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
 
 
 def _add_trace_fields(logger, method_name, event_dict):
-    """Add trace_id and span_id to log events."""
+    """Add trace_id and span_id to log events.
+
+    Reuses the IDs already formatted in the current ``RequestContext`` when the
+    active span is the request's span.
+    """
     span = trace.get_current_span()
     ctx = getattr(span, "get_span_context", lambda: None)()
     if ctx is not None:
         try:
-            trace_id = ctx.trace_id
-            span_id = ctx.span_id
-            if trace_id and trace_id != 0:
-                event_dict["trace_id"] = format(trace_id, "032x")
-                event_dict["TraceId"] = format(trace_id, "032x")
-            if span_id and span_id != 0:
-                event_dict["span_id"] = format(span_id, "016x")
-                event_dict["SpanId"] = format(span_id, "016x")
+            request_context = get_request_context()
+            if request_context is not None and ctx is request_context.span_context:
+                trace_id = request_context.trace_id
+                span_id = request_context.span_id
+            else:
+                trace_id = format(ctx.trace_id, "032x") if ctx.trace_id else None
+                span_id = format(ctx.span_id, "016x") if ctx.span_id else None
+            if trace_id:
+                event_dict["trace_id"] = event_dict["TraceId"] = trace_id
+            if span_id:
+                event_dict["span_id"] = event_dict["SpanId"] = span_id
+            # Handed to OtelLogForwarder so it does not look the span up again
+            event_dict[_SPAN_CONTEXT_KEY] = ctx
         except Exception:
             pass
     return event_dict
 
 
-def _otel_log_forwarder(logger, method_name, event_dict):
-    """Forward structlog events to OpenTelemetry."""
-    otel_logger_provider = get_otel_logger_provider()
-    
-    if not _LOGS_AVAILABLE or otel_logger_provider is None:
-        return event_dict
-    
-    try:
-        logger_name = event_dict.get("logger", "app.middleware.observability_middleware")
-        otel_logger = otel_logger_provider.get_logger(logger_name)
-        
-        level = event_dict.get("level", "info").lower()
-        severity_map = {
-            "debug": SeverityNumber.DEBUG,
-            "info": SeverityNumber.INFO,
-            "warning": SeverityNumber.WARN,
-            "error": SeverityNumber.ERROR,
-            "critical": SeverityNumber.FATAL,
-        }
-        severity = severity_map.get(level, SeverityNumber.INFO)
-        
-        event = event_dict.get("event", "")
-        
-        span = trace.get_current_span()
-        trace_id = None
-        span_id = None
-        trace_flags = None
-        
-        if span:
-            ctx = span.get_span_context()
-            if ctx and ctx.trace_id != 0:
+class _BoundLogger(structlog.stdlib.BoundLogger):
+    """Sends ``exception`` events to ``Logger.error``.
+
+    ``format_exc_info`` has already put the traceback in the rendered event,
+    redacted; ``Logger.exception`` would append it again, unredacted.
+    """
+
+    def exception(self, event=None, *args, **kw):
+        kw.setdefault("exc_info", True)
+        return self._proxy_to_logger("error", event, *args, **kw)
+
+
+class OtelLogForwarder:
+    """Stateful structlog processor that forwards events to OpenTelemetry.
+
+    Keeps a bounded cache of OTEL loggers keyed by logger name and reuses the
+    span context that ``_add_trace_fields`` already looked up for the event.
+    """
+
+    def __init__(self, max_loggers: int = 256):
+        self._max_loggers = max_loggers
+        self._loggers = {}
+        self._provider = None
+        self._lock = threading.Lock()
+
+    def _get_otel_logger(self, provider, logger_name: str):
+        """Return the cached OTEL logger for ``logger_name``, creating it on a miss."""
+        if provider is not self._provider:
+            with self._lock:
+                self._loggers = {}
+                self._provider = provider
+        otel_logger = self._loggers.get(logger_name)
+        if otel_logger is None:
+            otel_logger = provider.get_logger(logger_name)
+            with self._lock:
+                if len(self._loggers) >= self._max_loggers:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    self._loggers.pop(next(iter(self._loggers)), None)
+                self._loggers[logger_name] = otel_logger
+        return otel_logger
+
+    def __call__(self, logger, method_name, event_dict):
+        ctx = event_dict.pop(_SPAN_CONTEXT_KEY, None)
+        otel_logger_provider = get_otel_logger_provider()
+
+        if not _LOGS_AVAILABLE or otel_logger_provider is None:
+            return event_dict
+
+        try:
+            otel_logger = self._get_otel_logger(
+                otel_logger_provider,
+                event_dict.get("logger", "app.middleware.observability_middleware"),
+            )
+
+            level = event_dict.get("level", "info")
+            severity, severity_text = _SEVERITY_TABLE.get(level) or (_DEFAULT_SEVERITY[0], level.upper())
+
+            trace_id = None
+            span_id = None
+            trace_flags = None
+
+            if ctx is not None and ctx.trace_id != 0:
                 trace_id = ctx.trace_id
                 span_id = ctx.span_id
                 trace_flags = ctx.trace_flags
-        
-        if not trace_id and "TraceId" in event_dict:
-            try:
-                trace_id_str = event_dict["TraceId"]
-                if trace_id_str and trace_id_str != "":
-                    trace_id = int(trace_id_str, 16)
-            except Exception:
-                pass
-        
-        if not span_id and "SpanId" in event_dict:
-            try:
-                span_id_str = event_dict["SpanId"]
-                if span_id_str and span_id_str != "":
-                    span_id = int(span_id_str, 16)
-            except Exception:
-                pass
-        
-        excluded_keys = {"event", "level", "timestamp", "logger"}
-        attributes = {}
-        
-        for k, v in event_dict.items():
-            if k not in excluded_keys:
-                if k in ["TraceId", "trace_id"] and trace_id:
-                    attributes[k] = format(trace_id, "032x")
-                elif k in ["SpanId", "span_id"] and span_id:
-                    attributes[k] = format(span_id, "016x")
-                else:
-                    attributes[k] = str(v) if not isinstance(v, (str, int, float, bool, type(None))) else v
-        
-        if trace_id and "trace_id" not in attributes:
-            attributes["trace_id"] = format(trace_id, "032x")
-        if span_id and "span_id" not in attributes:
-            attributes["span_id"] = format(span_id, "016x")
-        
-        otel_logger.emit(
-            LogRecord(
-                timestamp=None,
-                trace_id=trace_id,
-                span_id=span_id,
-                trace_flags=trace_flags,
-                severity_text=level.upper(),
-                severity_number=severity,
-                body=event,
-                attributes=attributes,
+            else:
+                # No active span: fall back to IDs passed explicitly on the event
+                try:
+                    trace_id = int(event_dict["TraceId"], 16) if event_dict.get("TraceId") else None
+                    span_id = int(event_dict["SpanId"], 16) if event_dict.get("SpanId") else None
+                except (TypeError, ValueError):
+                    pass
+
+            attributes = {
+                k: v if isinstance(v, _PRIMITIVE_TYPES) else str(v)
+                for k, v in event_dict.items()
+                if k not in _EXCLUDED_KEYS
+            }
+
+            if trace_id and "trace_id" not in attributes:
+                attributes["trace_id"] = format(trace_id, "032x")
+            if span_id and "span_id" not in attributes:
+                attributes["span_id"] = format(span_id, "016x")
+
+            otel_logger.emit(
+                LogRecord(
+                    timestamp=None,
+                    trace_id=trace_id,
+                    span_id=span_id,
+                    trace_flags=trace_flags,
+                    severity_text=severity_text,
+                    severity_number=severity,
+                    body=event_dict.get("event", ""),
+                    resource=otel_logger_provider.resource,
+                    attributes=attributes,
+                )
             )
-        )
-    except Exception as e:
-        print(f"Error forwarding log to OTEL: {e}", file=sys.stderr)
-    
-    return event_dict
+        except Exception as e:
+            get_pipeline_metrics().record_forwarder_error(e)
+            print(f"Error forwarding log to OTEL: {e}", file=sys.stderr)
+
+        return event_dict
+
 
+def init_logging(service_name: Optional[str] = None, environment: str = "development", async_mode: Optional[bool] = None):
+    """Initialize structured logging with OpenTelemetry integration.
+
+    With ``async_mode`` (or ``LOG_ASYNC=true``) events are only enqueued on the
+    calling thread; JSON rendering and stdout writes happen on a background
+    writer thread (see ``AsyncLogWriter``). ``LOG_RENDERER`` selects the JSON
+    serializer (see ``get_json_renderer``). With ``LOG_SAMPLING_ENABLED=true``
+    a ``LogSamplingProcessor`` drops sampled-out and rate-limited events
+    before they are timestamped, forwarded or rendered. With
+    ``REDACTION_ENABLED=true`` a ``Redactor`` masks sensitive keys and values
+    before the event reaches the OTEL forwarder or stdout. With
+    ``FLIGHT_RECORDER_ENABLED=true`` a ``FlightRecorder`` holds each
+    request's events below ``FLIGHT_RECORDER_LEVEL`` (INFO by default, so
+    DEBUG events) and writes them only for failed or slow requests.
+    """
+    global _async_writer
 
-def init_logging(service_name: Optional[str] = None, environment: str = "development"):
-    """Initialize structured logging with OpenTelemetry integration."""
     logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
 
+    config = get_logging_config()
+    if async_mode is None:
+        async_mode = config["async_enabled"]
+
+    renderer, renders_bytes = get_json_renderer(config["renderer"], config["sort_keys"])
+
+    flight_recorder = None
+    recorder_config = get_flight_recorder_config()
+    if recorder_config["enabled"]:
+        flight_recorder = FlightRecorder(
+            level=recorder_config["level"],
+            max_events=recorder_config["max_events"],
+            max_buffered_events=recorder_config["max_buffered_events"],
+            slow_request_ms=recorder_config["slow_request_ms"],
+        )
+        startup_print(f"✓ Flight recorder enabled (below {recorder_config['level']}, slow>={recorder_config['slow_request_ms']}ms)")
+    set_flight_recorder(flight_recorder)
+
     processors = [
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        _add_trace_fields,
-        _otel_log_forwarder,
+    ]
+    sampling_config = get_log_sampling_config()
+    if sampling_config["enabled"]:
+        sampler = LogSamplingProcessor(
+            parse_rules(sampling_config["rules"]),
+            keep_level=sampling_config["keep_level"],
+            default_per_second=sampling_config["default_per_second"],
+            default_burst=sampling_config["default_burst"],
+            suppress_request_started=sampling_config["suppress_request_started"],
+            summary_interval_seconds=sampling_config["summary_interval_seconds"],
+        )
+        atexit.register(sampler.flush_summary)
+        processors.append(sampler)
+        startup_print(f"✓ Log sampling enabled ({len(sampler.rules)} rules, keep>={sampling_config['keep_level']})")
+    # Exceptions are formatted before redaction, so tokens and DSNs in their
+    # text are masked before stdout and OTEL forwarding
+    processors += [
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer(sort_keys=True),
     ]
+    redactor = build_redactor(get_redaction_config())
+    if redactor is not None:
+        processors.append(redactor)
+        startup_print("✓ Log redaction enabled")
+    timestamper = structlog.processors.TimeStamper(fmt="iso")
+    processors += [
+        timestamper,
+        _add_trace_fields,
+        OtelLogForwarder(),
+    ]
+    if renders_bytes:
+        # Bytes go straight to stdout's buffer: no UnicodeDecoder, no stdlib formatter
+        render_processors = [renderer]
+        stream = sys.stdout.buffer
+        logger_factory = BytesLoggerFactory(stream)
+        wrapper_class = structlog.make_filtering_bound_logger(logging.INFO)
+    else:
+        render_processors = [structlog.processors.UnicodeDecoder(), renderer]
+        stream = sys.stdout
+        logger_factory = structlog.stdlib.LoggerFactory()
+        wrapper_class = _BoundLogger
+
+    if _async_writer is not None:
+        _async_writer.shutdown()
+        _async_writer = None
+
+    if async_mode:
+        _async_writer = AsyncLogWriter(
+            render_processors,
+            stream=stream,
+            queue_size=config["queue_size"],
+            batch_size=config["batch_size"],
+            overflow_policy=config["overflow_policy"],
+            flush_interval=config["flush_interval"],
+        )
+        atexit.register(_async_writer.shutdown)
+        processors = processors + [_async_writer]
+        if not renders_bytes:
+            # The writer bypasses the stdlib handlers, so apply their level here
+            processors = [structlog.stdlib.filter_by_level] + processors
+        startup_print(f"✓ Async logging enabled (queue={config['queue_size']}, overflow={config['overflow_policy']})")
+    else:
+        processors = processors + render_processors
+
+    if flight_recorder is not None:
+        # First, so buffered events skip everything else until they are
+        # flushed; the stdlib level filter would drop them on replay
+        flight_recorder.set_replay_processors([p for p in processors if p is not structlog.stdlib.filter_by_level], timestamper)
+        processors = [flight_recorder] + processors
+        wrapper_class = flight_recorder.wrap_class(wrapper_class)
 
     structlog.configure(
         processors=processors,
         context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        logger_factory=logger_factory,
+        wrapper_class=wrapper_class,
         cache_logger_on_first_use=True,
     )
 
@@ -147,4 +304,12 @@ def init_logging(service_name: Optional[str] = None, environment: str = "develop
     else:
         log = log.bind(environment=environment)
     
-    return log
\ No newline at end of file
+    return log
+
+
+def shutdown_logging(timeout: Optional[float] = 5.0):
+    """Flush and stop the async log writer, if one is running."""
+    global _async_writer
+    if _async_writer is not None:
+        _async_writer.shutdown(timeout)
+        _async_writer = None
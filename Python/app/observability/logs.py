@@ -5,10 +5,16 @@ from opentelemetry.sdk.resources import Resource
 from .config import (
     _LOGS_AVAILABLE,
     LoggerProvider,
-    OTLPLogExporter,
     BatchLogRecordProcessor,
-    set_otel_logger_provider
+    set_otel_logger_provider,
+    get_exporter_config,
+    get_metrics_config,
+    get_otlp_endpoint,
+    startup_print,
 )
+from .exporters import create_exporter
+from .pipeline_metrics import MonitoredBatchLogRecordProcessor
+from .workers import service_instance_id
 
 
 def init_logs(service_name: Optional[str] = None, otlp_endpoint: Optional[str] = None):
@@ -19,19 +25,22 @@ def init_logs(service_name: Optional[str] = None, otlp_endpoint: Optional[str] =
 
     try:
         service_name = service_name or os.getenv("OTEL_SERVICE_NAME", "SampleServicePython")
-        otlp_endpoint = otlp_endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", os.getenv("OpenTelemetry__OtlpEndpoint", "http://localhost:4317"))
+        otlp_endpoint = otlp_endpoint or get_otlp_endpoint()
         
         resource = Resource.create({
             "service.name": service_name,
             "service.version": "1.0.0",
+            "service.instance.id": service_instance_id(),
             "deployment.environment": os.getenv("ENVIRONMENT", "development"),
         })
         
-        print(f"Initializing OTEL Logs: service={service_name}, endpoint={otlp_endpoint}", file=sys.stderr)
+        startup_print(f"Initializing OTEL Logs: service={service_name}, endpoint={otlp_endpoint}")
         
         provider = LoggerProvider(resource=resource)
-        exporter = OTLPLogExporter(endpoint=otlp_endpoint)
-        processor = BatchLogRecordProcessor(exporter)
+        exporter_config = get_exporter_config()
+        exporter = create_exporter("logs", otlp_endpoint, exporter_config)
+        processor_class = MonitoredBatchLogRecordProcessor if get_metrics_config()["pipeline_metrics_enabled"] else BatchLogRecordProcessor
+        processor = processor_class(exporter, **exporter_config["log_batch"])
         provider.add_log_record_processor(processor)
         
         set_otel_logger_provider(provider)
@@ -39,7 +48,7 @@ def init_logs(service_name: Optional[str] = None, otlp_endpoint: Optional[str] =
         from opentelemetry import _logs as logs_api
         logs_api.set_logger_provider(provider)
         
-        print("✓ OTEL Logs initialized successfully", file=sys.stderr)
+        startup_print("✓ OTEL Logs initialized successfully")
         return provider
     except Exception as e:
         import traceback
@@ -1,32 +1,94 @@
 import os
+from typing import Optional
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
-from .config import _PROM_AVAILABLE
+from opentelemetry.sdk.metrics.view import View, ExplicitBucketHistogramAggregation
+from .config import _PROM_AVAILABLE, get_metrics_config, get_metrics_endpoint_config, get_exporter_config, get_otlp_endpoint, get_worker_config
+from .exporters import create_exporter
+from .pipeline_metrics import EXPORT_BATCH_SIZE, DEFAULT_BATCH_SIZE_BUCKETS, METER_NAME as PIPELINE_METER
+from .request_metrics import REQUEST_DURATION, DEFAULT_DURATION_BUCKETS_MS, METER_NAME as REQUEST_METER
+from .span_metrics import SPAN_DURATION, METER_NAME as SPAN_METER
+from .runtime_monitor import LOOP_LAG, GC_PAUSE, DEFAULT_PAUSE_BUCKETS_MS, METER_NAME as RUNTIME_METER
+from .workers import WorkerSnapshotExporter, service_instance_id
 
 
-def init_metrics(service_name: str = "SampleServicePython", otlp_endpoint: str = "http://localhost:4317"):
+def init_metrics(service_name: str = "SampleServicePython", otlp_endpoint: Optional[str] = None):
     """Initialize OpenTelemetry metrics."""
     service_name = service_name or os.getenv("OTEL_SERVICE_NAME", "SampleServicePython")
-    otlp_endpoint = otlp_endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", os.getenv("OpenTelemetry__OtlpEndpoint", "http://localhost:4317"))
+    otlp_endpoint = otlp_endpoint or get_otlp_endpoint()
     
     resource = Resource.create({
         "service.name": service_name,
+        "service.instance.id": service_instance_id(),
     })
 
+    # Request and span duration buckets in milliseconds, overridable with HTTP_DURATION_BUCKETS_MS.
+    # Each view is scoped to the meter that creates the instrument, so an
+    # instrumentation library's histogram of the same name keeps its own buckets
+    boundaries = get_metrics_config()["duration_buckets_ms"] or DEFAULT_DURATION_BUCKETS_MS
+    views = [
+        View(
+            instrument_name=REQUEST_DURATION,
+            meter_name=REQUEST_METER,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=boundaries),
+        ),
+        View(
+            instrument_name=SPAN_DURATION,
+            meter_name=SPAN_METER,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=boundaries),
+        ),
+        View(
+            instrument_name=EXPORT_BATCH_SIZE,
+            meter_name=PIPELINE_METER,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=DEFAULT_BATCH_SIZE_BUCKETS),
+        ),
+        View(
+            instrument_name=LOOP_LAG,
+            meter_name=RUNTIME_METER,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=DEFAULT_PAUSE_BUCKETS_MS),
+        ),
+        View(
+            instrument_name=GC_PAUSE,
+            meter_name=RUNTIME_METER,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=DEFAULT_PAUSE_BUCKETS_MS),
+        ),
+    ]
+
     try:
-        if _PROM_AVAILABLE:
-            from opentelemetry.exporter.prometheus import PrometheusMetricReader
-            reader = PrometheusMetricReader()
-            meter_provider = MeterProvider(resource=resource, metric_readers=[reader])
-        else:
-            exporter = OTLPMetricExporter(endpoint=otlp_endpoint)
-            reader = PeriodicExportingMetricReader(exporter)
-            meter_provider = MeterProvider(resource=resource, metric_readers=[reader])
+        reader = create_metric_reader(otlp_endpoint)
+        meter_provider = MeterProvider(resource=resource, metric_readers=[reader], views=views)
         
         from opentelemetry import metrics
         metrics.set_meter_provider(meter_provider)
         return meter_provider
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def create_metric_reader(otlp_endpoint: str):
+    """Pick the metric reader: worker snapshots, the Prometheus reader or OTLP push.
+
+    The Prometheus reader only holds metrics until something scrapes them, so
+    it is used only when the scrape endpoint is enabled; otherwise metrics are
+    pushed over OTLP even if the Prometheus exporter is installed.
+    """
+    worker_config = get_worker_config()
+    if worker_config["metrics_dir"]:
+        # Multi-worker mode: each worker writes snapshots that the /metrics
+        # endpoint merges, since a per-process Prometheus reader would only
+        # see the counters of whichever worker served the scrape
+        return PeriodicExportingMetricReader(
+            WorkerSnapshotExporter(worker_config["metrics_dir"]),
+            export_interval_millis=worker_config["snapshot_interval_millis"],
+        )
+    if _PROM_AVAILABLE and get_metrics_endpoint_config()["enabled"]:
+        from opentelemetry.exporter.prometheus import PrometheusMetricReader
+        return PrometheusMetricReader()
+    exporter_config = get_exporter_config()
+    exporter = create_exporter("metrics", otlp_endpoint, exporter_config)
+    return PeriodicExportingMetricReader(
+        exporter,
+        export_interval_millis=exporter_config["metric_export_interval_millis"],
+        export_timeout_millis=exporter_config["metric_export_timeout_millis"],
+    )
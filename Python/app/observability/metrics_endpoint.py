@@ -0,0 +1,186 @@
+import gzip
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from opentelemetry import metrics
+from .config import _PROM_AVAILABLE, get_worker_config
+
+_GZIP_LEVEL = 6
+
+
+class _Snapshot:
+    __slots__ = ("rendered_at", "body", "gzipped")
+
+    def __init__(self, rendered_at: float, body: bytes):
+        self.rendered_at = rendered_at
+        self.body = body
+        self.gzipped = None
+
+
+class ScrapeCache:
+    """Prometheus text exposition of ``registry``, rendered at most once per ``ttl_seconds``.
+
+    Rendering runs a full collection of the meter provider (and, with
+    several workers, reads every worker's snapshot file), so scrapers that
+    arrive within the TTL, from a second Prometheus replica or a retry, get
+    the same bytes. A scraper that finds the snapshot expired renders it
+    while concurrent ones wait for that result instead of rendering again.
+    The gzip form is compressed once per snapshot, on first request.
+    """
+
+    def __init__(self, registry, ttl_seconds: float = 5.0):
+        self._registry = registry
+        self._ttl = max(ttl_seconds, 0.0)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.cached = 0
+
+        meter = metrics.get_meter("app.observability.metrics_endpoint")
+        meter.create_observable_counter(
+            "metrics.endpoint.scrapes",
+            callbacks=[self._observe_scrapes],
+            unit="{scrape}",
+            description="Scrapes of the metrics endpoint, served from the cached snapshot or rendered",
+        )
+
+    def _observe_scrapes(self, options):
+        return [
+            metrics.Observation(self.cached, {"outcome": "cached"}),
+            metrics.Observation(self.rendered, {"outcome": "rendered"}),
+        ]
+
+    def _fresh(self) -> Optional[_Snapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.rendered_at < self._ttl:
+            return snapshot
+        return None
+
+    def cached_body(self, gzipped: bool = False) -> Optional[bytes]:
+        """The body from a snapshot that is still fresh, or None if getting it needs rendering or compressing."""
+        snapshot = self._fresh()
+        if snapshot is None:
+            return None
+        body = snapshot.gzipped if gzipped else snapshot.body
+        if body is not None:
+            self.cached += 1
+        return body
+
+    def body(self, gzipped: bool = False) -> bytes:
+        """The exposition text (gzip-compressed if ``gzipped``), rendering a new snapshot if the last one expired."""
+        from prometheus_client import generate_latest
+
+        snapshot = self._fresh()
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._fresh()
+                if snapshot is None:
+                    started = time.monotonic()
+                    snapshot = _Snapshot(started, generate_latest(self._registry))
+                    self._snapshot = snapshot
+                    self.rendered += 1
+                else:
+                    self.cached += 1
+        else:
+            self.cached += 1
+        if not gzipped:
+            return snapshot.body
+        if snapshot.gzipped is None:
+            with self._lock:
+                if snapshot.gzipped is None:
+                    snapshot.gzipped = gzip.compress(snapshot.body, compresslevel=_GZIP_LEVEL)
+        return snapshot.gzipped
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    return accept_encoding is not None and "gzip" in accept_encoding.lower()
+
+
+def app_metrics_path(endpoint_config: dict) -> Optional[str]:
+    """Path of the endpoint when the app itself serves it (enabled, without ``METRICS_PORT``), else None."""
+    if endpoint_config["enabled"] and endpoint_config["port"] is None:
+        return endpoint_config["path"]
+    return None
+
+
+def metrics_registry():
+    """The registry to expose: all workers merged with ``METRICS_MULTIPROCESS_DIR``, else the Prometheus reader's; None if neither."""
+    metrics_dir = get_worker_config()["metrics_dir"]
+    if metrics_dir:
+        from .workers import create_multiprocess_registry
+        return create_multiprocess_registry(metrics_dir)
+    if _PROM_AVAILABLE:
+        # PrometheusMetricReader registers its collector here
+        from prometheus_client import REGISTRY
+        return REGISTRY
+    return None
+
+
+def create_metrics_endpoint(cache: ScrapeCache):
+    """Starlette endpoint serving ``cache``.
+
+    A fresh snapshot is served on the event loop; rendering or compressing
+    a new one runs in the threadpool, so a scrape never blocks the loop.
+    """
+    from prometheus_client import CONTENT_TYPE_LATEST
+    from starlette.concurrency import run_in_threadpool
+    from starlette.responses import Response
+
+    async def metrics_endpoint(request):
+        gzipped = _accepts_gzip(request.headers.get("accept-encoding"))
+        body = cache.cached_body(gzipped)
+        if body is None:
+            body = await run_in_threadpool(cache.body, gzipped)
+        headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if gzipped else {"Vary": "Accept-Encoding"}
+        return Response(body, media_type=CONTENT_TYPE_LATEST, headers=headers)
+
+    return metrics_endpoint
+
+
+class MetricsServer:
+    """Serves ``cache`` at ``path`` from a listener thread of its own, outside the app and its middleware.
+
+    With several workers only the first one to bind ``port`` serves it;
+    every worker renders the same merged metrics.
+    """
+
+    def __init__(self, cache: ScrapeCache, host: str = "0.0.0.0", port: int = 9464, path: str = "/metrics"):
+        from prometheus_client import CONTENT_TYPE_LATEST
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != path:
+                    self.send_error(404)
+                    return
+                gzipped = _accepts_gzip(self.headers.get("Accept-Encoding"))
+                try:
+                    body = cache.body(gzipped)
+                except Exception as e:
+                    print(f"Error rendering metrics: {e}", file=sys.stderr)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Vary", "Accept-Encoding")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,245 @@
+import sys
+import threading
+import time
+from opentelemetry import metrics
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from .config import BatchLogRecordProcessor
+
+QUEUE_SIZE = "otel.pipeline.queue.size"
+QUEUE_CAPACITY = "otel.pipeline.queue.capacity"
+DROPPED = "otel.pipeline.dropped"
+EXPORTED = "otel.pipeline.exported"
+EXPORT_BATCH_SIZE = "otel.pipeline.export.batch_size"
+EXPORT_DURATION = "otel.pipeline.export.duration"
+EXPORT_FAILURES = "otel.pipeline.export.failures"
+FORWARDER_ERRORS = "otel.pipeline.log_forwarder.errors"
+
+METER_NAME = "app.observability.pipeline_metrics"
+
+DEFAULT_BATCH_SIZE_BUCKETS = (1, 16, 64, 128, 256, 512, 1024, 2048, 4096)
+
+_MAX_ERROR_TYPES = 32
+# Private fields of the SDK's shared batch processor (opentelemetry-sdk 1.38)
+_BATCH_INTERNALS = ("_queue", "_max_queue_size", "emit")
+
+
+def _batch_internals(processor, signal: str):
+    """The queue, capacity and emit of ``processor``'s SDK batch processor, or None if this SDK lays them out differently."""
+    batch = getattr(processor, "_batch_processor", None)
+    if batch is None or not all(hasattr(batch, name) for name in _BATCH_INTERNALS):
+        print(
+            f"Warning: this opentelemetry-sdk has no batch queue internals to monitor; "
+            f"{signal} queue size and drops are not reported",
+            file=sys.stderr,
+        )
+        return None
+    return batch._queue, batch._max_queue_size, batch.emit
+
+
+class PipelineMetrics:
+    """Metrics about the telemetry pipeline itself, published through the global ``MeterProvider``.
+
+    Nothing here runs on the request path except the drop check in the
+    monitored batch processors (a queue length comparison). Queue depth,
+    drops and forwarder errors are plain counters read by observable
+    instruments at collection time; export batch size, latency and
+    failures are recorded on the exporter's background thread.
+    """
+
+    def __init__(self, meter=None):
+        meter = meter or metrics.get_meter(METER_NAME)
+        self._processors = []
+        self._forwarder_errors = {}
+        self._lock = threading.Lock()
+
+        meter.create_observable_gauge(
+            QUEUE_SIZE,
+            callbacks=[self._observe_queue_size],
+            unit="{item}",
+            description="Spans or log records waiting in the batch processor queue",
+        )
+        meter.create_observable_gauge(
+            QUEUE_CAPACITY,
+            callbacks=[self._observe_queue_capacity],
+            unit="{item}",
+            description="Batch processor queue capacity; items beyond it are dropped",
+        )
+        meter.create_observable_counter(
+            DROPPED,
+            callbacks=[self._observe_dropped],
+            unit="{item}",
+            description="Spans or log records dropped because the batch processor queue was full",
+        )
+        meter.create_observable_counter(
+            FORWARDER_ERRORS,
+            callbacks=[self._observe_forwarder_errors],
+            unit="{error}",
+            description="structlog events the OTEL log forwarder failed to emit, by exception type",
+        )
+        self._exported = meter.create_counter(
+            EXPORTED,
+            unit="{item}",
+            description="Items handed to the exporter, by signal and outcome (success, failure)",
+        )
+        self._batch_size = meter.create_histogram(
+            EXPORT_BATCH_SIZE,
+            unit="{item}",
+            description="Items per export call",
+        )
+        self._duration = meter.create_histogram(
+            EXPORT_DURATION,
+            unit="ms",
+            description="Export call duration",
+        )
+        self._failures = meter.create_counter(
+            EXPORT_FAILURES,
+            unit="{export}",
+            description="Export calls that failed or raised",
+        )
+        self._signal_attributes = {}
+
+    def _attributes(self, signal: str) -> dict:
+        attributes = self._signal_attributes.get(signal)
+        if attributes is None:
+            attributes = self._signal_attributes.setdefault(signal, {"signal": signal})
+        return attributes
+
+    def watch_processor(self, signal: str, processor):
+        """Report the queue of a monitored batch processor under ``signal``."""
+        with self._lock:
+            self._processors.append((signal, processor))
+
+    def _observe_queue_size(self, options):
+        return [metrics.Observation(len(processor._queue), self._attributes(signal)) for signal, processor in self._processors]
+
+    def _observe_queue_capacity(self, options):
+        return [metrics.Observation(processor._capacity, self._attributes(signal)) for signal, processor in self._processors]
+
+    def _observe_dropped(self, options):
+        return [metrics.Observation(processor.dropped, self._attributes(signal)) for signal, processor in self._processors]
+
+    def record_forwarder_error(self, exc: Exception):
+        error_type = type(exc).__name__
+        if error_type not in self._forwarder_errors and len(self._forwarder_errors) >= _MAX_ERROR_TYPES:
+            error_type = "other"
+        self._forwarder_errors[error_type] = self._forwarder_errors.get(error_type, 0) + 1
+
+    def _observe_forwarder_errors(self, options):
+        return [
+            metrics.Observation(count, {"error.type": error_type})
+            for error_type, count in list(self._forwarder_errors.items())
+        ]
+
+    def record_export(self, signal: str, items: int, duration_ms: float, failed: bool):
+        attributes = self._attributes(signal)
+        self._batch_size.record(items, attributes)
+        self._duration.record(duration_ms, attributes)
+        self._exported.add(items, {"signal": signal, "outcome": "failure" if failed else "success"})
+        if failed:
+            self._failures.add(1, attributes)
+
+
+_pipeline_metrics = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline_metrics() -> PipelineMetrics:
+    """The process-wide ``PipelineMetrics``; its instruments follow the global meter provider once it is set."""
+    global _pipeline_metrics
+    if _pipeline_metrics is None:
+        with _pipeline_lock:
+            if _pipeline_metrics is None:
+                _pipeline_metrics = PipelineMetrics()
+    return _pipeline_metrics
+
+
+def _metric_data_points(metrics_data) -> int:
+    return sum(
+        len(metric.data.data_points)
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    )
+
+
+class InstrumentedExporter:
+    """Wraps a span, log or metric exporter to record batch size, duration and failures of each export."""
+
+    def __init__(self, exporter, signal: str, pipeline_metrics: PipelineMetrics = None):
+        self._exporter = exporter
+        self._signal = signal
+        self._pipeline_metrics = pipeline_metrics or get_pipeline_metrics()
+
+    def export(self, batch, *args, **kwargs):
+        items = _metric_data_points(batch) if self._signal == "metrics" else len(batch)
+        start = time.perf_counter()
+        try:
+            result = self._exporter.export(batch, *args, **kwargs)
+        except Exception:
+            self._pipeline_metrics.record_export(self._signal, items, (time.perf_counter() - start) * 1000, True)
+            raise
+        # SpanExportResult, LogExportResult and MetricExportResult all name it FAILURE
+        failed = getattr(result, "name", None) == "FAILURE"
+        self._pipeline_metrics.record_export(self._signal, items, (time.perf_counter() - start) * 1000, failed)
+        return result
+
+    def shutdown(self, *args, **kwargs):
+        return self._exporter.shutdown(*args, **kwargs)
+
+    def force_flush(self, *args, **kwargs):
+        return self._exporter.force_flush(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Metric readers read _preferred_temporality/_preferred_aggregation
+        return getattr(self._exporter, name)
+
+
+class MonitoredBatchSpanProcessor(BatchSpanProcessor):
+    """``BatchSpanProcessor`` that counts spans dropped on a full queue and reports its queue depth."""
+
+    def __init__(self, span_exporter, *args, **kwargs):
+        super().__init__(span_exporter, *args, **kwargs)
+        self.dropped = 0
+        # The SDK's queue is a bounded deque that silently discards its
+        # oldest item when full; the deque is kept (cleared) across forks
+        internals = _batch_internals(self, "traces")
+        self._emit = None
+        if internals is not None:
+            self._queue, self._capacity, self._emit = internals
+            get_pipeline_metrics().watch_processor("traces", self)
+
+    def on_end(self, span):
+        if self._emit is None:
+            # Unknown SDK layout: behave as a plain BatchSpanProcessor
+            return super().on_end(span)
+        # Same as BatchSpanProcessor.on_end plus the full-queue check
+        if not span.context.trace_flags.sampled:
+            return
+        if len(self._queue) >= self._capacity:
+            self.dropped += 1
+        self._emit(span)
+
+
+if BatchLogRecordProcessor is not None:
+
+    class MonitoredBatchLogRecordProcessor(BatchLogRecordProcessor):
+        """``BatchLogRecordProcessor`` that counts records dropped on a full queue and reports its queue depth."""
+
+        def __init__(self, exporter, *args, **kwargs):
+            super().__init__(exporter, *args, **kwargs)
+            self.dropped = 0
+            internals = _batch_internals(self, "logs")
+            self._emit = None
+            if internals is not None:
+                self._queue, self._capacity, self._emit = internals
+                get_pipeline_metrics().watch_processor("logs", self)
+
+        def on_emit(self, log_data):
+            if self._emit is None:
+                return super().on_emit(log_data)
+            if len(self._queue) >= self._capacity:
+                self.dropped += 1
+            self._emit(log_data)
+
+else:
+    MonitoredBatchLogRecordProcessor = None
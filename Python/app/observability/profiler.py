@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import threading
+from contextvars import Context
+from datetime import datetime, timezone
+from typing import Optional
+from opentelemetry import metrics
+from .config import _LOGS_AVAILABLE, LogRecord, SeverityNumber, get_otel_logger_provider, startup_print
+from .context import get_published_request_context, get_request_context_in
+
+OUTPUT_COLLAPSED = "collapsed"
+OUTPUT_OTLP = "otlp"
+OUTPUTS = (OUTPUT_COLLAPSED, OUTPUT_OTLP)
+
+_NO_REQUEST = "(no request)"
+_TRUNCATED = "(truncated)"
+# Frames deeper than this are not even walked
+_MAX_WALK = 512
+
+
+def _middleware_request(frame):
+    return get_published_request_context(frame)
+
+
+def _worker_request(frame):
+    # anyio's worker thread runs each sync handler in a copy of the request's
+    # context, which it only holds in a local of its loop; nothing of ours runs
+    # on that thread to publish it. Reading f_locals fills the frame's locals
+    # dict (which only such readers use) and leaves its fast locals alone, as
+    # WorkerThread.run has no free variables. A blocked thread's stack is
+    # cached, so its locals are only read again once the thread moves on
+    context = frame.f_locals.get("context")
+    return get_request_context_in(context) if isinstance(context, Context) else None
+
+
+# Frames that know which request their thread is serving, by code qualified name
+_REQUEST_FRAMES = {
+    "ObservabilityMiddleware.__call__": _middleware_request,
+    "WorkerThread.run": _worker_request,
+}
+
+
+class SamplingProfiler:
+    """Statistical wall-clock profiler that attributes stacks to requests.
+
+    A daemon thread takes the stack of every other thread from
+    ``sys._current_frames()`` ``hz`` times a second. A thread is serving a
+    request if its stack holds ``ObservabilityMiddleware.__call__`` (the
+    event loop, while a request's coroutine runs) or anyio's worker loop
+    (Starlette's threadpool, running a sync handler in the request's
+    context); the sample is tagged with that request's trace, span and
+    route template. Other threads are skipped unless ``all_threads``.
+
+    Code objects and stacks are interned, so a sample is a counter
+    increment on ``(stack id, request)``. Every ``export_interval_seconds``
+    the counts are written as collapsed stacks (``route;frame;...;frame
+    count``, one file per interval in ``output_dir``) and/or emitted as one
+    OTLP log record per request, carrying its trace and span IDs so the
+    backend links it to the span. If taking samples costs more than
+    ``max_overhead`` of one core, the interval is stretched to stay under it.
+    """
+
+    def __init__(
+        self,
+        hz: float = 49.0,
+        export_interval_seconds: float = 60.0,
+        outputs=(OUTPUT_COLLAPSED,),
+        output_dir: str = "profiles",
+        max_files: int = 60,
+        max_depth: int = 64,
+        max_overhead: float = 0.01,
+        all_threads: bool = False,
+    ):
+        self._base_interval = 1.0 / max(hz, 0.001)
+        self._interval = self._base_interval
+        self._export_interval = export_interval_seconds
+        self._outputs = frozenset(o for o in outputs if o in OUTPUTS)
+        self._output_dir = output_dir
+        self._max_files = max_files
+        self._max_depth = max(max_depth, 1)
+        self._max_overhead = max(max_overhead, 0.0001)
+        self._all_threads = all_threads
+
+        self._frame_ids = {}
+        self._frame_names = []
+        self._request_extractors = {}
+        self._stack_ids = {}
+        self._stacks = []
+        self._counts = {}
+        self._last_stacks = {}
+        self._interval_start = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.sampling_seconds = 0.0
+
+        meter = metrics.get_meter("app.observability.profiler")
+        meter.create_observable_counter(
+            "profiler.samples",
+            callbacks=[lambda options: [metrics.Observation(self.samples)]],
+            unit="{sample}",
+            description="Thread stacks sampled by the profiler",
+        )
+        meter.create_observable_gauge(
+            "profiler.interval",
+            callbacks=[lambda options: [metrics.Observation(self._interval * 1000)]],
+            unit="ms",
+            description="Current sampling interval, above 1/hz when the overhead cap stretches it",
+        )
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        next_export = time.monotonic() + self._export_interval
+        while not self._stop.wait(self._interval):
+            # CPU time of this thread: waiting for the GIL costs the app nothing
+            started = time.thread_time()
+            try:
+                self.sample(me)
+            except Exception as e:
+                print(f"Error sampling stacks: {e}", file=sys.stderr)
+            cost = time.thread_time() - started
+            self.sampling_seconds += cost
+            self._interval = max(self._base_interval, cost / self._max_overhead)
+            if time.monotonic() >= next_export:
+                next_export = time.monotonic() + self._export_interval
+                self.export()
+
+    def _frame_id(self, code) -> int:
+        """Intern a code object the first time it is seen on a stack."""
+        frame_id = self._frame_ids[code] = len(self._frame_names)
+        name = getattr(code, "co_qualname", code.co_name)
+        self._frame_names.append(f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        self._request_extractors[code] = _REQUEST_FRAMES.get(name)
+        return frame_id
+
+    def sample(self, skip_thread: Optional[int] = None):
+        """Take one sample of every thread but ``skip_thread``."""
+        frame_ids = self._frame_ids
+        extractors = self._request_extractors
+        last = self._last_stacks
+        current = {}
+        samples = []
+        for thread_id, leaf in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            # A thread still at the same instruction of the same leaf frame is
+            # blocked there (e.g. an idle worker), so its stack has not changed.
+            # Frames are remembered by id, not kept alive; the code object
+            # guards against a new frame reusing a dead one's address
+            previous = last.get(thread_id)
+            if (previous is not None and previous[0] == id(leaf) and previous[1] == leaf.f_lasti
+                    and previous[2] is leaf.f_code):
+                current[thread_id] = previous
+                stack, request_context = previous[3], previous[4]
+            else:
+                ids = []
+                request_context = None
+                frame = leaf
+                while frame is not None and len(ids) < _MAX_WALK:
+                    code = frame.f_code
+                    frame_id = frame_ids.get(code)
+                    ids.append(self._frame_id(code) if frame_id is None else frame_id)
+                    extractor = extractors[code]
+                    if extractor is not None and request_context is None:
+                        request_context = extractor(frame)
+                    frame = frame.f_back
+                if len(ids) > self._max_depth:
+                    ids = ids[:self._max_depth]
+                    ids.append(-1)
+                stack = tuple(reversed(ids))
+                current[thread_id] = (id(leaf), leaf.f_lasti, leaf.f_code, stack, request_context)
+            if request_context is not None or self._all_threads:
+                samples.append((stack, request_context))
+        self._last_stacks = current
+
+        with self._lock:
+            stack_ids, stacks, counts = self._stack_ids, self._stacks, self._counts
+            for stack, request_context in samples:
+                stack_id = stack_ids.get(stack)
+                if stack_id is None:
+                    stack_id = stack_ids[stack] = len(stacks)
+                    stacks.append(stack)
+                key = (stack_id, request_context)
+                counts[key] = counts.get(key, 0) + 1
+        self.samples += len(samples)
+
+    def _take(self):
+        with self._lock:
+            counts, stacks = self._counts, self._stacks
+            self._counts, self._stacks, self._stack_ids = {}, [], {}
+            started, self._interval_start = self._interval_start, time.time()
+        return counts, stacks, started
+
+    def _collapsed(self, stacks: list, stack_id: int) -> str:
+        names = self._frame_names
+        return ";".join(names[i] if i >= 0 else _TRUNCATED for i in stacks[stack_id])
+
+    def export(self):
+        """Write the samples since the last export and start a new interval."""
+        counts, stacks, started = self._take()
+        if not counts:
+            return
+        if OUTPUT_COLLAPSED in self._outputs:
+            try:
+                self._write_collapsed(counts, stacks, started)
+            except OSError as e:
+                print(f"Error writing profile: {e}", file=sys.stderr)
+        if OUTPUT_OTLP in self._outputs:
+            self._emit_otlp(counts, stacks)
+
+    def _write_collapsed(self, counts: dict, stacks: list, started: float):
+        lines = {}
+        for (stack_id, request_context), count in counts.items():
+            route = _NO_REQUEST if request_context is None else request_context.route or request_context.path
+            line = f"{route};{self._collapsed(stacks, stack_id)}"
+            lines[line] = lines.get(line, 0) + count
+
+        os.makedirs(self._output_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(started, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        prefix = f"profile-{os.getpid()}-"
+        path = os.path.join(self._output_dir, f"{prefix}{stamp}.folded")
+        with open(path, "w") as f:
+            f.writelines(f"{line} {count}\n" for line, count in lines.items())
+
+        if self._max_files > 0:
+            own = sorted(name for name in os.listdir(self._output_dir) if name.startswith(prefix))
+            for name in own[:-self._max_files]:
+                os.remove(os.path.join(self._output_dir, name))
+
+    def _emit_otlp(self, counts: dict, stacks: list):
+        provider = get_otel_logger_provider()
+        if not _LOGS_AVAILABLE or provider is None:
+            return
+        by_request = {}
+        for (stack_id, request_context), count in counts.items():
+            by_request.setdefault(request_context, []).append(f"{self._collapsed(stacks, stack_id)} {count}")
+
+        otel_logger = provider.get_logger("app.observability.profiler")
+        for request_context, lines in by_request.items():
+            attributes = {
+                "profile.format": OUTPUT_COLLAPSED,
+                "profile.samples": sum(int(line.rsplit(" ", 1)[1]) for line in lines),
+                "profile.hz": round(1.0 / self._base_interval, 3),
+            }
+            trace_id = span_id = trace_flags = None
+            if request_context is not None:
+                attributes["http.route"] = request_context.route or request_context.path
+                ctx = request_context.span_context
+                if ctx is not None and ctx.trace_id:
+                    trace_id, span_id, trace_flags = ctx.trace_id, ctx.span_id, ctx.trace_flags
+            try:
+                otel_logger.emit(LogRecord(
+                    timestamp=time.time_ns(),
+                    trace_id=trace_id,
+                    span_id=span_id,
+                    trace_flags=trace_flags,
+                    severity_text="INFO",
+                    severity_number=SeverityNumber.INFO,
+                    body="\n".join(lines),
+                    resource=provider.resource,
+                    attributes=attributes,
+                ))
+            except Exception as e:
+                print(f"Error emitting profile record: {e}", file=sys.stderr)
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Stop sampling and export what was collected since the last interval."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.export()
+
+
+def create_profiler(profiler_config: dict) -> Optional[SamplingProfiler]:
+    """Start the ``SamplingProfiler`` described by ``get_profiler_config()``, or return None if it is off."""
+    if not profiler_config["enabled"]:
+        return None
+    unknown = [o for o in profiler_config["outputs"] if o not in OUTPUTS]
+    if unknown:
+        print(f"Warning: unknown profiler outputs {unknown}, expected {list(OUTPUTS)}", file=sys.stderr)
+    profiler = SamplingProfiler(
+        hz=profiler_config["hz"],
+        export_interval_seconds=profiler_config["export_interval_seconds"],
+        outputs=profiler_config["outputs"],
+        output_dir=profiler_config["output_dir"],
+        max_files=profiler_config["max_files"],
+        max_depth=profiler_config["max_depth"],
+        max_overhead=profiler_config["max_overhead"],
+        all_threads=profiler_config["all_threads"],
+    )
+    profiler.start()
+    startup_print(f"✓ Profiler started ({profiler_config['hz']} Hz, outputs={profiler_config['outputs']})")
+    return profiler
@@ -0,0 +1,313 @@
+import os
+import re
+import sys
+from typing import Iterable, Optional
+from opentelemetry.sdk.trace import Event, SpanProcessor
+
+REDACTED = "[REDACTED]"
+
+# The collector config whose ``attributes`` processor lists the sensitive keys
+DEFAULT_KEYS_FILE = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "config", "otel-collector-config.yaml")
+)
+
+# Copy of the keys in DEFAULT_KEYS_FILE, used only when no collector config
+# can be read (e.g. an image that ships without the ``config`` directory)
+DEFAULT_SENSITIVE_KEYS = (
+    # Authentication & credentials
+    "user.password", "password", "user.token", "auth.token", "authorization",
+    "api.key", "api_key", "access.token", "refresh.token", "bearer.token",
+    "jwt", "session.id", "session.token",
+    # Personal information
+    "user.ssn", "ssn", "social.security.number", "user.email", "email",
+    "email.address", "user.phone", "phone", "phone.number", "user.address",
+    "address", "user.ip", "ip.address", "user.name", "full.name", "user.dob",
+    "date.of.birth", "birthdate",
+    # Financial
+    "user.credit_card", "credit.card", "credit.card.number", "card.number",
+    "cvv", "card.cvv", "bank.account", "account.number", "routing.number",
+    "iban", "payment.method",
+    # Health
+    "medical.record", "health.record", "patient.id", "diagnosis", "prescription",
+    # Infrastructure secrets
+    "db.password", "database.password", "db.connection.string",
+    "connection.string", "private.key", "secret.key", "encryption.key",
+)
+
+DEFAULT_KEY_PATTERNS = (
+    r"passw(or)?d",
+    r"secret",
+    r"(^|\.)(access|auth|bearer|refresh|session|id)\.?token$",
+    r"(^|\.)api\.?key$",
+    r"(^|\.)authorization$",
+)
+
+# Sensitive values inside any string, selected by name: (substrings one of
+# which must occur, regex). The substring test is far cheaper than running
+# a regex over every string, so the regex only runs on candidates; a
+# scanner without substrings ("card") runs its regex on every string.
+VALUE_SCANNERS = {
+    "jwt": (("eyJ",), r"\beyJ[\w-]+\.eyJ[\w-]+\.[\w-]+"),
+    "bearer": (("earer",), r"\b[Bb]earer\s+[\w\-.~+/]+=*"),
+    "email": (("@",), r"\b[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b"),
+    "card": ((), r"\b(?:\d[ -]?){12,18}\d\b"),
+    # user:password of a URL or DSN, as in connection errors
+    "dsn": (("://",), r"(?<=://)[^/\s:@]+:[^/\s@]+(?=@)"),
+}
+DEFAULT_VALUE_SCANNERS = ("jwt", "bearer", "email", "dsn")
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_MAX_DEPTH = 6
+_CONTAINERS = (dict, list, tuple)
+_EMPTY = {}
+
+
+def normalize_key(key: str) -> str:
+    """``apiKey``, ``api_key``, ``API-Key`` and ``api.key`` all become ``api.key``."""
+    return _CAMEL_BOUNDARY.sub(".", key).lower().replace("_", ".").replace("-", ".")
+
+
+def load_collector_keys(path: str) -> tuple:
+    """(keys, patterns) deleted or hashed by the ``attributes`` processor of a collector config file."""
+    with open(path) as f:
+        text = f.read()
+    try:
+        import yaml
+    except ImportError:
+        yaml = None
+
+    if yaml is not None:
+        config = yaml.safe_load(text) or {}
+        actions = (((config.get("processors") or {}).get("attributes") or {}).get("actions")) or []
+    else:
+        # Without PyYAML, read the flat "- key: ... / action: ..." list directly
+        actions, current = [], None
+        for line in text.splitlines():
+            stripped = line.strip()
+            if stripped.startswith("- key:") or stripped.startswith("- pattern:"):
+                current = {}
+                actions.append(current)
+                stripped = stripped[2:]
+            name, sep, value = stripped.partition(":")
+            if current is not None and sep and name in ("key", "pattern", "action"):
+                current[name] = value.strip().strip("'\"")
+
+    keys, patterns = [], []
+    for action in actions:
+        if not isinstance(action, dict) or action.get("action") not in ("delete", "hash"):
+            continue
+        if action.get("key"):
+            keys.append(action["key"])
+        if action.get("pattern"):
+            patterns.append(action["pattern"])
+    return keys, patterns
+
+
+class Redactor:
+    """Compiled matcher that masks sensitive keys and values.
+
+    Keys are normalized (see ``normalize_key``) and looked up in one set;
+    key patterns and value scanners are each combined into a single regex,
+    and the value regex only runs on strings containing one of the
+    scanners' marker substrings.
+    A key matches by its dotted path, like the collector's exact keys
+    (``user.email``, whether flat or nested as ``user`` -> ``email``); keys
+    inside nested dicts also match by their own name. Decisions are cached
+    per key, up to ``max_cached_keys`` entries.
+
+    ``redact_mapping`` returns its argument unchanged when nothing matches,
+    and otherwise a copy: nested dicts may be shared (e.g. the request
+    context's ``http`` dict) and are never modified in place.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = DEFAULT_SENSITIVE_KEYS,
+        key_patterns: Iterable[str] = DEFAULT_KEY_PATTERNS,
+        value_scanners: Iterable[str] = DEFAULT_VALUE_SCANNERS,
+        placeholder: str = REDACTED,
+        max_cached_keys: int = 4096,
+    ):
+        self._keys = frozenset(normalize_key(k) for k in keys)
+        patterns = [p for p in key_patterns if p]
+        self._key_regex = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        scanners, markers, always_scan = [], [], False
+        for name in value_scanners:
+            if name not in VALUE_SCANNERS:
+                print(f"Warning: unknown redaction value scanner '{name}'", file=sys.stderr)
+                continue
+            scanner_markers, pattern = VALUE_SCANNERS[name]
+            scanners.append(pattern)
+            markers.extend(scanner_markers)
+            always_scan = always_scan or not scanner_markers
+        self._value_regex = re.compile("|".join(f"(?:{s})" for s in scanners)) if scanners else None
+        self._markers = None if always_scan else tuple(markers)
+        self._placeholder = placeholder
+        self._max_cached_keys = max_cached_keys
+        # prefix -> {key: sensitive}; two lookups, no string building per key
+        self._cache = {}
+        self._children = {}
+        self._cached = 0
+
+    def _is_sensitive(self, prefix: str, key) -> bool:
+        by_key = self._cache.get(prefix)
+        if by_key is not None:
+            sensitive = by_key.get(key)
+            if sensitive is not None:
+                return sensitive
+        name = normalize_key(str(key))
+        path = f"{prefix}.{name}" if prefix else name
+        sensitive = (
+            path in self._keys
+            or (prefix != "" and name in self._keys)
+            or (self._key_regex is not None and self._key_regex.search(path) is not None)
+        )
+        if self._cached < self._max_cached_keys:
+            self._cache.setdefault(prefix, {})[key] = sensitive
+            self._cached += 1
+        return sensitive
+
+    def _child_prefix(self, prefix: str, key) -> str:
+        by_key = self._children.get(prefix)
+        if by_key is not None:
+            child = by_key.get(key)
+            if child is not None:
+                return child
+        name = normalize_key(str(key))
+        child = f"{prefix}.{name}" if prefix else name
+        if self._cached < self._max_cached_keys:
+            self._children.setdefault(prefix, {})[key] = child
+            self._cached += 1
+        return child
+
+    def redact_string(self, value: str) -> str:
+        """Return ``value`` with scanned values masked; the same object if nothing matched."""
+        if self._value_regex is None:
+            return value
+        if self._markers is not None:
+            for marker in self._markers:
+                if marker in value:
+                    break
+            else:
+                return value
+        redacted = self._value_regex.sub(self._placeholder, value)
+        return value if redacted == value else redacted
+
+    def redact_value(self, value, prefix: str = "", depth: int = 0):
+        """Return ``value`` with sensitive parts masked; the same object if nothing matched."""
+        if type(value) is str:
+            return self.redact_string(value)
+        if depth >= _MAX_DEPTH:
+            return value
+        if isinstance(value, dict):
+            return self.redact_mapping(value, prefix, depth + 1)
+        if isinstance(value, (list, tuple)):
+            redacted = None
+            for i, item in enumerate(value):
+                new = self.redact_value(item, prefix, depth + 1)
+                if new is not item:
+                    if redacted is None:
+                        redacted = list(value)
+                    redacted[i] = new
+            if redacted is None:
+                return value
+            return tuple(redacted) if isinstance(value, tuple) else redacted
+        return value
+
+    def redact_mapping(self, mapping, prefix: str = "", depth: int = 0):
+        """Return ``mapping`` with sensitive keys masked; the same object if nothing matched."""
+        changes = None
+        known = self._cache.get(prefix) or _EMPTY
+        scan = self.redact_string if self._value_regex is not None else None
+        for key, value in mapping.items():
+            sensitive = known.get(key)
+            if sensitive is None:
+                sensitive = self._is_sensitive(prefix, key)
+            if sensitive:
+                new = self._placeholder
+            elif type(value) is str:
+                if scan is None:
+                    continue
+                new = scan(value)
+            elif isinstance(value, _CONTAINERS):
+                new = self.redact_value(value, self._child_prefix(prefix, key), depth)
+            else:
+                continue
+            if new is value:
+                continue
+            if changes is None:
+                changes = {}
+            changes[key] = new
+        if changes is None:
+            return mapping
+        return {**mapping, **changes}
+
+    def __call__(self, logger, method_name, event_dict):
+        """structlog processor: the event dict is owned by this call, so top-level keys are replaced in place."""
+        redacted = self.redact_mapping(event_dict)
+        if redacted is not event_dict:
+            event_dict.update(redacted)
+        return event_dict
+
+
+class RedactingSpanProcessor(SpanProcessor):
+    """Masks sensitive span and span event attributes before ``downstream`` (normally the ``BatchSpanProcessor``) sees the span."""
+
+    def __init__(self, downstream: SpanProcessor, redactor: Redactor):
+        self._downstream = downstream
+        self._redactor = redactor
+
+    def on_start(self, span, parent_context=None):
+        self._downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        # Unsampled spans are only recorded for span metrics and never exported
+        if not span.context.trace_flags.sampled:
+            return
+        # ``span`` is a fresh ReadableSpan built for this call; its attribute
+        # and event containers are swapped only when something matched
+        attributes = span._attributes
+        if attributes:
+            redacted = self._redactor.redact_mapping(attributes)
+            if redacted is not attributes:
+                span._attributes = redacted
+        if span._events:
+            events, changed = [], False
+            for event in span._events:
+                event_attributes = event.attributes
+                redacted = self._redactor.redact_mapping(event_attributes) if event_attributes else event_attributes
+                if redacted is not event_attributes:
+                    event = Event(event.name, redacted, event.timestamp)
+                    changed = True
+                events.append(event)
+            if changed:
+                span._events = tuple(events)
+        self._downstream.on_end(span)
+
+    def shutdown(self):
+        self._downstream.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._downstream.force_flush(timeout_millis)
+
+
+def build_redactor(redaction_config: dict) -> Optional[Redactor]:
+    """Build the ``Redactor`` described by ``get_redaction_config()``, or None if redaction is off."""
+    if not redaction_config["enabled"]:
+        return None
+    keys, patterns = list(DEFAULT_SENSITIVE_KEYS), list(DEFAULT_KEY_PATTERNS)
+    keys_file = redaction_config["keys_file"] or DEFAULT_KEYS_FILE
+    try:
+        keys, file_patterns = load_collector_keys(keys_file)
+        patterns += file_patterns
+    except (OSError, ValueError) as e:
+        # The default file may legitimately be missing; a configured one may not
+        if redaction_config["keys_file"] or not isinstance(e, FileNotFoundError):
+            print(f"Warning: could not load redaction keys from {keys_file}, using the built-in list: {e}", file=sys.stderr)
+    keys += redaction_config["extra_keys"]
+    patterns += redaction_config["key_patterns"]
+    try:
+        return Redactor(keys, patterns, redaction_config["value_scanners"], redaction_config["placeholder"])
+    except re.error as e:
+        print(f"Warning: invalid redaction key pattern, redacting by exact key only: {e}", file=sys.stderr)
+        return Redactor(keys, (), redaction_config["value_scanners"], redaction_config["placeholder"])
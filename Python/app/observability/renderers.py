@@ -0,0 +1,109 @@
+import sys
+import json
+import structlog
+from typing import Optional
+
+RENDERER_JSON = "json"
+RENDERER_ORJSON = "orjson"
+RENDERER_MSGSPEC = "msgspec"
+RENDERER_AUTO = "auto"
+
+
+def _fallback_default(obj):
+    """Serialize objects the JSON encoder does not know (same rule as structlog's JSONRenderer)."""
+    structlog_repr = getattr(obj, "__structlog__", None)
+    if structlog_repr is not None:
+        return structlog_repr()
+    return repr(obj)
+
+
+class MsgspecJSONRenderer:
+    """structlog renderer that encodes the event dict to JSON bytes with msgspec."""
+
+    def __init__(self, sort_keys: bool = False):
+        import msgspec
+
+        try:
+            encoder = msgspec.json.Encoder(enc_hook=_fallback_default, order="sorted" if sort_keys else None)
+        except TypeError:
+            # msgspec < 0.18 has no ``order``; key order is insertion order
+            encoder = msgspec.json.Encoder(enc_hook=_fallback_default)
+        self._encode = encoder.encode
+
+    def __call__(self, logger, method_name, event_dict):
+        return self._encode(event_dict)
+
+
+def _orjson_renderer(sort_keys: bool):
+    import orjson
+
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return structlog.processors.JSONRenderer(serializer=orjson.dumps, option=option)
+
+
+def get_json_renderer(name: str = RENDERER_JSON, sort_keys: Optional[bool] = None):
+    """Return ``(processor, renders_bytes)`` for the configured JSON serializer.
+
+    ``name`` is ``json`` (stdlib, str output), ``orjson``, ``msgspec`` or
+    ``auto`` (the first fast serializer that is installed). Fast serializers
+    render bytes and only sort keys when ``sort_keys`` is true; stdlib ``json``
+    keeps sorting by default. Falls back to stdlib ``json`` if the requested
+    serializer is not installed.
+    """
+    name = (name or RENDERER_JSON).strip().lower()
+    if name == RENDERER_AUTO:
+        candidates = [RENDERER_ORJSON, RENDERER_MSGSPEC]
+    elif name in (RENDERER_ORJSON, RENDERER_MSGSPEC):
+        candidates = [name]
+    else:
+        if name != RENDERER_JSON:
+            print(f"Warning: unknown log renderer '{name}', using '{RENDERER_JSON}'", file=sys.stderr)
+        candidates = []
+
+    for candidate in candidates:
+        try:
+            if candidate == RENDERER_ORJSON:
+                return _orjson_renderer(bool(sort_keys)), True
+            return MsgspecJSONRenderer(bool(sort_keys)), True
+        except ImportError:
+            continue
+
+    if candidates:
+        print(f"Warning: log renderer '{name}' not installed, falling back to stdlib json", file=sys.stderr)
+    return structlog.processors.JSONRenderer(serializer=json.dumps, sort_keys=True if sort_keys is None else sort_keys), False
+
+
+class _NamedBytesLogger(structlog.BytesLogger):
+    """BytesLogger that keeps the name it was requested with, for ``add_logger_name``."""
+
+    def __init__(self, file, name: str):
+        super().__init__(file)
+        self.name = name
+
+
+def _caller_module_name() -> str:
+    """Name of the first module outside structlog on the call stack (like stdlib LoggerFactory)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not (module.startswith("structlog") or module == __name__):
+            return module
+        frame = frame.f_back
+    return "root"
+
+
+class BytesLoggerFactory:
+    """Logger factory writing rendered bytes straight to a binary stream.
+
+    Skips the stdlib ``logging`` handler/formatter entirely; the logger name
+    passed to ``structlog.get_logger(name)`` is preserved for ``add_logger_name``.
+    """
+
+    def __init__(self, file=None):
+        self._file = file
+
+    def __call__(self, *args):
+        name = args[0] if args and isinstance(args[0], str) else _caller_module_name()
+        return _NamedBytesLogger(self._file or sys.stdout.buffer, name)
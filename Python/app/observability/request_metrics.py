@@ -0,0 +1,82 @@
+import threading
+from typing import Optional
+from opentelemetry import metrics
+
+REQUEST_COUNT = "http.server.request.count"
+ERROR_COUNT = "http.server.error.count"
+# Not the semantic-convention http.server.request.duration (seconds), which the
+# FastAPI instrumentation may record as well: this one is in milliseconds
+REQUEST_DURATION = "app.http.request.duration"
+
+METER_NAME = "app.observability.request_metrics"
+
+DEFAULT_DURATION_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 250, 500, 750, 1000, 2500, 5000, 7500, 10000)
+
+_KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"})
+_STATUS_CLASSES = {1: "1xx", 2: "2xx", 3: "3xx", 4: "4xx", 5: "5xx"}
+
+
+class RequestMetrics:
+    """RED metrics (rate, errors, duration) recorded by ObservabilityMiddleware.
+
+    Instruments are created once. Attribute dicts are built once per
+    (method, route template, status class) and reused, so recording a
+    request does not allocate new attribute sets. Unknown methods are
+    recorded as ``_OTHER`` and, once ``max_attribute_sets`` sets are cached,
+    new routes are recorded as ``"other"``.
+    """
+
+    def __init__(self, meter=None, max_attribute_sets: int = 2048):
+        meter = meter or metrics.get_meter(METER_NAME)
+        self._requests = meter.create_counter(
+            REQUEST_COUNT,
+            unit="{request}",
+            description="HTTP server requests",
+        )
+        self._errors = meter.create_counter(
+            ERROR_COUNT,
+            unit="{request}",
+            description="HTTP server requests that failed with a 5xx status or an exception",
+        )
+        self._duration = meter.create_histogram(
+            REQUEST_DURATION,
+            unit="ms",
+            description="HTTP server request duration",
+        )
+        self._attribute_sets = {}
+        self._max_attribute_sets = max_attribute_sets
+        self._lock = threading.Lock()
+
+    def _attributes(self, method: str, route: Optional[str], status_code: int) -> dict:
+        key = (method, route, status_code // 100)
+        attributes = self._attribute_sets.get(key)
+        if attributes is not None:
+            return attributes
+
+        if method not in _KNOWN_METHODS:
+            method = "_OTHER"
+        if route is not None and len(self._attribute_sets) >= self._max_attribute_sets:
+            route = "other"
+
+        # Only normalized keys are stored, so unknown methods and routes past
+        # the cap take this slower path instead of growing the cache
+        normalized = (method, route, key[2])
+        attributes = self._attribute_sets.get(normalized)
+        if attributes is None:
+            attributes = {
+                "http.request.method": method,
+                "http.status_class": _STATUS_CLASSES.get(key[2], "other"),
+            }
+            if route:
+                attributes["http.route"] = route
+            with self._lock:
+                attributes = self._attribute_sets.setdefault(normalized, attributes)
+        return attributes
+
+    def record(self, method: str, route: Optional[str], status_code: int, duration_ms: float):
+        """Record one finished request."""
+        attributes = self._attributes(method, route, status_code)
+        self._requests.add(1, attributes)
+        self._duration.record(duration_ms, attributes)
+        if status_code >= 500:
+            self._errors.add(1, attributes)
@@ -0,0 +1,106 @@
+import threading
+import weakref
+from typing import Optional
+from starlette.routing import Mount
+
+_UNMATCHED = ""
+_resolvers = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+
+def _route_path(scope) -> str:
+    """``scope["path"]`` relative to ``scope["root_path"]``, the part the app's routes match against."""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if not root_path or not path.startswith(root_path):
+        return path
+    if path == root_path:
+        return ""
+    # "/api" is a prefix of "/apiary" but not its mount point
+    return path[len(root_path):] if path[len(root_path)] == "/" else path
+
+
+class RouteTemplateResolver:
+    """Maps a request path to the template of the route that serves it (``/weatherforecast/days/{days}``).
+
+    Works before routing has run, so the template can go on the server span
+    and the "Request started" log. Paths of routes without parameters are
+    answered from a table built once from ``app.routes``; other paths are
+    matched against the routes' regexes in routing order and the result,
+    including "no route", is kept in a cache of at most ``cache_size`` paths
+    (oldest dropped first). The table is rebuilt if routes are added later.
+    Mounted sub-applications are not resolved.
+    """
+
+    def __init__(self, app, cache_size: int = 1024):
+        self._app = app
+        self._cache_size = cache_size
+        self._route_count = -1
+        self._static = {}
+        self._dynamic = ()
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _build(self, routes: list):
+        static, dynamic = {}, []
+        for route in routes:
+            path_regex = getattr(route, "path_regex", None)
+            template = getattr(route, "path", None)
+            if path_regex is None or template is None or isinstance(route, Mount):
+                continue
+            if route.param_convertors:
+                dynamic.append((path_regex, template))
+                continue
+            # A parameterless route only matches its own path, unless an
+            # earlier route with parameters shadows it
+            for earlier_regex, earlier_template in dynamic:
+                if earlier_regex.match(template):
+                    template = earlier_template
+                    break
+            static.setdefault(route.path, template)
+        with self._lock:
+            self._static = static
+            self._dynamic = tuple(dynamic)
+            self._cache = {}
+            self._route_count = len(routes)
+
+    def resolve_path(self, path: str) -> Optional[str]:
+        """Template of the first route matching ``path`` (already stripped of ``root_path``), or None."""
+        routes = self._app.routes
+        if len(routes) != self._route_count:
+            self._build(routes)
+        template = self._static.get(path)
+        if template is not None:
+            return template
+        template = self._cache.get(path)
+        if template is None:
+            template = _UNMATCHED
+            for regex, candidate in self._dynamic:
+                if regex.match(path):
+                    template = candidate
+                    break
+            if self._cache_size > 0:
+                with self._lock:
+                    if len(self._cache) >= self._cache_size and path not in self._cache:
+                        del self._cache[next(iter(self._cache))]
+                    self._cache[path] = template
+        return template or None
+
+    def resolve(self, scope) -> Optional[str]:
+        """Template for an HTTP ``scope``; uses ``scope["route"]`` once routing has set it."""
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", None)
+        return self.resolve_path(_route_path(scope))
+
+
+def route_template(scope, cache_size: int = 1024) -> Optional[str]:
+    """Route template for ``scope``, from the resolver shared by everything serving ``scope["app"]``."""
+    app = scope.get("app")
+    if app is None or not hasattr(app, "routes"):
+        return None
+    resolver = _resolvers.get(app)
+    if resolver is None:
+        with _resolvers_lock:
+            resolver = _resolvers.setdefault(app, RouteTemplateResolver(app, cache_size))
+    return resolver.resolve(scope)
@@ -0,0 +1,250 @@
+import asyncio
+import gc
+import sys
+import time
+import threading
+import traceback
+import structlog
+from collections import deque
+from typing import Optional
+from opentelemetry import metrics
+from .context import get_published_request_context
+
+LOOP_LAG = "runtime.event_loop.lag"
+LOOP_STALLS = "runtime.event_loop.stalls"
+THREADPOOL_IN_USE = "runtime.threadpool.in_use"
+THREADPOOL_QUEUED = "runtime.threadpool.queued"
+THREADPOOL_LIMIT = "runtime.threadpool.limit"
+GC_PAUSE = "runtime.gc.pause"
+GC_COLLECTIONS = "runtime.gc.collections"
+
+METER_NAME = "app.observability.runtime_monitor"
+
+# Lag and GC pauses are mostly well under a millisecond
+DEFAULT_PAUSE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# GC pauses kept between two metric collections
+_MAX_PENDING_PAUSES = 10000
+_MAX_STACK_FRAMES = 40
+
+
+class RuntimeMonitor:
+    """Event loop lag, threadpool saturation and GC pause metrics.
+
+    ``watch_loop`` (called by ``ObservabilityMiddleware`` at lifespan
+    startup) schedules a callback on the running loop every
+    ``interval_ms``; how late it runs is the loop's scheduling lag. The same
+    callback tracks the peak in-use and queued counts of anyio's default
+    thread limiter, which bounds the threadpool Starlette runs sync handlers
+    in. GC pauses are timed with ``gc.callbacks`` and recorded when metrics
+    are collected.
+
+    With ``stall_ms`` set, a watchdog thread notices when the loop has not
+    run the callback for that long and logs the stack the loop thread is
+    blocked in, with the request it is serving, while it is still blocked.
+    """
+
+    def __init__(self, interval_ms: float = 100.0, stall_ms: Optional[float] = None, meter=None):
+        meter = meter or metrics.get_meter(METER_NAME)
+        self._lag = meter.create_histogram(
+            LOOP_LAG,
+            unit="ms",
+            description="Delay between when the event loop should have run a timer callback and when it did",
+        )
+        self._gc_pause = meter.create_histogram(
+            GC_PAUSE,
+            unit="ms",
+            description="Time the garbage collector stopped the process, by generation",
+        )
+        # Collection runs observable callbacks before reading synchronous
+        # instruments, so pauses drained here land in the same collection
+        meter.create_observable_counter(
+            GC_COLLECTIONS,
+            callbacks=[self._observe_gc],
+            unit="{collection}",
+            description="Garbage collections by generation",
+        )
+        meter.create_observable_gauge(
+            THREADPOOL_IN_USE,
+            callbacks=[lambda options: self._observe_peak("in_use")],
+            unit="{thread}",
+            description="Peak threadpool threads running a sync call since the last collection",
+        )
+        meter.create_observable_gauge(
+            THREADPOOL_QUEUED,
+            callbacks=[lambda options: self._observe_peak("queued")],
+            unit="{call}",
+            description="Peak sync calls waiting for a threadpool thread since the last collection",
+        )
+        meter.create_observable_gauge(
+            THREADPOOL_LIMIT,
+            callbacks=[self._observe_limit],
+            unit="{thread}",
+            description="Threadpool size (anyio's default thread limiter)",
+        )
+        meter.create_observable_counter(
+            LOOP_STALLS,
+            callbacks=[lambda options: [metrics.Observation(self.stalls)]],
+            unit="{stall}",
+            description="Event loop timer callbacks delayed by at least the stall threshold",
+        )
+        self._interval = max(interval_ms, 1.0) / 1000
+        self._stall = stall_ms / 1000 if stall_ms else None
+        self._loop = None
+        self._loop_thread = None
+        self._limiter = None
+        self._expected = 0.0
+        self._heartbeat = None
+        self._peaks = {"in_use": 0, "queued": 0}
+        self._gc_started = None
+        self._gc_pauses = deque(maxlen=_MAX_PENDING_PAUSES)
+        self._stop = threading.Event()
+        self._log = structlog.get_logger(__name__)
+        self.stalls = 0
+
+        gc.callbacks.append(self._on_gc)
+        self._thread = None
+        if self._stall is not None:
+            self._thread = threading.Thread(target=self._watch, name="EventLoopWatchdog", daemon=True)
+            self._thread.start()
+
+    def watch_loop(self):
+        """Start measuring the running event loop; must be called from a task on it."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        try:
+            from anyio.to_thread import current_default_thread_limiter
+            self._limiter = current_default_thread_limiter()
+        except Exception as e:
+            print(f"Warning: threadpool metrics unavailable: {e}", file=sys.stderr)
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._expected = loop.time() + self._interval
+        loop.call_later(self._interval, self._tick, loop)
+
+    def _tick(self, loop):
+        if loop is not self._loop:
+            return
+        now = loop.time()
+        lag = max(now - self._expected, 0.0)
+        self._heartbeat = time.monotonic()
+        self._lag.record(lag * 1000)
+        if self._stall is not None and lag >= self._stall:
+            self.stalls += 1
+
+        limiter = self._limiter
+        if limiter is not None:
+            peaks = self._peaks
+            in_use = limiter.borrowed_tokens
+            queued = limiter.statistics().tasks_waiting
+            if in_use > peaks["in_use"]:
+                peaks["in_use"] = in_use
+            if queued > peaks["queued"]:
+                peaks["queued"] = queued
+        self._expected = now + self._interval
+        loop.call_later(self._interval, self._tick, loop)
+
+    def _observe_peak(self, name: str):
+        limiter = self._limiter
+        if limiter is None:
+            return []
+        # Reset to the current value so a saturated pool stays visible
+        peak = self._peaks[name]
+        self._peaks[name] = limiter.borrowed_tokens if name == "in_use" else limiter.statistics().tasks_waiting
+        return [metrics.Observation(max(peak, self._peaks[name]))]
+
+    def _observe_limit(self, options):
+        if self._limiter is None:
+            return []
+        return [metrics.Observation(self._limiter.total_tokens)]
+
+    def _on_gc(self, phase: str, info: dict):
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            # Recording here could take the histogram's lock from inside a
+            # collection triggered while holding it, so only queue the pause
+            self._gc_pauses.append((info["generation"], time.perf_counter() - self._gc_started))
+            self._gc_started = None
+
+    def _observe_gc(self, options):
+        record = self._gc_pause.record
+        attributes = [{"gc.generation": generation} for generation in range(len(gc.get_stats()))]
+        while True:
+            try:
+                generation, seconds = self._gc_pauses.popleft()
+            except IndexError:
+                break
+            record(seconds * 1000, attributes[generation])
+        return [
+            metrics.Observation(stats["collections"], attributes[generation])
+            for generation, stats in enumerate(gc.get_stats())
+        ]
+
+    def _watch(self):
+        poll = min(max(self._stall / 4, 0.01), 1.0)
+        reported = None
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            loop = self._loop
+            # A loop that stopped (e.g. after lifespan shutdown) is not blocked
+            if heartbeat is None or heartbeat == reported or loop is None or not loop.is_running():
+                continue
+            blocked = time.monotonic() - heartbeat - self._interval
+            if blocked >= self._stall:
+                reported = heartbeat
+                try:
+                    self._log_stall(blocked)
+                except Exception as e:
+                    print(f"Error logging event loop stall: {e}", file=sys.stderr)
+
+    def _log_stall(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        # The request whose coroutine is blocking the loop, as published by
+        # the middleware frame on its stack
+        request_context = None
+        f = frame
+        while f is not None and request_context is None:
+            request_context = get_published_request_context(f)
+            f = f.f_back
+        task = asyncio.current_task(self._loop)
+        fields = {}
+        if request_context is not None:
+            fields = {
+                "RequestPath": request_context.route or request_context.path,
+                "requestId": request_context.request_id,
+                "traceId": request_context.trace_id,
+                "spanId": request_context.span_id,
+            }
+        self._log.warning(
+            "Event loop blocked",
+            blockedMilliseconds=round(blocked * 1000, 1),
+            task=task.get_name() if task is not None else None,
+            stack="".join(traceback.format_stack(frame)[-_MAX_STACK_FRAMES:]),
+            **fields,
+        )
+
+    def shutdown(self):
+        """Stop the watchdog and the GC callback; the loop callback stops with its loop."""
+        self._stop.set()
+        self._loop = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._thread is not None:
+            self._thread.join(5.0)
+
+
+_runtime_monitor: Optional[RuntimeMonitor] = None
+
+
+def get_runtime_monitor() -> Optional[RuntimeMonitor]:
+    """The monitor started by ``init_observability``, or None when it is off."""
+    return _runtime_monitor
+
+
+def set_runtime_monitor(monitor: Optional[RuntimeMonitor]):
+    global _runtime_monitor
+    _runtime_monitor = monitor
@@ -0,0 +1,119 @@
+import time
+import threading
+from typing import Callable, Optional
+from opentelemetry.sdk.trace.sampling import Decision, ParentBased, Sampler, SamplingResult, TraceIdRatioBased, ALWAYS_ON
+
+SAMPLING_MODE_RATIO = "ratio"
+SAMPLING_MODE_ADAPTIVE = "adaptive"
+
+
+class AdaptiveRateSampler(TraceIdRatioBased):
+    """Trace-ID ratio sampler whose ratio tracks a target number of sampled traces per second.
+
+    Every ``should_sample`` call (one per new local root when wrapped in
+    ``ParentBased``) is counted. Every ``adjust_interval_seconds`` the count
+    is pushed into a sliding window of ``window_seconds`` and the ratio is
+    recomputed as ``target / throughput``. Throughput is the higher of the
+    window average and the last interval, so a surge is damped within one
+    interval while the ratio recovers gradually once it passes.
+    """
+
+    def __init__(
+        self,
+        target_per_second: float,
+        window_seconds: float = 10.0,
+        adjust_interval_seconds: float = 1.0,
+        initial_ratio: float = 1.0,
+        min_ratio: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max(min_ratio, min(initial_ratio, 1.0)))
+        self._target = max(target_per_second, 0.0)
+        self._interval = max(adjust_interval_seconds, 0.001)
+        self._buckets = [0] * max(int(round(window_seconds / self._interval)), 1)
+        self._bucket_index = 0
+        self._filled = 0
+        self._min_ratio = min_ratio
+        self._clock = clock
+        self._count = 0
+        self._next_adjust = clock() + self._interval
+        self._lock = threading.Lock()
+
+    @property
+    def target_per_second(self) -> float:
+        return self._target
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        with self._lock:
+            self._count += 1
+        if self._clock() >= self._next_adjust:
+            self._adjust()
+        return super().should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def _adjust(self):
+        with self._lock:
+            now = self._clock()
+            if now < self._next_adjust:
+                return
+            elapsed = int((now - self._next_adjust) // self._interval) + 1
+            self._next_adjust += elapsed * self._interval
+
+            count, self._count = self._count, 0
+            # The closed interval gets the count; intervals with no calls at all get zero
+            for i in range(min(elapsed, len(self._buckets))):
+                self._bucket_index = (self._bucket_index + 1) % len(self._buckets)
+                self._buckets[self._bucket_index] = count if i == 0 else 0
+            self._filled = min(self._filled + elapsed, len(self._buckets))
+
+            window_rate = sum(self._buckets) / (self._filled * self._interval)
+            last_rate = (count if elapsed == 1 else 0) / self._interval
+            rate = max(window_rate, last_rate)
+
+            ratio = 1.0 if rate <= self._target else self._target / rate
+            ratio = max(self._min_ratio, min(ratio, 1.0))
+            self._rate = ratio
+            self._bound = self.get_bound_for_rate(ratio)
+
+    def get_description(self) -> str:
+        return f"AdaptiveRateSampler{{target={self._target}/s, ratio={self._rate:.6f}}}"
+
+
+class RecordUnsampledSampler(Sampler):
+    """Records the spans ``delegate`` drops, without sampling them.
+
+    Dropped spans become ``RECORD_ONLY``: span processors see them end, but
+    their sampled flag stays off, so batch processors skip them and the
+    decision propagated downstream is unchanged.
+    """
+
+    def __init__(self, delegate: Sampler):
+        self._delegate = delegate
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        result = self._delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision is Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, result.attributes, result.trace_state)
+        return result
+
+    def get_description(self) -> str:
+        return f"RecordUnsampled{{{self._delegate.get_description()}}}"
+
+
+def build_adaptive_sampler(sampling_ratio: float, sampling_config: dict) -> AdaptiveRateSampler:
+    """The ``AdaptiveRateSampler`` described by ``get_sampling_config()``, starting at ``sampling_ratio``."""
+    return AdaptiveRateSampler(
+        target_per_second=sampling_config["target_per_second"],
+        window_seconds=sampling_config["window_seconds"],
+        adjust_interval_seconds=sampling_config["adjust_interval_seconds"],
+        initial_ratio=sampling_ratio,
+    )
+
+
+def build_sampler(sampling_ratio: float, sampling_config: Optional[dict] = None):
+    """Build the head sampler for ``init_tracing`` from the sampling ratio and mode."""
+    mode = (sampling_config or {}).get("mode", SAMPLING_MODE_RATIO)
+    if mode == SAMPLING_MODE_ADAPTIVE:
+        return ParentBased(build_adaptive_sampler(sampling_ratio, sampling_config))
+    if sampling_ratio >= 1.0:
+        return ALWAYS_ON
+    return ParentBased(TraceIdRatioBased(sampling_ratio))
@@ -0,0 +1,222 @@
+import queue
+import sys
+import threading
+from bisect import bisect_left
+from opentelemetry import metrics
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.trace import StatusCode
+from .request_metrics import DEFAULT_DURATION_BUCKETS_MS
+
+SPAN_CALLS = "span.metrics.calls"
+SPAN_ERRORS = "span.metrics.errors"
+SPAN_DURATION = "span.metrics.duration"
+SPAN_SERIES = "span.metrics.series"
+
+METER_NAME = "app.observability.span_metrics"
+
+
+class _SpanStats:
+    """Calls, errors and durations of one series; durations are kept as count, sum, min and max per bucket."""
+
+    __slots__ = ("attributes", "calls", "errors", "counts", "sums", "mins", "maxs")
+
+    def __init__(self, attributes: dict, buckets: int):
+        self.attributes = attributes
+        self.calls = 0
+        self.errors = 0
+        self.counts = [0] * buckets
+        self.sums = [0.0] * buckets
+        self.mins = [0.0] * buckets
+        self.maxs = [0.0] * buckets
+
+    def add(self, bucket: int, duration_ms: float):
+        if self.counts[bucket]:
+            if duration_ms < self.mins[bucket]:
+                self.mins[bucket] = duration_ms
+            elif duration_ms > self.maxs[bucket]:
+                self.maxs[bucket] = duration_ms
+        else:
+            self.mins[bucket] = self.maxs[bucket] = duration_ms
+        self.counts[bucket] += 1
+        self.sums[bucket] += duration_ms
+
+
+class _ThreadTable:
+    """Span stats of one thread; its lock is only contended while a flush swaps the table out."""
+
+    __slots__ = ("thread", "lock", "stats", "pending")
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.pending = 0
+
+
+class SpanMetricsProcessor(SpanProcessor):
+    """Turns every ended span into call count, error count and duration metrics by span name and kind.
+
+    Register it on the ``TracerProvider`` next to the export chain and wrap
+    the sampler in ``RecordUnsampledSampler``, so unsampled spans reach it
+    too and the metrics stay exact at any sampling ratio. Each thread
+    aggregates into its own table under its own lock; tables are flushed
+    into the instruments when metrics are collected. Durations are bucketed
+    as they are recorded, on the ``boundaries`` of the duration histogram's
+    view, so a series takes the same memory however many spans it sees. A
+    table that reaches ``flush_spans`` spans in between is handed to a
+    background thread, since recording that many durations would stall a
+    request. Once
+    ``max_attribute_sets`` (name, kind) pairs are known, new span names are
+    recorded as ``"other"``.
+    """
+
+    def __init__(self, meter=None, max_attribute_sets: int = 2048, flush_spans: int = 10000, boundaries=DEFAULT_DURATION_BUCKETS_MS):
+        meter = meter or metrics.get_meter(METER_NAME)
+        self._calls = meter.create_counter(
+            SPAN_CALLS,
+            unit="{span}",
+            description="Ended spans, sampled or not, by span name and kind",
+        )
+        self._errors = meter.create_counter(
+            SPAN_ERRORS,
+            unit="{span}",
+            description="Ended spans with an error status, by span name and kind",
+        )
+        self._duration = meter.create_histogram(
+            SPAN_DURATION,
+            unit="ms",
+            description="Span duration, by span name and kind",
+        )
+        # Collection runs observable callbacks before reading synchronous
+        # instruments, so this flush lands in the same collection
+        meter.create_observable_gauge(
+            SPAN_SERIES,
+            callbacks=[self._observe_series],
+            unit="{series}",
+            description="Distinct span name and kind pairs tracked by span metrics",
+        )
+        self._boundaries = tuple(sorted(boundaries))
+        self._max_attribute_sets = max_attribute_sets
+        self._flush_spans = max(flush_spans, 1)
+        self._attribute_sets = {}
+        self._local = threading.local()
+        self._tables = []
+        self._lock = threading.Lock()
+        self._full = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="SpanMetricsFlusher", daemon=True)
+        self._thread.start()
+
+    def _attributes(self, name: str, kind) -> dict:
+        key = (name, kind)
+        attributes = self._attribute_sets.get(key)
+        if attributes is not None:
+            return attributes
+        with self._lock:
+            if len(self._attribute_sets) >= self._max_attribute_sets:
+                attributes = self._attribute_sets.get(("other", kind))
+                if attributes is None:
+                    attributes = {"span.name": "other", "span.kind": kind.name}
+                    self._attribute_sets[("other", kind)] = attributes
+                return attributes
+            return self._attribute_sets.setdefault(key, {"span.name": name, "span.kind": kind.name})
+
+    def _table(self) -> _ThreadTable:
+        table = _ThreadTable(threading.current_thread())
+        self._local.table = table
+        with self._lock:
+            self._tables.append(table)
+        return table
+
+    def on_end(self, span):
+        attributes = self._attributes(span.name, span.kind)
+        duration_ms = (span.end_time - span.start_time) / 1e6
+        failed = span.status.status_code is StatusCode.ERROR
+
+        table = getattr(self._local, "table", None) or self._table()
+        with table.lock:
+            stats = table.stats.get(id(attributes))
+            if stats is None:
+                stats = table.stats[id(attributes)] = _SpanStats(attributes, len(self._boundaries) + 1)
+            stats.calls += 1
+            # Histogram buckets include their upper boundary
+            stats.add(bisect_left(self._boundaries, duration_ms), duration_ms)
+            if failed:
+                stats.errors += 1
+            table.pending += 1
+            if table.pending >= self._flush_spans:
+                self._full.put(self._take(table))
+
+    @staticmethod
+    def _take(table: _ThreadTable) -> dict:
+        stats, table.stats = table.stats, {}
+        table.pending = 0
+        return stats
+
+    def _record(self, stats: dict):
+        record = self._duration.record
+        for s in stats.values():
+            self._calls.add(s.calls, s.attributes)
+            if s.errors:
+                self._errors.add(s.errors, s.attributes)
+            for count, total, low, high in zip(s.counts, s.sums, s.mins, s.maxs):
+                if not count:
+                    continue
+                # The bucket's min, max and the mean of the rest: the histogram
+                # gets the same bucket counts, sum, min and max as if every
+                # duration had been recorded
+                record(low, s.attributes)
+                if count > 1:
+                    record(high, s.attributes)
+                if count > 2:
+                    mean = min(max((total - low - high) / (count - 2), low), high)
+                    for _ in range(count - 2):
+                        record(mean, s.attributes)
+
+    def flush(self):
+        """Move every thread's aggregates into the instruments; tables of finished threads are dropped."""
+        with self._lock:
+            tables = list(self._tables)
+        # Checked first: a thread seen finished cannot add spans after its flush
+        finished = [t for t in tables if not t.thread.is_alive()]
+        for table in tables:
+            with table.lock:
+                stats = self._take(table)
+            self._record(stats)
+        while True:
+            try:
+                stats = self._full.get_nowait()
+            except queue.Empty:
+                break
+            self._record(stats)
+            self._full.task_done()
+        # Wait for a table the flusher thread is still recording
+        self._full.join()
+        if finished:
+            with self._lock:
+                self._tables = [t for t in self._tables if t not in finished]
+
+    def _observe_series(self, options):
+        self.flush()
+        return [metrics.Observation(len(self._attribute_sets))]
+
+    def _run(self):
+        while True:
+            stats = self._full.get()
+            if stats is None:
+                self._full.task_done()
+                return
+            try:
+                self._record(stats)
+            except Exception as e:
+                print(f"Error recording span metrics: {e}", file=sys.stderr)
+            finally:
+                self._full.task_done()
+
+    def shutdown(self):
+        self.flush()
+        self._full.put(None)
+        self._thread.join(5.0)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        self.flush()
+        return True
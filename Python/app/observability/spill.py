@@ -0,0 +1,553 @@
+import os
+import sys
+import time
+import zlib
+import struct
+import threading
+from typing import Callable, Optional
+from urllib.parse import urlparse
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult
+from .config import get_spill_config, startup_print
+from .workers import service_instance_id
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SIGNAL_TRACES = "traces"
+SIGNAL_LOGS = "logs"
+SIGNAL_METRICS = "metrics"
+
+_EXPORT_METHODS = {
+    SIGNAL_TRACES: "/opentelemetry.proto.collector.trace.v1.TraceService/Export",
+    SIGNAL_LOGS: "/opentelemetry.proto.collector.logs.v1.LogsService/Export",
+    SIGNAL_METRICS: "/opentelemetry.proto.collector.metrics.v1.MetricsService/Export",
+}
+
+# Record header: payload length and CRC32 of the payload
+_HEADER = struct.Struct(">II")
+_SEGMENT_SUFFIX = ".seg"
+_CURSOR_FILE = "cursor"
+_LOCK_FILE = "lock"
+_CURSOR_SAVE_INTERVAL = 1.0
+
+
+def _lock_directory(directory: str, create: bool = True) -> int:
+    """Open and exclusively lock ``directory``'s lock file.
+
+    Raises OSError if another process (or another store in this one) holds
+    the lock, or if there is no lock file and ``create`` is false. The lock
+    goes away with the process, so a directory whose lock can be taken has
+    no live owner.
+    """
+    fd = os.open(os.path.join(directory, _LOCK_FILE), os.O_RDWR | (os.O_CREAT if create else 0), 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+
+class SegmentStore:
+    """Append-only, size-capped record log split into numbered segment files.
+
+    Records are appended to the newest segment and read back oldest first
+    through a cursor that survives restarts. When the directory grows past
+    ``max_bytes`` whole segments are deleted oldest first, unread or not.
+    Each process writes to a fresh segment, so a record torn by a crash only
+    ever ends the segment it is in; it fails its CRC and the reader moves on.
+
+    The store holds a lock on its directory until ``close``. With ``adopt``
+    it opens the directory of a store whose process is gone, to replay what
+    it left behind, and raises OSError if that store is still open.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, segment_bytes: int = 8 * 1024 * 1024, adopt: bool = False):
+        if not adopt:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_fd = _lock_directory(directory, create=not adopt)
+        self._dir = directory
+        self._max_bytes = max(max_bytes, 2)
+        self._segment_bytes = max(min(segment_bytes, self._max_bytes // 2), 1)
+        self._lock = threading.Lock()
+
+        self._segments = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+        self._sizes = {seq: os.path.getsize(self._path(seq)) for seq in self._segments}
+        self._total_bytes = sum(self._sizes.values())
+
+        self._write_seq = None
+        self._writer = None
+        self._read_seq, self._read_offset = self._load_cursor()
+        # Never reuse a sequence number the saved cursor may still point at
+        self._last_seq = max(self._segments[-1] if self._segments else -1, self._cursor_seq)
+        self._reader = None
+        self._reader_seq = None
+        self._next_offset = None
+        self._cursor_saved_at = 0.0
+
+        self.appended = 0
+        self.evicted_segments = 0
+        self.corrupt_segments = 0
+
+    @property
+    def directory(self) -> str:
+        return self._dir
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self._dir, f"{seq:012d}{_SEGMENT_SUFFIX}")
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes on disk in segments not yet fully replayed (approximate)."""
+        return max(self._total_bytes - self._read_offset, 0) if self._segments else 0
+
+    def _load_cursor(self):
+        self._cursor_seq = -1
+        try:
+            with open(os.path.join(self._dir, _CURSOR_FILE)) as f:
+                seq, offset = (int(v) for v in f.read().split())
+            self._cursor_seq = seq
+            if seq in self._sizes:
+                return seq, offset
+        except (OSError, ValueError):
+            pass
+        return (self._segments[0] if self._segments else None), 0
+
+    def _save_cursor(self):
+        path = os.path.join(self._dir, _CURSOR_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                f.write(f"{self._read_seq if self._read_seq is not None else self._last_seq} {self._read_offset}")
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+        self._cursor_saved_at = time.monotonic()
+
+    def append(self, payload: bytes):
+        """Append one record, rolling to a new segment and evicting old ones as needed."""
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._writer is None or self._sizes[self._write_seq] + len(record) > self._segment_bytes:
+                self._roll()
+            self._writer.write(record)
+            self._writer.flush()
+            self._sizes[self._write_seq] += len(record)
+            self._total_bytes += len(record)
+            self.appended += 1
+            while self._total_bytes > self._max_bytes and len(self._segments) > 1:
+                self._delete_segment(self._segments[0])
+                self.evicted_segments += 1
+
+    def _roll(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._last_seq += 1
+        self._write_seq = self._last_seq
+        self._writer = open(self._path(self._write_seq), "ab")
+        self._segments.append(self._write_seq)
+        self._sizes[self._write_seq] = 0
+        if self._read_seq is None:
+            self._read_seq, self._read_offset = self._write_seq, 0
+
+    def _delete_segment(self, seq: int):
+        """Remove a segment from disk and move the cursor past it (caller holds the lock)."""
+        if self._reader_seq == seq:
+            self._reader.close()
+            self._reader = self._reader_seq = None
+        if seq == self._write_seq:
+            self._writer.close()
+            self._writer = self._write_seq = None
+        self._segments.remove(seq)
+        self._total_bytes -= self._sizes.pop(seq)
+        try:
+            os.remove(self._path(seq))
+        except OSError:
+            pass
+        if self._read_seq == seq:
+            self._read_seq = self._segments[0] if self._segments else None
+            self._read_offset = 0
+            self._next_offset = None
+
+    def peek(self) -> Optional[bytes]:
+        """Return the oldest unread record without consuming it, or None if all are read."""
+        with self._lock:
+            while self._read_seq is not None:
+                if self._reader_seq != self._read_seq:
+                    if self._reader is not None:
+                        self._reader.close()
+                    self._reader = open(self._path(self._read_seq), "rb")
+                    self._reader_seq = self._read_seq
+                self._reader.seek(self._read_offset)
+                header = self._reader.read(_HEADER.size)
+                if len(header) == _HEADER.size:
+                    length, crc = _HEADER.unpack(header)
+                    payload = self._reader.read(length)
+                    if len(payload) == length and zlib.crc32(payload) == crc:
+                        self._next_offset = self._read_offset + _HEADER.size + length
+                        return payload
+                    if self._read_seq == self._write_seq:
+                        # Torn or partial write to our own segment: nothing sane to do but drop it
+                        self._read_offset = self._sizes[self._read_seq]
+                        return None
+                    self.corrupt_segments += 1
+                elif self._read_seq == self._write_seq:
+                    return None
+                # End of a finished segment (or a corrupt tail): it is fully replayed
+                self._delete_segment(self._read_seq)
+                self._save_cursor()
+            return None
+
+    def advance(self):
+        """Consume the record returned by the last ``peek``."""
+        with self._lock:
+            if self._next_offset is None:
+                return
+            self._read_offset, self._next_offset = self._next_offset, None
+            if time.monotonic() - self._cursor_saved_at >= _CURSOR_SAVE_INTERVAL:
+                self._save_cursor()
+
+    def close(self):
+        with self._lock:
+            self._save_cursor()
+            for f in (self._writer, self._reader):
+                if f is not None:
+                    f.close()
+            self._writer = self._reader = None
+            self._write_seq = self._reader_seq = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def remove(self):
+        """Close the store and delete its directory, if nothing but the store's own files are left in it."""
+        self.close()
+        try:
+            for name in os.listdir(self._dir):
+                if name in (_CURSOR_FILE, _CURSOR_FILE + ".tmp", _LOCK_FILE) or name.endswith(_SEGMENT_SUFFIX):
+                    os.remove(os.path.join(self._dir, name))
+            os.rmdir(self._dir)
+        except OSError:
+            pass
+
+
+def adopt_orphaned_stores(parent: str, skip=(), max_bytes: int = 256 * 1024 * 1024, segment_bytes: int = 8 * 1024 * 1024) -> list:
+    """Open the store directories under ``parent`` whose owning process is gone (see ``SegmentStore``).
+
+    Directories in ``skip`` and those still locked by a live store are left
+    alone, as is anything without a store's lock file.
+    """
+    stores = []
+    try:
+        names = sorted(os.listdir(parent))
+    except OSError:
+        return stores
+    for name in names:
+        directory = os.path.join(parent, name)
+        if directory in skip or not os.path.isdir(directory):
+            continue
+        try:
+            stores.append(SegmentStore(directory, max_bytes, segment_bytes, adopt=True))
+        except OSError:
+            continue
+    return stores
+
+
+class GrpcReplaySender:
+    """Sends already-serialized OTLP export requests to a gRPC endpoint.
+
+    The request bytes are passed through unparsed. Raises ``grpc.RpcError``
+    if the endpoint rejects the request or is unreachable.
+    """
+
+    def __init__(self, endpoint: str, signal: str, headers: Optional[str] = None, timeout_seconds: float = 10.0, channel=None):
+        import grpc
+
+        parsed = urlparse(endpoint if "://" in endpoint else f"http://{endpoint}")
+        if channel is not None:
+            self._channel = channel
+        elif parsed.scheme == "https":
+            self._channel = grpc.secure_channel(parsed.netloc, grpc.ssl_channel_credentials())
+        else:
+            self._channel = grpc.insecure_channel(parsed.netloc)
+        # No serializers: the request and response stay raw bytes
+        self._export = self._channel.unary_unary(_EXPORT_METHODS[signal])
+        headers = headers if headers is not None else os.getenv("OTEL_EXPORTER_OTLP_HEADERS", "")
+        self._metadata = tuple(
+            (key.strip().lower(), value.strip())
+            for key, _, value in (h.partition("=") for h in headers.split(","))
+            if key.strip()
+        ) or None
+        self._timeout = timeout_seconds
+
+    def __call__(self, payload: bytes):
+        self._export(payload, metadata=self._metadata, timeout=self._timeout)
+
+    def close(self):
+        self._channel.close()
+
+
+class HttpReplaySender:
+    """Posts already-serialized OTLP export requests to an OTLP/HTTP endpoint URL.
+
+    Raises ``requests.RequestException`` if the endpoint rejects the request
+    or is unreachable.
+    """
+
+    def __init__(self, url: str, headers: Optional[dict] = None, timeout_seconds: float = 10.0, session=None):
+        import requests
+
+        self._url = url
+        self._session = session or requests.Session()
+        self._headers = {**(headers or {}), "Content-Type": "application/x-protobuf"}
+        self._timeout = timeout_seconds
+
+    def __call__(self, payload: bytes):
+        self._session.post(self._url, data=payload, headers=self._headers, timeout=self._timeout).raise_for_status()
+
+
+class _SpillingExporter:
+    """Shared spill and replay logic for the per-signal exporter wrappers.
+
+    While the endpoint is healthy, batches go to the wrapped exporter. When
+    an export fails, the batch is serialized as an OTLP export request and
+    appended to ``store``, and from then on batches go straight to disk
+    instead of waiting on exporter retries, so the batch processor queue in
+    front keeps draining instead of overflowing. A replay thread sends the
+    backlog with ``sender`` at up to ``replay_per_second`` requests per
+    second; the first successful send marks the endpoint healthy again.
+
+    With ``adopt_from``, the replay thread also looks there for the stores
+    of exporters whose process died (a crashed or recycled worker) at start
+    and whenever it is idle, replays their backlog after its own and deletes
+    their directories.
+    """
+
+    _encode: Callable = None
+    _SUCCESS = None
+    _FAILURE = None
+
+    def _init_spill(
+        self,
+        exporter,
+        signal: str,
+        store: SegmentStore,
+        sender: Callable[[bytes], None],
+        replay_per_second: float = 20.0,
+        retry_interval_seconds: float = 5.0,
+        adopt_from: Optional[str] = None,
+    ):
+        self._exporter = exporter
+        self._signal = signal
+        self._store = store
+        self._adopt_from = adopt_from
+        self._orphans = []
+        self._sender = sender
+        self._replay_interval = 1.0 / replay_per_second if replay_per_second > 0 else 0.0
+        self._retry_interval = retry_interval_seconds
+        self._healthy = True
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+
+        self.spilled = 0
+        self.replayed = 0
+        self.adopted = 0
+
+        self._thread = threading.Thread(target=self._replay_loop, name=f"OtlpSpillReplay-{signal}", daemon=True)
+        self._thread.start()
+
+    @property
+    def healthy(self) -> bool:
+        """False while exports are being spilled to disk."""
+        return self._healthy
+
+    def _export_or_spill(self, data, *args, **kwargs):
+        healthy = self._healthy
+        if healthy:
+            result = self._exporter.export(data, *args, **kwargs)
+            if result == self._SUCCESS:
+                return result
+        try:
+            self._store.append(self._encode(data).SerializeToString())
+        except Exception as e:
+            print(f"Warning: could not spill {self._signal} batch to disk: {e}", file=sys.stderr)
+            return self._FAILURE
+        self.spilled += 1
+        if healthy:
+            self._healthy = False
+            self._wakeup.set()
+        return self._SUCCESS
+
+    def _adopt_orphans(self):
+        if self._adopt_from is None:
+            return
+        skip = {self._store.directory, *(orphan.directory for orphan in self._orphans)}
+        store = self._store
+        for orphan in adopt_orphaned_stores(self._adopt_from, skip, store._max_bytes, store._segment_bytes):
+            self._orphans.append(orphan)
+            self.adopted += 1
+
+    def _replay_loop(self):
+        self._adopt_orphans()
+        while not self._stopped.is_set():
+            store = self._store
+            payload = store.peek()
+            while payload is None and self._orphans:
+                store = self._orphans[0]
+                payload = store.peek()
+                if payload is None:
+                    # Fully replayed: nobody will write to it again
+                    self._orphans.pop(0).remove()
+            if payload is None:
+                # Nothing left to replay: let the live path probe the endpoint again
+                self._healthy = True
+                self._wakeup.wait(self._retry_interval)
+                self._wakeup.clear()
+                self._adopt_orphans()
+                continue
+            try:
+                self._sender(payload)
+            except Exception:
+                self._healthy = False
+                self._stopped.wait(self._retry_interval)
+                continue
+            store.advance()
+            self.replayed += 1
+            self._healthy = True
+            if self._replay_interval:
+                self._stopped.wait(self._replay_interval)
+
+    def _shutdown_spill(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self._retry_interval + 1.0)
+        self._store.close()
+        # Left to the next process to adopt
+        for orphan in self._orphans:
+            orphan.close()
+        close = getattr(self._sender, "close", None)
+        if close is not None:
+            close()
+
+
+class SpillingSpanExporter(_SpillingExporter, SpanExporter):
+    """SpanExporter wrapper that spills failed batches to disk and replays them."""
+
+    _SUCCESS = SpanExportResult.SUCCESS
+    _FAILURE = SpanExportResult.FAILURE
+
+    def __init__(self, exporter: SpanExporter, store: SegmentStore, sender: Callable[[bytes], None], **kwargs):
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        self._encode = encode_spans
+        self._init_spill(exporter, SIGNAL_TRACES, store, sender, **kwargs)
+
+    def export(self, spans):
+        return self._export_or_spill(spans)
+
+    def shutdown(self):
+        self._shutdown_spill()
+        self._exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._exporter.force_flush(timeout_millis)
+
+
+class SpillingLogExporter(_SpillingExporter):
+    """LogExporter wrapper that spills failed batches to disk and replays them."""
+
+    def __init__(self, exporter, store: SegmentStore, sender: Callable[[bytes], None], **kwargs):
+        from opentelemetry.sdk._logs.export import LogExportResult
+        from opentelemetry.exporter.otlp.proto.common._log_encoder import encode_logs
+
+        self._SUCCESS = LogExportResult.SUCCESS
+        self._FAILURE = LogExportResult.FAILURE
+        self._encode = encode_logs
+        self._init_spill(exporter, SIGNAL_LOGS, store, sender, **kwargs)
+
+    def export(self, batch):
+        return self._export_or_spill(batch)
+
+    def shutdown(self):
+        self._shutdown_spill()
+        self._exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        force_flush = getattr(self._exporter, "force_flush", None)
+        return force_flush(timeout_millis) if force_flush is not None else True
+
+
+class SpillingMetricExporter(_SpillingExporter, MetricExporter):
+    """MetricExporter wrapper that spills failed exports to disk and replays them."""
+
+    _SUCCESS = MetricExportResult.SUCCESS
+    _FAILURE = MetricExportResult.FAILURE
+
+    def __init__(self, exporter: MetricExporter, store: SegmentStore, sender: Callable[[bytes], None], **kwargs):
+        from opentelemetry.exporter.otlp.proto.common.metrics_encoder import encode_metrics
+
+        # The reader takes temporality and aggregation preferences from its exporter
+        super().__init__()
+        self._preferred_temporality = exporter._preferred_temporality
+        self._preferred_aggregation = exporter._preferred_aggregation
+        self._encode = encode_metrics
+        self._init_spill(exporter, SIGNAL_METRICS, store, sender, **kwargs)
+
+    def export(self, metrics_data, timeout_millis: float = 10_000, **kwargs):
+        return self._export_or_spill(metrics_data, timeout_millis=timeout_millis, **kwargs)
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return self._exporter.force_flush(timeout_millis)
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs):
+        self._shutdown_spill()
+        self._exporter.shutdown(timeout_millis=timeout_millis, **kwargs)
+
+
+_SPILLING_EXPORTERS = {
+    SIGNAL_TRACES: SpillingSpanExporter,
+    SIGNAL_LOGS: SpillingLogExporter,
+    SIGNAL_METRICS: SpillingMetricExporter,
+}
+
+
+def with_spill(exporter, signal: str, otlp_endpoint: str, spill_config: Optional[dict] = None, sender: Optional[Callable[[bytes], None]] = None):
+    """Wrap an OTLP exporter with the disk spill buffer if ``OTLP_SPILL_ENABLED`` is set.
+
+    Each process spills to ``<OTLP_SPILL_DIR>/<signal>/<service.instance.id>``
+    and adopts the directories left there by processes that are gone.
+    ``sender`` replays the backlog; by default a ``GrpcReplaySender`` for
+    ``otlp_endpoint``. Returns ``exporter`` unchanged when spilling is
+    disabled or cannot be set up.
+    """
+    spill_config = spill_config or get_spill_config()
+    if not spill_config["enabled"]:
+        return exporter
+    try:
+        signal_dir = os.path.join(spill_config["directory"], signal)
+        directory = os.path.join(signal_dir, service_instance_id())
+        store = SegmentStore(directory, spill_config["max_bytes"], spill_config["segment_bytes"])
+        sender = sender or GrpcReplaySender(otlp_endpoint, signal)
+        wrapped = _SPILLING_EXPORTERS[signal](
+            exporter,
+            store,
+            sender,
+            replay_per_second=spill_config["replay_per_second"],
+            retry_interval_seconds=spill_config["retry_interval_seconds"],
+            adopt_from=signal_dir,
+        )
+    except Exception as e:
+        print(f"Warning: OTLP disk spill disabled for {signal}: {e}", file=sys.stderr)
+        return exporter
+    startup_print(f"✓ OTLP disk spill enabled for {signal}: {directory}")
+    return wrapped
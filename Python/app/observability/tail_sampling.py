@@ -0,0 +1,236 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from opentelemetry import metrics
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.sampling import Sampler
+from opentelemetry.trace import StatusCode
+
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+
+class _PendingTrace:
+    """Spans under one local root waiting for that root to end."""
+
+    __slots__ = ("spans", "has_error", "first_seen")
+
+    def __init__(self, first_seen: float):
+        self.spans = []
+        self.has_error = False
+        self.first_seen = first_seen
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Buffers spans per local root and decides whether to keep them when that root ends.
+
+    Each local root (a span without a parent in this process) is decided on
+    its own, so two requests continuing the same remote trace, or a detached
+    root, do not share a decision. A local root's spans are kept if any of
+    them has an error status, the root took at least ``latency_threshold_ms``,
+    the root's route is in ``route_allowlist`` (``/prefix/*`` matches by
+    prefix), or its trace ID falls under ``baseline_ratio``. Kept spans are
+    handed to ``downstream`` (normally the ``BatchSpanProcessor``); the rest
+    are dropped.
+
+    With ``baseline_sampler`` (e.g. an ``AdaptiveRateSampler``) the baseline
+    is that sampler's decision for the local root instead of a fixed ratio.
+    It is asked about every local root, kept for another reason or not, so
+    a rate-based sampler sees the full throughput.
+
+    Memory is bounded by ``max_buffered_spans``: when full, the oldest pending
+    trace is evicted. Traces whose root has not ended within
+    ``decision_wait_seconds`` are evicted too.
+    """
+
+    def __init__(
+        self,
+        downstream: SpanProcessor,
+        latency_threshold_ms: float = 500.0,
+        route_allowlist: Optional[Iterable[str]] = None,
+        baseline_ratio: float = 0.1,
+        max_buffered_spans: int = 50000,
+        max_spans_per_trace: int = 1000,
+        decision_wait_seconds: float = 30.0,
+        baseline_sampler: Optional[Sampler] = None,
+    ):
+        self._downstream = downstream
+        self._latency_threshold_ns = int(latency_threshold_ms * 1e6)
+        routes = [r.strip() for r in (route_allowlist or ()) if r and r.strip()]
+        self._route_exact = frozenset(r for r in routes if not r.endswith("*"))
+        self._route_prefixes = tuple(r[:-1] for r in routes if r.endswith("*"))
+        self._baseline_bound = round(max(0.0, min(baseline_ratio, 1.0)) * _TRACE_ID_LIMIT)
+        self._baseline_sampler = baseline_sampler
+        self._max_buffered_spans = max(max_buffered_spans, 1)
+        self._max_spans_per_trace = max(max_spans_per_trace, 1)
+        self._decision_wait = decision_wait_seconds
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        # Recent decisions by local root span ID, so children ending after
+        # their local root follow it
+        self._decided = OrderedDict()
+        self._max_decided = 10000
+        # Local root span ID of recently started spans, by span ID
+        self._local_roots = OrderedDict()
+        self._max_local_roots = self._max_buffered_spans + self._max_decided
+        self._buffered_spans = 0
+        self._next_sweep = time.monotonic() + min(self._decision_wait, 1.0)
+
+        self.traces_kept = 0
+        self.traces_dropped = 0
+        self.traces_evicted = 0
+        self.spans_dropped = 0
+
+        meter = metrics.get_meter("app.observability.tail_sampling")
+        meter.create_observable_gauge(
+            "tail_sampling.buffer.spans",
+            callbacks=[lambda options: [metrics.Observation(self._buffered_spans)]],
+            unit="{span}",
+            description="Spans held in memory awaiting a tail sampling decision",
+        )
+        meter.create_observable_gauge(
+            "tail_sampling.buffer.traces",
+            callbacks=[lambda options: [metrics.Observation(len(self._pending))]],
+            unit="{trace}",
+            description="Traces held in memory awaiting a tail sampling decision",
+        )
+        meter.create_observable_counter(
+            "tail_sampling.traces",
+            callbacks=[self._observe_traces],
+            unit="{trace}",
+            description="Traces by tail sampling outcome (kept, dropped, evicted)",
+        )
+
+    def _observe_traces(self, options):
+        return [
+            metrics.Observation(self.traces_kept, {"decision": "kept"}),
+            metrics.Observation(self.traces_dropped, {"decision": "dropped"}),
+            metrics.Observation(self.traces_evicted, {"decision": "evicted"}),
+        ]
+
+    @property
+    def buffered_spans(self) -> int:
+        """Number of spans currently buffered."""
+        return self._buffered_spans
+
+    def on_start(self, span, parent_context=None):
+        ctx = span.context
+        if ctx is not None and ctx.trace_flags.sampled:
+            parent = span.parent
+            with self._lock:
+                if parent is None or parent.is_remote:
+                    root = ctx.span_id
+                else:
+                    # A parent forgotten since it started is most often the root itself
+                    root = self._local_roots.get(parent.span_id, parent.span_id)
+                self._local_roots[ctx.span_id] = root
+                if len(self._local_roots) > self._max_local_roots:
+                    self._local_roots.popitem(last=False)
+        self._downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        ctx = span.context
+        if ctx is None or not ctx.trace_flags.sampled:
+            return
+
+        parent = span.parent
+        is_local_root = parent is None or parent.is_remote
+        is_error = span.status.status_code is StatusCode.ERROR
+        now = time.monotonic()
+
+        with self._lock:
+            if is_local_root:
+                root = ctx.span_id
+            else:
+                root = self._local_roots.get(ctx.span_id, parent.span_id)
+                if root in self._decided:
+                    if self._decided[root]:
+                        self._downstream.on_end(span)
+                    return
+
+            pending = self._pending.get(root)
+            if is_local_root:
+                if pending is not None:
+                    del self._pending[root]
+                    self._buffered_spans -= len(pending.spans)
+            elif pending is None:
+                pending = _PendingTrace(now)
+                self._pending[root] = pending
+
+            if not is_local_root:
+                if len(pending.spans) < self._max_spans_per_trace:
+                    pending.spans.append(span)
+                    self._buffered_spans += 1
+                else:
+                    self.spans_dropped += 1
+                pending.has_error = pending.has_error or is_error
+                self._enforce_limits(now)
+                return
+
+        # Local root ended: decide outside the lock
+        has_error = is_error or (pending is not None and pending.has_error)
+        keep = self._should_keep(span, ctx.trace_id, has_error)
+        with self._lock:
+            self._decided[root] = keep
+            if len(self._decided) > self._max_decided:
+                self._decided.popitem(last=False)
+            if keep:
+                self.traces_kept += 1
+            else:
+                self.traces_dropped += 1
+
+        if keep:
+            if pending is not None:
+                for child in pending.spans:
+                    self._downstream.on_end(child)
+            self._downstream.on_end(span)
+
+    def _should_keep(self, root, trace_id: int, has_error: bool) -> bool:
+        if self._baseline_sampler is not None:
+            baseline = self._baseline_sampler.should_sample(None, trace_id, root.name).decision.is_sampled()
+        else:
+            baseline = (trace_id & _TRACE_ID_LIMIT) < self._baseline_bound
+        if has_error:
+            return True
+        if root.end_time is not None and root.start_time is not None:
+            if root.end_time - root.start_time >= self._latency_threshold_ns:
+                return True
+        if self._route_exact or self._route_prefixes:
+            attributes = root.attributes or {}
+            route = attributes.get("http.route") or attributes.get("http.target")
+            if route:
+                if route in self._route_exact or route.startswith(self._route_prefixes):
+                    return True
+        return baseline
+
+    def _enforce_limits(self, now: float):
+        """Evict expired and, if over capacity, oldest pending traces (caller holds the lock)."""
+        if now >= self._next_sweep:
+            self._next_sweep = now + min(self._decision_wait, 1.0)
+            deadline = now - self._decision_wait
+            while self._pending:
+                oldest = next(iter(self._pending.values()))
+                if oldest.first_seen > deadline:
+                    break
+                self._evict_oldest()
+
+        while self._buffered_spans > self._max_buffered_spans and self._pending:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, evicted = self._pending.popitem(last=False)
+        self._buffered_spans -= len(evicted.spans)
+        self.traces_evicted += 1
+
+    def shutdown(self):
+        with self._lock:
+            self.traces_evicted += len(self._pending)
+            self._pending.clear()
+            self._decided.clear()
+            self._local_roots.clear()
+            self._buffered_spans = 0
+        self._downstream.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._downstream.force_flush(timeout_millis)
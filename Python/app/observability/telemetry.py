@@ -1,31 +1,143 @@
-from contextlib import contextmanager
-from typing import Optional
-from opentelemetry import trace
+import functools
+import inspect
+import sys
+from typing import Callable, Optional
+from opentelemetry import context, trace
 from opentelemetry.trace.status import Status, StatusCode
 
+_ATTRIBUTE_TYPES = (str, bool, int, float)
+
+
+def _attribute_value(value):
+    """Keep values OpenTelemetry accepts as they are (``days=3`` stays an int); anything else becomes its ``str()``."""
+    if isinstance(value, _ATTRIBUTE_TYPES):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, _ATTRIBUTE_TYPES) for v in value):
+        return tuple(value)
+    return str(value)
+
+
+def _attribute_dict(attributes: dict) -> dict:
+    return {k: _attribute_value(v) for k, v in attributes.items() if v is not None}
+
+
+def _record_failure(span, exc: Exception):
+    if span.is_recording():
+        span.record_exception(exc)
+        span.set_status(Status(StatusCode.ERROR, str(exc)))
+
+
+def _set_call_attributes(span, name: str, attributes_from: Callable[..., dict], args, kwargs):
+    """Add ``attributes_from(*args, **kwargs)`` to ``span``; a failing callback must not fail the call it describes."""
+    try:
+        span.set_attributes(_attribute_dict(attributes_from(*args, **kwargs)))
+    except Exception as e:
+        print(f"Error computing attributes for span '{name}': {e}", file=sys.stderr)
+
+
+class _SpanScope:
+    """Starts a span, makes it current and ends it; usable with ``with`` and ``async with``.
+
+    A plain class rather than a ``@contextmanager`` generator, and
+    ``attributes`` are only converted when the span is recording (sampled).
+    """
+
+    __slots__ = ("_tracer", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer, name: str, attributes: Optional[dict]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        span = self._span = self._tracer.start_span(self._name)
+        if self._attributes and span.is_recording():
+            span.set_attributes(_attribute_dict(self._attributes))
+        self._token = context.attach(trace.set_span_in_context(span))
+        return span
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if isinstance(exc, Exception):
+                _record_failure(self._span, exc)
+        finally:
+            context.detach(self._token)
+            self._span.end()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
 
 class TelemetryHelper:
     """Helper to start business-level spans using the global tracer."""
 
-    def __init__(self, service_name: str = "SampleServicePython"):
-        self._tracer = trace.get_tracer(service_name)
+    def __init__(self, service_name: str = "SampleServicePython", tracer_provider=None):
+        self._tracer = trace.get_tracer(service_name, tracer_provider=tracer_provider)
+
+    def start_business_span(self, span_name: str, attributes: Optional[dict] = None) -> _SpanScope:
+        """Start a business-level span with optional attributes (``with`` or ``async with``).
+
+        Attribute values keep their type when OpenTelemetry supports it and
+        are skipped entirely when the span is not sampled.
+        """
+        return _SpanScope(self._tracer, f"business.{span_name}", attributes)
+
+    def traced(self, span_name=None, attributes: Optional[dict] = None, attributes_from: Optional[Callable[..., dict]] = None):
+        """Decorator running a sync or ``async def`` function inside a business-level span.
 
-    @contextmanager
-    def start_business_span(self, span_name: str, attributes: Optional[dict] = None):
-        """Start a business-level span with optional attributes."""
-        with self._tracer.start_as_current_span(f"business.{span_name}") as span:
-            if attributes:
-                for k, v in attributes.items():
+        The span name (``business.<span_name>``, default the function's
+        qualified name) and the static ``attributes`` are resolved once, when
+        the function is decorated. ``attributes_from`` is called with the
+        function's arguments for per-call attributes, only when the span is
+        sampled; if it raises, the error is reported and the function still
+        runs. Use as ``@telemetry.traced`` or ``@telemetry.traced("Name", ...)``.
+        """
+        if callable(span_name):
+            return self.traced()(span_name)
+
+        tracer = self._tracer
+        static_attributes = _attribute_dict(attributes) if attributes else None
+
+        def decorate(func):
+            name = f"business.{span_name or func.__qualname__}"
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    span = tracer.start_span(name, attributes=static_attributes)
+                    if attributes_from is not None and span.is_recording():
+                        _set_call_attributes(span, name, attributes_from, args, kwargs)
+                    token = context.attach(trace.set_span_in_context(span))
                     try:
-                        span.set_attribute(k, str(v))
-                    except Exception:
-                        pass
-            try:
-                yield span
-            except Exception as exc:
+                        return await func(*args, **kwargs)
+                    except Exception as exc:
+                        _record_failure(span, exc)
+                        raise
+                    finally:
+                        context.detach(token)
+                        span.end()
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                span = tracer.start_span(name, attributes=static_attributes)
+                if attributes_from is not None and span.is_recording():
+                    _set_call_attributes(span, name, attributes_from, args, kwargs)
+                token = context.attach(trace.set_span_in_context(span))
                 try:
-                    span.record_exception(exc)
-                    span.set_status(Status(StatusCode.ERROR, str(exc)))
-                except Exception:
-                    pass
-                raise
\ No newline at end of file
+                    return func(*args, **kwargs)
+                except Exception as exc:
+                    _record_failure(span, exc)
+                    raise
+                finally:
+                    context.detach(token)
+                    span.end()
+
+            return wrapper
+
+        return decorate
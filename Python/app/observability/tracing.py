@@ -5,18 +5,31 @@ from opentelemetry import trace
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased, ALWAYS_ON
+from opentelemetry.sdk.trace.sampling import ParentBased, ALWAYS_ON
+from .config import get_tail_sampling_config, get_exporter_config, get_otlp_endpoint, get_metrics_config, get_redaction_config, get_span_metrics_config, get_startup_config, startup_print
+from .exporters import create_exporter
+from .workers import service_instance_id
+from .pipeline_metrics import MonitoredBatchSpanProcessor
+from .redaction import RedactingSpanProcessor, build_redactor
+from .sampling import SAMPLING_MODE_ADAPTIVE, RecordUnsampledSampler, build_adaptive_sampler, build_sampler
+from .span_metrics import SpanMetricsProcessor
+from .request_metrics import DEFAULT_DURATION_BUCKETS_MS
+from .tail_sampling import TailSamplingSpanProcessor
 
 
-def init_tracing(service_name: Optional[str] = None, otlp_endpoint: Optional[str] = None, sampling_ratio: Optional[float] = None):
-    """Initialize OpenTelemetry tracing."""
+def init_tracing(service_name: Optional[str] = None, otlp_endpoint: Optional[str] = None, sampling_ratio: Optional[float] = None, sampling_config: Optional[dict] = None):
+    """Initialize OpenTelemetry tracing.
+
+    ``sampling_config`` (see ``get_sampling_config``) selects the head sampler;
+    without it a fixed ``sampling_ratio`` is used.
+    """
     service_name = service_name or os.getenv("OTEL_SERVICE_NAME", "SampleServicePython")
-    otlp_endpoint = otlp_endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", os.getenv("OpenTelemetry__OtlpEndpoint", "http://localhost:4317"))
+    otlp_endpoint = otlp_endpoint or get_otlp_endpoint()
     
     resource = Resource.create({
         "service.name": service_name,
         "service.version": os.getenv("SERVICE_VERSION", "1.0.0"),
+        "service.instance.id": service_instance_id(),
         "deployment.environment": os.getenv("ENVIRONMENT", "development"),
     })
 
@@ -25,30 +38,82 @@ def init_tracing(service_name: Optional[str] = None, otlp_endpoint: Optional[str
         if sampling_ratio is None:
             sampling_ratio = 1.0 if os.getenv("ENVIRONMENT") == "development" else 0.1
 
-        if sampling_ratio >= 1.0:
-            sampler = ALWAYS_ON
-        else:
-            sampler = ParentBased(TraceIdRatioBased(sampling_ratio))
+        sampler = build_sampler(sampling_ratio, sampling_config)
     except Exception:
         sampler = ALWAYS_ON
 
-    print(f"Initializing tracing: service={service_name}, endpoint={otlp_endpoint}, sampling={sampling_ratio}", file=sys.stderr)
-    print(f"Using sampler: {sampler}", file=sys.stderr)
+    tail_sampling = get_tail_sampling_config()
+    baseline_sampler = None
+    if tail_sampling["enabled"]:
+        # Every local trace must be recorded for the tail decision; the head
+        # sampler becomes the tail processor's baseline instead.
+        if (sampling_config or {}).get("mode") == SAMPLING_MODE_ADAPTIVE:
+            if tail_sampling["baseline_ratio"] is not None:
+                print(
+                    "Warning: TAIL_SAMPLING_BASELINE_RATIO is ignored with adaptive sampling; "
+                    "the tail sampling baseline follows OPEN_TELEMETRY_SAMPLING_TARGET_PER_SECOND",
+                    file=sys.stderr,
+                )
+            baseline_sampler = build_adaptive_sampler(sampling_ratio, sampling_config)
+            tail_sampling["baseline_ratio"] = sampling_ratio
+        elif tail_sampling["baseline_ratio"] is None:
+            tail_sampling["baseline_ratio"] = sampling_ratio if sampling_ratio is not None else 0.1
+        sampler = ParentBased(ALWAYS_ON)
+
+    span_metrics = get_span_metrics_config()
+    if span_metrics["enabled"]:
+        # Unsampled spans are recorded (not exported) so span metrics count them
+        sampler = RecordUnsampledSampler(sampler)
+
+    startup_print(f"Initializing tracing: service={service_name}, endpoint={otlp_endpoint}, sampling={sampling_ratio}")
+    startup_print(f"Using sampler: {sampler}")
     
     provider = TracerProvider(resource=resource, sampler=sampler)
-    exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
-    span_processor = BatchSpanProcessor(exporter)
+    if span_metrics["enabled"]:
+        provider.add_span_processor(SpanMetricsProcessor(
+            max_attribute_sets=span_metrics["max_series"],
+            flush_spans=span_metrics["flush_spans"],
+            boundaries=get_metrics_config()["duration_buckets_ms"] or DEFAULT_DURATION_BUCKETS_MS,
+        ))
+        startup_print("✓ Span metrics enabled")
+    exporter_config = get_exporter_config()
+    exporter = create_exporter("traces", otlp_endpoint, exporter_config)
+    batch_processor_class = MonitoredBatchSpanProcessor if get_metrics_config()["pipeline_metrics_enabled"] else BatchSpanProcessor
+    span_processor = batch_processor_class(exporter, **exporter_config["span_batch"])
+    redactor = build_redactor(get_redaction_config())
+    if redactor is not None:
+        # Inside tail sampling, so only spans that are kept get redacted
+        span_processor = RedactingSpanProcessor(span_processor, redactor)
+        startup_print("✓ Span attribute redaction enabled")
+    if tail_sampling["enabled"]:
+        span_processor = TailSamplingSpanProcessor(
+            span_processor,
+            latency_threshold_ms=tail_sampling["latency_threshold_ms"],
+            route_allowlist=tail_sampling["route_allowlist"],
+            baseline_ratio=tail_sampling["baseline_ratio"],
+            max_buffered_spans=tail_sampling["max_buffered_spans"],
+            decision_wait_seconds=tail_sampling["decision_wait_seconds"],
+            baseline_sampler=baseline_sampler,
+        )
+        baseline = baseline_sampler.get_description() if baseline_sampler is not None else tail_sampling["baseline_ratio"]
+        startup_print(
+            f"✓ Tail sampling enabled: latency>={tail_sampling['latency_threshold_ms']}ms, "
+            f"routes={tail_sampling['route_allowlist']}, baseline={baseline}"
+        )
     provider.add_span_processor(span_processor)
     trace.set_tracer_provider(provider)
     
-    print("✓ Tracing initialized successfully", file=sys.stderr)
-    
+    startup_print("✓ Tracing initialized successfully")
+
+    if not get_startup_config()["test_span"]:
+        return provider
+
     try:
         tracer = trace.get_tracer(__name__)
         with tracer.start_as_current_span("test_span") as test_span:
             ctx = test_span.get_span_context()
             if ctx and ctx.trace_id != 0:
-                print(f"✓ Test span created successfully with TraceId: {format(ctx.trace_id, '032x')}", file=sys.stderr)
+                startup_print(f"✓ Test span created successfully with TraceId: {format(ctx.trace_id, '032x')}")
             else:
                 print("⚠ Warning: Test span has invalid trace_id", file=sys.stderr)
     except Exception as e:
@@ -0,0 +1,378 @@
+import os
+import re
+import sys
+import json
+import uuid
+import socket
+import threading
+from typing import Callable, Optional
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    AggregationTemporality,
+    Gauge,
+    Histogram,
+    Sum,
+)
+
+_SNAPSHOT_PREFIX = "metrics-"
+_SNAPSHOT_SUFFIX = ".json"
+# Counters and histograms of exited workers, folded together by compact_multiprocess_dir
+_EXITED_SNAPSHOT = f"{_SNAPSHOT_PREFIX}exited{_SNAPSHOT_SUFFIX}"
+
+# Prometheus naming rules of opentelemetry-exporter-prometheus (whose helpers
+# are private), so merged metrics keep the names of a single-process scrape
+_NAME_INVALID = re.compile(r"[^a-zA-Z0-9:]+")
+_LABEL_INVALID = re.compile(r"[^a-zA-Z0-9]+")
+_UNIT_ANNOTATION = re.compile(r"{.*}")
+_UNITS = {
+    "d": "days", "h": "hours", "min": "minutes", "s": "seconds",
+    "ms": "milliseconds", "us": "microseconds", "ns": "nanoseconds",
+    "By": "bytes", "KiBy": "kibibytes", "MiBy": "mebibytes", "GiBy": "gibibytes", "TiBy": "tibibytes",
+    "KBy": "kilobytes", "MBy": "megabytes", "GBy": "gigabytes", "TBy": "terabytes",
+    "m": "meters", "V": "volts", "A": "amperes", "J": "joules", "W": "watts", "g": "grams",
+    "Cel": "celsius", "Hz": "hertz", "1": "", "%": "percent",
+}
+_PER_UNITS = {"s": "second", "m": "minute", "h": "hour", "d": "day", "w": "week", "mo": "month", "y": "year"}
+
+_instance_id = None
+_instance_pid = None
+
+_deferred_init = None
+_deferred_init_pid = None
+_deferred_init_lock = threading.Lock()
+
+
+def service_instance_id() -> str:
+    """``service.instance.id`` for this process; a forked worker gets a new one."""
+    global _instance_id, _instance_pid
+    if _instance_pid != os.getpid():
+        _instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        _instance_pid = os.getpid()
+    return _instance_id
+
+
+def defer_until_startup(init: Callable[[], None]):
+    """Run ``init`` at ASGI lifespan startup (see ``run_deferred_init``) instead of now.
+
+    For pre-fork servers (``gunicorn --preload``): the parent only imports
+    the app, so no exporter threads or gRPC channels exist at fork time, and
+    each worker runs its own lifespan startup after it has been forked.
+    Running the init from an ``os.register_at_fork`` hook instead is not
+    safe: it can run before other modules' after-fork hooks have reset
+    their locks (``concurrent.futures`` among them) and deadlock.
+    """
+    global _deferred_init
+    _deferred_init = init
+
+
+def run_deferred_init():
+    """Run the init passed to ``defer_until_startup``, at most once per process."""
+    global _deferred_init_pid
+    if _deferred_init is None or _deferred_init_pid == os.getpid():
+        return
+    with _deferred_init_lock:
+        if _deferred_init_pid == os.getpid():
+            return
+        _deferred_init_pid = os.getpid()
+    try:
+        _deferred_init()
+    except Exception as e:
+        print(f"Warning: deferred observability init failed: {e}", file=sys.stderr)
+
+
+def clear_multiprocess_dir(directory: str):
+    """Remove worker metric snapshots left by a previous run (call once, before starting workers)."""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith(_SNAPSHOT_PREFIX):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshots(directory: str) -> dict:
+    """Snapshot file name to parsed snapshot, skipping files that are gone or half-written."""
+    snapshots = {}
+    for name in os.listdir(directory):
+        if not (name.startswith(_SNAPSHOT_PREFIX) and name.endswith(_SNAPSHOT_SUFFIX)):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots[name] = json.load(f)
+        except (OSError, ValueError):
+            continue
+    # Workers folded into the exited file but not yet deleted would count twice
+    absorbed = set(snapshots.get(_EXITED_SNAPSHOT, {}).get("absorbed", ()))
+    return {
+        name: snapshot for name, snapshot in snapshots.items()
+        if name == _EXITED_SNAPSHOT or snapshot.get("instance") not in absorbed
+    }
+
+
+def _snapshot_alive(snapshot: dict) -> bool:
+    pid = snapshot.get("pid")
+    return pid == os.getpid() or (pid is not None and _pid_alive(pid))
+
+
+def _merge_snapshots(snapshots) -> dict:
+    """Sum the points of ``snapshots`` per metric and attribute set.
+
+    Counters and histograms of every snapshot are summed; up-down counters
+    and gauges only of live workers, and gauges keep a ``pid`` attribute
+    per worker.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        pid = snapshot.get("pid")
+        alive = _snapshot_alive(snapshot)
+        for metric in snapshot["metrics"]:
+            kind = metric["kind"]
+            if kind in ("gauge", "updowncounter") and not alive:
+                continue
+            family = merged.setdefault((metric["name"], kind), {"metric": metric, "points": {}})
+            for point in metric["points"]:
+                attributes = point["attributes"]
+                if kind == "gauge":
+                    attributes = {**attributes, "pid": str(pid)}
+                key = tuple(sorted(attributes.items()))
+                existing = family["points"].get(key)
+                if existing is None:
+                    family["points"][key] = dict(point, attributes=attributes)
+                elif kind == "histogram":
+                    if existing["bounds"] == point["bounds"]:
+                        existing["counts"] = [a + b for a, b in zip(existing["counts"], point["counts"])]
+                        existing["sum"] += point["sum"]
+                else:
+                    existing["value"] += point["value"]
+    return merged
+
+
+def compact_multiprocess_dir(directory: str):
+    """Fold the snapshots of exited workers into one file, so the directory does not grow with every restart.
+
+    Their counters and histograms are added to ``metrics-exited.json`` and
+    their files deleted; totals at ``/metrics`` stay the same. Call from
+    one process only, e.g. the gunicorn master's ``child_exit`` hook (see
+    ``gunicorn.conf.py``).
+    """
+    try:
+        snapshots = _load_snapshots(directory)
+    except OSError:
+        return
+    exited = {
+        name: snapshot for name, snapshot in snapshots.items()
+        if name != _EXITED_SNAPSHOT and not _snapshot_alive(snapshot)
+    }
+    if not exited:
+        return
+    previous = snapshots.get(_EXITED_SNAPSHOT, {"metrics": []})
+    merged = _merge_snapshots([previous, *exited.values()])
+    compacted = {
+        "pid": None,
+        "instance": None,
+        # Lets readers skip the files below until they are deleted
+        "absorbed": [snapshot["instance"] for snapshot in exited.values() if snapshot.get("instance")],
+        "metrics": [dict(family["metric"], points=list(family["points"].values())) for family in merged.values()],
+    }
+    path = os.path.join(directory, _EXITED_SNAPSHOT)
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(compacted, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"Warning: could not compact metrics snapshots: {e}", file=sys.stderr)
+        return
+    for name in exited:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+class WorkerSnapshotExporter(MetricExporter):
+    """Writes this worker's cumulative metrics to ``<directory>/metrics-<service.instance.id>.json``.
+
+    Each export replaces the worker's file atomically; ``MultiprocessCollector``
+    merges the files of all workers at scrape time. Files are named by
+    instance rather than PID, so a new worker that gets the PID of an
+    exited one does not overwrite that worker's totals; the PID inside the
+    file is only used to tell whether the worker is still alive.
+    """
+
+    def __init__(self, directory: str):
+        from opentelemetry.sdk.metrics import (
+            Counter,
+            UpDownCounter,
+            Histogram as HistogramInstrument,
+            ObservableCounter,
+            ObservableUpDownCounter,
+            ObservableGauge,
+        )
+
+        # Cumulative everywhere so each snapshot is self-contained and files can be summed
+        super().__init__(preferred_temporality={
+            instrument: AggregationTemporality.CUMULATIVE
+            for instrument in (Counter, UpDownCounter, HistogramInstrument, ObservableCounter, ObservableUpDownCounter, ObservableGauge)
+        })
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+
+    def export(self, metrics_data, timeout_millis: float = 10_000, **kwargs):
+        instance = service_instance_id()
+        # Resolved per export: a worker forked after this exporter was created gets its own file
+        path = os.path.join(self._directory, f"{_SNAPSHOT_PREFIX}{instance}{_SNAPSHOT_SUFFIX}")
+        snapshot = {"pid": os.getpid(), "instance": instance, "metrics": []}
+        for resource_metrics in metrics_data.resource_metrics:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    entry = _snapshot_metric(metric)
+                    if entry is not None:
+                        snapshot["metrics"].append(entry)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Warning: could not write metrics snapshot: {e}", file=sys.stderr)
+            return MetricExportResult.FAILURE
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs):
+        pass
+
+
+def _snapshot_metric(metric) -> Optional[dict]:
+    data = metric.data
+    if isinstance(data, Sum):
+        kind = "counter" if data.is_monotonic else "updowncounter"
+    elif isinstance(data, Gauge):
+        kind = "gauge"
+    elif isinstance(data, Histogram):
+        kind = "histogram"
+    else:
+        return None
+
+    points = []
+    for point in data.data_points:
+        attributes = {k: str(v) for k, v in (point.attributes or {}).items()}
+        if kind == "histogram":
+            points.append({
+                "attributes": attributes,
+                "bounds": list(point.explicit_bounds),
+                "counts": list(point.bucket_counts),
+                "sum": point.sum,
+            })
+        else:
+            points.append({"attributes": attributes, "value": point.value})
+    return {
+        "name": metric.name,
+        "description": metric.description or "",
+        "unit": metric.unit or "",
+        "kind": kind,
+        "points": points,
+    }
+
+
+def _prometheus_name(name: str, invalid=_NAME_INVALID) -> str:
+    """Metric name (or, with ``_LABEL_INVALID``, label name) with invalid characters and a leading digit replaced by ``_``."""
+    if name and name[0].isdigit():
+        name = "_" + name[1:]
+    return invalid.sub("_", name)
+
+
+def _prometheus_unit(unit: str) -> str:
+    """Metric name suffix for ``unit``: ``ms`` -> ``milliseconds``, ``m/s`` -> ``meters_per_second``, ``{request}`` -> none."""
+    unit = _UNIT_ANNOTATION.sub("", unit)
+    if unit in _UNITS:
+        return _UNITS[unit]
+    top, sep, bottom = unit.partition("/")
+    bottom = _NAME_INVALID.sub("_", bottom)
+    if sep and bottom:
+        top = _NAME_INVALID.sub("_", top)
+        top = _UNITS.get(top, top)
+        bottom = _PER_UNITS.get(bottom, bottom)
+        return f"{top}_per_{bottom}" if top else f"per_{bottom}"
+    return _NAME_INVALID.sub("_", unit).strip("_")
+
+
+class MultiprocessCollector:
+    """prometheus_client collector that merges the snapshots of every worker.
+
+    Counters and histograms are summed over all snapshot files, including
+    those of workers that have exited, so totals never go backwards.
+    Up-down counters are summed over live workers only, and gauges are
+    reported per live worker with a ``pid`` label.
+    """
+
+    def __init__(self, directory: str, flush_local: Optional[Callable[[], None]] = None):
+        self._dir = directory
+        self._flush_local = flush_local
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+        if self._flush_local is not None:
+            try:
+                self._flush_local()
+            except Exception:
+                pass
+
+        merged = _merge_snapshots(_load_snapshots(self._dir).values())
+
+        for (name, kind), family in merged.items():
+            metric = family["metric"]
+            # One family per metric: points missing a label get it empty,
+            # which Prometheus treats the same as absent
+            label_keys = sorted({k for key in family["points"] for k, _ in key})
+            family_class = {
+                "counter": CounterMetricFamily,
+                "histogram": HistogramMetricFamily,
+            }.get(kind, GaugeMetricFamily)
+            prometheus_family = family_class(
+                _prometheus_name(name),
+                metric["description"],
+                labels=[_prometheus_name(k, _LABEL_INVALID) for k in label_keys],
+                unit=_prometheus_unit(metric["unit"]),
+            )
+            for key, point in family["points"].items():
+                attributes = dict(key)
+                values = [attributes.get(k, "") for k in label_keys]
+                if kind == "histogram":
+                    buckets, cumulative = [], 0
+                    for bound, count in zip(point["bounds"] + [float("inf")], point["counts"]):
+                        cumulative += count
+                        buckets.append(("+Inf" if bound == float("inf") else str(float(bound)), cumulative))
+                    prometheus_family.add_metric(values, buckets=buckets, sum_value=point["sum"])
+                else:
+                    prometheus_family.add_metric(values, point["value"])
+            yield prometheus_family
+
+
+def create_multiprocess_registry(directory: str):
+    """Prometheus registry with the merged metrics of all workers, flushing this worker's snapshot first."""
+    from prometheus_client import CollectorRegistry
+    from opentelemetry import metrics
+
+    def flush_local():
+        provider = metrics.get_meter_provider()
+        if hasattr(provider, "force_flush"):
+            provider.force_flush(timeout_millis=1000)
+
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(MultiprocessCollector(directory, flush_local=flush_local))
+    return registry
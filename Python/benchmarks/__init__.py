@@ -0,0 +1 @@
+"""In-process benchmarks for the observability package."""
@@ -0,0 +1,242 @@
+"""Shared helpers for the in-process benchmarks.
+
+Requests are driven straight through the ASGI callable so no server, socket
+or HTTP client library is involved in the numbers.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class NullSpanExporter:
+    """SpanExporter that accepts and discards every batch."""
+
+    def __init__(self):
+        self.exported = 0
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def silence_stdout_logs():
+    """Point the stdout logging handlers at os.devnull (records are still rendered)."""
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+    return devnull
+
+
+def make_scope(path: str, method: str = "GET", headers: list = None) -> dict:
+    """Build a minimal HTTP ASGI scope for ``path``."""
+    path, _, query = path.partition("?")
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost:8000"), (b"user-agent", b"benchmark")] + (headers or []),
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def asgi_call(app, scope: dict) -> int:
+    """Run one request through ``app`` and return the response status."""
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _drive(app, path: str, duration: float, concurrency: int) -> int:
+    deadline = time.perf_counter() + duration
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await asgi_call(app, make_scope(path))
+            done += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done
+
+
+def measure_rps(app, path: str, duration: float = 3.0, concurrency: int = 16) -> float:
+    """Return requests per second for ``path`` with ``concurrency`` in-flight requests."""
+    asyncio.run(_drive(app, path, 0.2, concurrency))
+    start = time.perf_counter()
+    done = asyncio.run(_drive(app, path, duration, concurrency))
+    return done / (time.perf_counter() - start)
+
+
+def measure_ops(fn, iterations: int = 100_000) -> float:
+    """Return calls per second of the zero-argument callable ``fn``."""
+    for _ in range(min(iterations, 1000)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def print_table(title: str, rows: list, columns: list):
+    """Print ``rows`` (list of tuples) under ``columns`` as a plain text table."""
+    widths = [max(len(str(c)), *(len(str(r[i])) for r in rows)) for i, c in enumerate(columns)]
+    print(f"\n{title}")
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def free_port() -> int:
+    """Return a TCP port on 127.0.0.1 that is currently free."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _count_spans(request: bytes) -> int:
+    from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+
+    message = ExportTraceServiceRequest.FromString(request)
+    return sum(len(ss.spans) for rs in message.resource_spans for ss in rs.scope_spans)
+
+
+class OtlpGrpcReceiver:
+    """Stand-in OTLP gRPC trace receiver that counts spans; can be stopped and restarted on the same port."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.spans = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _export(self, request: bytes, context) -> bytes:
+        count = _count_spans(request)
+        with self._lock:
+            self.spans += count
+        return b""
+
+    def start(self):
+        import grpc
+
+        handler = grpc.method_handlers_generic_handler(
+            "opentelemetry.proto.collector.trace.v1.TraceService",
+            {"Export": grpc.unary_unary_rpc_method_handler(self._export)},
+        )
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        self._server.add_generic_rpc_handlers((handler,))
+        self._server.add_insecure_port(f"127.0.0.1:{self.port}")
+        self._server.start()
+
+    def stop(self):
+        self._server.stop(grace=None).wait()
+
+
+class OtlpHttpReceiver:
+    """Stand-in OTLP/HTTP trace receiver (``POST /v1/traces``) that counts spans and request bytes."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.spans = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                size = len(body)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                count = _count_spans(body)
+                with receiver._lock:
+                    receiver.spans += count
+                    receiver.bytes_received += size
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class OtlpGrpcSink:
+    """No-op OTLP gRPC collector: accepts trace, log and metric exports and discards them."""
+
+    _SERVICES = (
+        "opentelemetry.proto.collector.trace.v1.TraceService",
+        "opentelemetry.proto.collector.logs.v1.LogsService",
+        "opentelemetry.proto.collector.metrics.v1.MetricsService",
+    )
+
+    def __init__(self, port: int):
+        self.port = port
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _export(self, request: bytes, context) -> bytes:
+        with self._lock:
+            self.requests += 1
+        # An empty message is a valid Export*ServiceResponse
+        return b""
+
+    def start(self):
+        import grpc
+
+        handlers = tuple(
+            grpc.method_handlers_generic_handler(service, {"Export": grpc.unary_unary_rpc_method_handler(self._export)})
+            for service in self._SERVICES
+        )
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        self._server.add_generic_rpc_handlers(handlers)
+        self._server.add_insecure_port(f"127.0.0.1:{self.port}")
+        self._server.start()
+
+    def stop(self):
+        self._server.stop(grace=None).wait()
@@ -0,0 +1,84 @@
+"""Span export throughput per OTLP exporter configuration.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_exporters [--spans 20000] [--batch-sizes 128,512,2048]
+
+Builds exporters with ``create_exporter`` for each protocol/compression
+pair and exports pre-built spans in batches to a stand-in collector on
+localhost, so serialization, compression and transport are what differ.
+"""
+import argparse
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.observability.config import get_exporter_config
+from app.observability.exporters import PROTOCOL_GRPC, PROTOCOL_HTTP, create_exporter
+from benchmarks._common import OtlpGrpcReceiver, OtlpHttpReceiver, free_port, print_table
+
+
+def _make_spans(count: int) -> list:
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    tracer = provider.get_tracer("benchmark")
+    for i in range(count):
+        with tracer.start_as_current_span("GET /weatherforecast/days/{days}", attributes={
+            "http.method": "GET",
+            "http.route": "/weatherforecast/days/{days}",
+            "http.target": f"/weatherforecast/days/{i % 5}",
+            "http.status_code": 200,
+            "net.peer.ip": "127.0.0.1",
+            "user_agent.original": "Mozilla/5.0 (X11; Linux x86_64) benchmark",
+        }):
+            pass
+    return list(memory.get_finished_spans())
+
+
+def _export_all(exporter, spans: list, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(spans), batch_size):
+        exporter.export(spans[i:i + batch_size])
+    return len(spans) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=20000)
+    parser.add_argument("--batch-sizes", default="128,512,2048")
+    args = parser.parse_args()
+
+    spans = _make_spans(args.spans)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    rows = []
+    for protocol, receiver_class in ((PROTOCOL_GRPC, OtlpGrpcReceiver), (PROTOCOL_HTTP, OtlpHttpReceiver)):
+        for compression in ("none", "gzip"):
+            receiver = receiver_class(free_port())
+            receiver.start()
+            config = {**get_exporter_config(), "protocol": protocol, "compression": compression}
+            config["endpoints"] = {"traces": None, "logs": None, "metrics": None}
+            exporter = create_exporter("traces", f"http://127.0.0.1:{receiver.port}", config)
+            _export_all(exporter, spans[:1000], 500)
+            for batch_size in batch_sizes:
+                received = receiver.spans
+                wire = getattr(receiver, "bytes_received", None)
+                rate = _export_all(exporter, spans, batch_size)
+                lost = len(spans) - (receiver.spans - received)
+                wire = f"{(receiver.bytes_received - wire) / len(spans):.0f}" if wire is not None else "-"
+                rows.append((protocol, compression, batch_size, f"{rate:,.0f}", wire, lost))
+            exporter.shutdown()
+            receiver.stop()
+
+    print_table(
+        f"OTLP span export to a local stand-in collector ({args.spans} spans)",
+        rows,
+        ["protocol", "compression", "batch", "spans/s", "bytes/span", "lost"],
+    )
+
+
+if __name__ == "__main__":
+    main()
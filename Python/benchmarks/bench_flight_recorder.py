@@ -0,0 +1,90 @@
+"""Per-request cost of the flight recorder when a request's debug events are discarded or flushed.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_flight_recorder [--requests 20000] [--events 20]
+
+Logs ``--events`` debug events per request through a structlog pipeline
+that timestamps and renders JSON to os.devnull, and compares: debug
+filtered out by the logger level (today's production setting), debug
+rendered for every request, and the flight recorder discarding or
+flushing each request's buffer. The discard path should cost close to the
+filtered one. Finally checks the per-request and global buffer caps.
+"""
+import argparse
+import logging
+import os
+
+import structlog
+
+from app.observability.flight_recorder import FlightRecorder
+from benchmarks._common import measure_ops, print_table
+
+_LOGGER = "main.controllers.WeatherForecastController"
+
+
+def _logger(stream, level: int, recorder: FlightRecorder = None):
+    timestamper = structlog.processors.TimeStamper(fmt="iso")
+    processors = [structlog.processors.add_log_level, timestamper, structlog.processors.JSONRenderer()]
+    if recorder is not None:
+        recorder.set_replay_processors(processors, timestamper)
+        processors = [recorder] + processors
+    wrapper_class = structlog.make_filtering_bound_logger(level)
+    if recorder is not None:
+        wrapper_class = recorder.wrap_class(wrapper_class)
+    return structlog.wrap_logger(structlog.PrintLogger(stream), processors=processors, wrapper_class=wrapper_class).bind(logger=_LOGGER)
+
+
+def _request(log, events: int, recorder: FlightRecorder = None, flush: bool = False):
+    recording = recorder.start() if recorder is not None else None
+    for i in range(events):
+        log.debug("Forecast step computed", step=i, days=5, temperatureC=21)
+    if recording is not None:
+        recorder.finish(recording, flush)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=20, help="debug events per request")
+    args = parser.parse_args()
+
+    rows = []
+    baseline = None
+    with open(os.devnull, "w") as devnull:
+        recorder = FlightRecorder(max_events=args.events)
+        variants = [
+            ("debug filtered by level (no detail)", _logger(devnull, logging.INFO), None, False),
+            ("debug rendered for every request", _logger(devnull, logging.DEBUG), None, False),
+            ("flight recorder, discarded", _logger(devnull, logging.INFO, recorder), recorder, False),
+            ("flight recorder, flushed", _logger(devnull, logging.INFO, recorder), recorder, True),
+        ]
+        for name, log, rec, flush in variants:
+            ops = measure_ops(lambda: _request(log, args.events, rec, flush), args.requests)
+            us = 1e6 / ops
+            baseline = baseline if baseline is not None else us
+            rows.append((name, f"{us:,.1f}", f"{(us - baseline) * 1000 / args.events:+,.0f}"))
+    print_table(f"{args.events} debug events per request", rows, ["variant", "us/request", "ns/event vs filtered"])
+
+    # Caps: 5 events per request and 12 slots across requests; three
+    # requests log 8 events each and get 5, 5 and 2 slots
+    with open(os.devnull, "w") as devnull:
+        recorder = FlightRecorder(max_events=5, max_buffered_events=12)
+        log = _logger(devnull, logging.INFO, recorder)
+        recordings = []
+        for _ in range(3):
+            recordings.append(recorder.start())
+            for i in range(8):
+                log.debug("step", step=i)
+        capacities = [r.capacity for r in recordings]
+        buffered = sum(len(r.events) for r in recordings)
+        for recording in reversed(recordings):
+            recorder.finish(recording, False)
+    ok = capacities == [5, 5, 2] and buffered == 12 and recorder.dropped == 12 and recorder._reserved == 0
+    print(
+        f"\ncaps: capacities {capacities}, {buffered} buffered, {recorder.dropped} lost past the caps, "
+        f"{recorder._reserved} slots reserved after finish: {'ok' if ok else 'MISMATCH'}"
+    )
+
+if __name__ == "__main__":
+    main()
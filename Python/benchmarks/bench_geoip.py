@@ -0,0 +1,184 @@
+"""GeoIP country lookups per second with a cold and a warm LRU cache.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_geoip [--networks 20000] [--clients 5000] [--database GeoLite2-Country.mmdb]
+
+Without ``--database`` a small IPv4 country database is generated into a
+temporary directory (random global /16-/24 networks across a handful of
+countries), so no MaxMind download is needed. The client IP workload mixes
+addresses inside those networks, unlisted public addresses and private and
+loopback ones. Reports uncached reader lookups, a cold ``GeoIpLookup``
+(one pass over distinct IPs) and a warm one (repeat passes), with the hit rate.
+"""
+import argparse
+import ipaddress
+import os
+import random
+import struct
+import tempfile
+import time
+
+from app.observability.geoip import GeoIpLookup
+from benchmarks._common import print_table
+
+_COUNTRIES = ("US", "DE", "FR", "GB", "JP", "BR", "IN", "CA", "AU", "NL", "SE", "ES", "IT", "PL", "KR")
+_METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+_UINT16, _UINT32, _UINT64 = 5, 6, 9
+
+
+def _control(type_id: int, size: int) -> bytes:
+    """MMDB data section control byte(s) for a field of ``type_id`` and ``size``."""
+    if size < 29:
+        head, extra = size, b""
+    elif size < 285:
+        head, extra = 29, bytes([size - 29])
+    else:
+        head, extra = 30, struct.pack(">H", size - 285)
+    if type_id <= 7:
+        return bytes([(type_id << 5) | head]) + extra
+    return bytes([head, type_id - 7]) + extra
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, str):
+        data = value.encode()
+        return _control(2, len(data)) + data
+    if isinstance(value, tuple):
+        # (type_id, n): unsigned integer of an explicit type, as the metadata requires
+        type_id, n = value
+        data = n.to_bytes(8, "big").lstrip(b"\0")
+        return _control(type_id, len(data)) + data
+    if isinstance(value, list):
+        return _control(11, len(value)) + b"".join(_encode(v) for v in value)
+    if isinstance(value, dict):
+        return _control(7, len(value)) + b"".join(_encode(k) + _encode(v) for k, v in value.items())
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def write_country_mmdb(path: str, networks: dict):
+    """Write an IPv4 MaxMind-format database mapping each CIDR in ``networks`` to ``{"country": {"iso_code": ...}}``."""
+    data, offsets = bytearray(), {}
+    nodes = [[None, None]]
+    # Shorter prefixes first, so a more specific network is never overwritten
+    for cidr, iso_code in sorted(networks.items(), key=lambda item: ipaddress.IPv4Network(item[0]).prefixlen):
+        if iso_code not in offsets:
+            offsets[iso_code] = len(data)
+            data += _encode({"country": {"iso_code": iso_code}})
+        network = ipaddress.IPv4Network(cidr)
+        bits, node = int(network.network_address), 0
+        for depth in range(network.prefixlen):
+            bit = (bits >> (31 - depth)) & 1
+            if depth == network.prefixlen - 1:
+                nodes[node][bit] = ("data", offsets[iso_code])
+            else:
+                child = nodes[node][bit]
+                if not isinstance(child, int):
+                    # a shorter network already covers this one; keep the more specific entry below it
+                    nodes.append([child, child])
+                    child = nodes[node][bit] = len(nodes) - 1
+                node = child
+
+    node_count = len(nodes)
+
+    def record(value) -> int:
+        if value is None:
+            return node_count
+        if isinstance(value, int):
+            return value
+        return node_count + 16 + value[1]
+
+    tree = b"".join(record(left).to_bytes(3, "big") + record(right).to_bytes(3, "big") for left, right in nodes)
+    metadata = {
+        "binary_format_major_version": (_UINT16, 2),
+        "binary_format_minor_version": (_UINT16, 0),
+        "build_epoch": (_UINT64, int(time.time())),
+        "database_type": "Benchmark-Country",
+        "description": {"en": "Generated benchmark fixture"},
+        "ip_version": (_UINT16, 4),
+        "languages": ["en"],
+        "node_count": (_UINT32, node_count),
+        "record_size": (_UINT16, 24),
+    }
+    with open(path, "wb") as f:
+        f.write(tree + b"\0" * 16 + bytes(data) + _METADATA_MARKER + _encode(metadata))
+
+
+def _random_networks(rng: random.Random, count: int) -> dict:
+    networks = {}
+    while len(networks) < count:
+        prefix = rng.choice((16, 20, 24))
+        network = ipaddress.IPv4Network((rng.getrandbits(32), prefix), strict=False)
+        if network.is_global:
+            networks[str(network)] = rng.choice(_COUNTRIES)
+    return networks
+
+
+def _client_ips(rng: random.Random, networks: dict, count: int) -> list:
+    listed = [ipaddress.IPv4Network(n) for n in networks]
+    ips = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 7:
+            network = rng.choice(listed)
+            ips.append(str(network.network_address + rng.randrange(network.num_addresses)))
+        elif kind < 9:
+            ips.append(str(ipaddress.IPv4Address(rng.getrandbits(32))))
+        else:
+            ips.append(rng.choice(("127.0.0.1", "10.0.3.7", "192.168.1.20", "172.17.0.2")))
+    return ips
+
+
+def _lookups_per_second(fn, ips: list, passes: int) -> float:
+    start = time.perf_counter()
+    for _ in range(passes):
+        for ip in ips:
+            fn(ip)
+    return passes * len(ips) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--networks", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=5000, help="distinct client IPs in the workload")
+    parser.add_argument("--passes", type=int, default=20, help="passes over the workload with a warm cache")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--database", help="existing .mmdb file to use instead of a generated one")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    networks = _random_networks(rng, args.networks)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database
+        if database is None:
+            database = os.path.join(tmp, "country.mmdb")
+            write_country_mmdb(database, networks)
+        ips = _client_ips(rng, networks, args.clients)
+        rng.shuffle(ips)
+
+        lookup = GeoIpLookup(database, cache_size=args.cache_size)
+        if args.database is None:
+            resolved = [ip for ip in ips[:200] if lookup.country(ip)]
+            assert resolved, "no client IP resolved against the generated database"
+        rows = [("reader only (no cache)", f"{_lookups_per_second(lookup.country.__wrapped__, ips, 1):,.0f}", "-")]
+        lookup.close()
+
+        lookup = GeoIpLookup(database, cache_size=args.cache_size)
+        cold = _lookups_per_second(lookup.country, ips, 1)
+        rows.append(("GeoIpLookup, cold cache", f"{cold:,.0f}", f"{lookup.stats['hit_rate']:.1%}"))
+        warm = _lookups_per_second(lookup.country, ips, args.passes)
+        stats = lookup.stats
+        rows.append(("GeoIpLookup, warm cache", f"{warm:,.0f}", f"{stats['hit_rate']:.1%}"))
+        lookup.close()
+
+    print_table(
+        f"GeoIP lookups over {len(ips):,} client IPs ({len(networks):,} networks, cache size {args.cache_size:,})",
+        rows,
+        ["lookup", "lookups/s", "hit rate"],
+    )
+    print(f"cache: {stats['hits']:,} hits, {stats['misses']:,} misses, {stats['size']:,} entries")
+
+
+if __name__ == "__main__":
+    main()
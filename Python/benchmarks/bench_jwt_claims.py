@@ -0,0 +1,95 @@
+"""Per-request cost of JWT user context extraction with repeated and unique tokens.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_jwt_claims [--requests 20000] [--tokens 2000]
+
+Signs RS256 tokens with a freshly generated key (PyJWT[crypto] required)
+and writes its JWKS to a temporary file. Each ``JwtClaimsCache`` mode is
+timed without a cache (``cache_size=0``) and with one, on a workload that
+reuses one token per client (``--tokens`` distinct tokens spread over
+``--requests`` requests) and on one where every request has a new token.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from opentelemetry.sdk.metrics import MeterProvider
+
+from app.observability.jwt_claims import JwtClaimsCache
+from benchmarks._common import print_table
+
+
+def _write_jwks(path: str, private_key, kid: str):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    with open(path, "w") as f:
+        json.dump({"keys": [jwk]}, f)
+
+
+def _tokens(private_key, kid: str, count: int) -> list:
+    exp = int(time.time()) + 3600
+    return [
+        "Bearer " + jwt.encode(
+            {"sub": f"user-{i}", "tenant_id": f"tenant-{i % 50}", "role": "reader", "exp": exp},
+            private_key,
+            algorithm="RS256",
+            headers={"kid": kid},
+        )
+        for i in range(count)
+    ]
+
+
+def _us_per_request(cache: JwtClaimsCache, headers: list) -> float:
+    start = time.perf_counter()
+    for header in headers:
+        cache.user_context(header)
+    return (time.perf_counter() - start) * 1e6 / len(headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=2000, help="distinct tokens in the repeated workload")
+    args = parser.parse_args()
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    repeated_tokens = _tokens(private_key, "bench", args.tokens)
+    repeated = [repeated_tokens[i % args.tokens] for i in range(args.requests)]
+    unique = _tokens(private_key, "bench", args.requests)
+    meter = MeterProvider().get_meter("benchmark")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        jwks_file = os.path.join(tmp, "jwks.json")
+        _write_jwks(jwks_file, private_key, "bench")
+        for mode in ("unverified", "verified"):
+            for workload, headers in (("repeated tokens", repeated), ("unique tokens", unique)):
+                baseline = None
+                for cache_size in (0, 10000):
+                    cache = JwtClaimsCache(mode, jwks_file=jwks_file, cache_size=cache_size, meter=meter)
+                    us = _us_per_request(cache, headers)
+                    assert cache.user_context(headers[0])["id"].startswith("user-")
+                    baseline = baseline or us
+                    rows.append((
+                        mode,
+                        workload,
+                        "off" if cache_size == 0 else f"{cache_size:,}",
+                        f"{us:.2f}",
+                        f"{baseline / us:.1f}x",
+                        f"{cache.stats['hit_rate']:.1%}",
+                    ))
+
+    print_table(
+        f"JWT user context over {args.requests:,} requests ({args.tokens:,} distinct tokens when repeated)",
+        rows,
+        ["mode", "workload", "cache", "us/request", "speedup", "hit rate"],
+    )
+
+
+if __name__ == "__main__":
+    main()
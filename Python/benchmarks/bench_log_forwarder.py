@@ -0,0 +1,132 @@
+"""Log lines per second through the OTEL log forwarder.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_log_forwarder [--iterations 20000]
+
+Compares the previous per-call ``_otel_log_forwarder`` function (kept below
+as a reference copy) with ``OtelLogForwarder``, both forwarding into a
+LoggerProvider whose processor discards records, so only the forwarder and
+SDK record construction are measured.
+"""
+import argparse
+import sys
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+
+from app.observability.config import (
+    _LOGS_AVAILABLE,
+    LoggerProvider,
+    LogRecord,
+    SeverityNumber,
+    get_otel_logger_provider,
+    set_otel_logger_provider,
+)
+from app.observability.logging import OtelLogForwarder, _add_trace_fields
+from benchmarks._common import measure_ops, print_table
+
+
+def _legacy_otel_log_forwarder(logger, method_name, event_dict):
+    """Reference copy of the forwarder before it became a stateful object."""
+    otel_logger_provider = get_otel_logger_provider()
+    try:
+        otel_logger = otel_logger_provider.get_logger(event_dict.get("logger", "app.middleware.observability_middleware"))
+        level = event_dict.get("level", "info").lower()
+        severity_map = {
+            "debug": SeverityNumber.DEBUG,
+            "info": SeverityNumber.INFO,
+            "warning": SeverityNumber.WARN,
+            "error": SeverityNumber.ERROR,
+            "critical": SeverityNumber.FATAL,
+        }
+        severity = severity_map.get(level, SeverityNumber.INFO)
+        span = trace.get_current_span()
+        trace_id = span_id = trace_flags = None
+        if span:
+            ctx = span.get_span_context()
+            if ctx and ctx.trace_id != 0:
+                trace_id, span_id, trace_flags = ctx.trace_id, ctx.span_id, ctx.trace_flags
+        attributes = {}
+        for k, v in event_dict.items():
+            if k not in {"event", "level", "timestamp", "logger"}:
+                if k in ["TraceId", "trace_id"] and trace_id:
+                    attributes[k] = format(trace_id, "032x")
+                elif k in ["SpanId", "span_id"] and span_id:
+                    attributes[k] = format(span_id, "016x")
+                else:
+                    attributes[k] = str(v) if not isinstance(v, (str, int, float, bool, type(None))) else v
+        otel_logger.emit(LogRecord(
+            timestamp=None, trace_id=trace_id, span_id=span_id, trace_flags=trace_flags,
+            severity_text=level.upper(), severity_number=severity,
+            body=event_dict.get("event", ""), attributes=attributes,
+        ))
+    except Exception as e:
+        print(f"Error forwarding log to OTEL: {e}", file=sys.stderr)
+    return event_dict
+
+
+class _DiscardProcessor:
+    """LogRecordProcessor that drops every record."""
+
+    def on_emit(self, log_data):
+        pass
+
+    def emit(self, log_data):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000):
+        return True
+
+
+def _event() -> dict:
+    return {
+        "event": "Request finished 1.1 GET http://localhost/ - 200 57 application/json 1.234ms",
+        "level": "info",
+        "logger": "app.middleware.observability_middleware",
+        "timestamp": "2025-11-27T08:04:44.039716Z",
+        "http": {"method": "GET", "path": "/", "statusCode": 200, "duration": 1.234},
+        "client": {"ip": "127.0.0.1"},
+        "StatusCode": 200,
+        "ContentLength": "57",
+        "ContentType": "application/json",
+        "ElapsedMilliseconds": 1.234,
+        "RequestPath": "/",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    if not _LOGS_AVAILABLE:
+        sys.exit("OpenTelemetry Logs SDK not available")
+
+    provider = LoggerProvider(resource=Resource.create({"service.name": "benchmark"}))
+    provider.add_log_record_processor(_DiscardProcessor())
+    set_otel_logger_provider(provider)
+    tracer = TracerProvider().get_tracer(__name__)
+    forwarder = OtelLogForwarder()
+
+    rows = []
+    with tracer.start_as_current_span("benchmark"):
+        variants = [
+            ("_otel_log_forwarder (before)", lambda: _legacy_otel_log_forwarder(None, "info", _add_trace_fields(None, "info", _event()))),
+            ("OtelLogForwarder (after)", lambda: forwarder(None, "info", _add_trace_fields(None, "info", _event()))),
+        ]
+        baseline = None
+        for name, fn in variants:
+            ops = measure_ops(fn, args.iterations)
+            baseline = baseline or ops
+            rows.append((name, f"{ops:,.0f}", f"{ops / baseline:.2f}x"))
+
+    print_table("OTEL log forwarding (trace fields + forward)", rows, ["forwarder", "lines/s", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
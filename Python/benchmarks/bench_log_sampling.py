@@ -0,0 +1,95 @@
+"""Overhead of LogSamplingProcessor, and what it saves on a noisy route.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_log_sampling [--iterations 100000]
+
+First times the processor alone on one event per decision path. Then logs
+``/health`` request lines through a structlog pipeline that timestamps and
+renders JSON to os.devnull, without the processor and with a rule keeping
+1% of ``/health``, so the cost of sampling can be set against the
+rendering it avoids.
+"""
+import argparse
+import os
+import uuid
+
+import structlog
+
+from app.observability.log_sampling import LogSamplingProcessor, LogSamplingRule
+from benchmarks._common import measure_ops, print_table
+
+_LOGGER = "app.middleware.observability_middleware"
+
+
+def _event(level: str, path: str, event: str = "Request finished 1.1 GET http://localhost/health - 200 2 application/json 0.100ms") -> dict:
+    return {
+        "event": event,
+        "level": level,
+        "logger": _LOGGER,
+        "requestId": str(uuid.uuid4()),
+        "RequestPath": path,
+        "message_template_text": "Request finished {Protocol} {Method} {Scheme}://{Host}{Path} - {StatusCode} {ContentLength} {ContentType} {ElapsedMilliseconds}ms",
+    }
+
+
+def _call(processor, event: dict):
+    try:
+        processor(None, event["level"], dict(event))
+    except structlog.DropEvent:
+        pass
+
+
+def _pipeline(sampler, stream):
+    processors = [structlog.processors.add_log_level]
+    if sampler is not None:
+        processors.append(sampler)
+    processors += [structlog.processors.TimeStamper(fmt="iso"), structlog.processors.JSONRenderer()]
+    return structlog.wrap_logger(structlog.PrintLogger(stream), processors=processors).bind(logger=_LOGGER)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    processor = LogSamplingProcessor(
+        [
+            LogSamplingRule(route="/health", rate=0.0),
+            LogSamplingRule(route="/busy/*", per_second=10.0),
+            LogSamplingRule(route="/business", rate=1.0),
+        ],
+        suppress_request_started=True,
+        summary_interval_seconds=3600,
+    )
+    paths = [
+        ("warning (always kept)", _event("warning", "/health")),
+        ("info, no rule matches", _event("info", "/weatherforecast")),
+        ("info, rule keeps", _event("info", "/business")),
+        ("info, sampled out", _event("info", "/health")),
+        ("info, rate limited", _event("info", "/busy/1")),
+        ("Request started suppressed", _event("info", "/", event="Request started")),
+    ]
+    rows = []
+    for name, event in paths:
+        ops = measure_ops(lambda: _call(processor, event), args.iterations)
+        rows.append((name, f"{1e9 / ops:,.0f}"))
+    print_table("LogSamplingProcessor alone", rows, ["path", "ns/event"])
+
+    rows = []
+    with open(os.devnull, "w") as devnull:
+        for name, sampler in (
+            ("no sampling", None),
+            ("route=/health,rate=0.01", LogSamplingProcessor([LogSamplingRule(route="/health", rate=0.01)], summary_interval_seconds=3600)),
+        ):
+            log = _pipeline(sampler, devnull)
+            ops = measure_ops(
+                lambda: log.info("Request finished", RequestPath="/health", requestId=str(uuid.uuid4()), StatusCode=200),
+                args.iterations // 4,
+            )
+            rows.append((name, f"{ops:,.0f}", f"{1e6 / ops:.2f}"))
+    print_table("/health request lines through timestamp + JSON render", rows, ["pipeline", "lines/s", "us/line"])
+
+
+if __name__ == "__main__":
+    main()
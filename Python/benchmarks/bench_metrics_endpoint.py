@@ -0,0 +1,122 @@
+"""Scrape latency of the Prometheus endpoint at high series counts, with and without the snapshot cache.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_metrics_endpoint [--series 10000] [--scrapers 8] [--scrapes 5]
+
+Creates ``--series`` counter series and a tenth as many histogram series on
+a ``PrometheusMetricReader`` and times one scrape rendered from scratch
+(what every scrape cost before the cache), a scrape served from a fresh
+snapshot, and the gzip form. Then ``--scrapers`` threads scrape the
+``MetricsServer`` listener at once, ``--scrapes`` times each: the cache
+must render once per round however many scrapers arrive, and the gzip
+body must decompress to the plain one.
+"""
+import argparse
+import gzip
+import statistics
+import threading
+import time
+import urllib.request
+
+from opentelemetry.exporter.prometheus import PrometheusMetricReader
+from opentelemetry.sdk.metrics import MeterProvider
+from prometheus_client import REGISTRY, generate_latest
+
+from app.observability.metrics_endpoint import MetricsServer, ScrapeCache
+from benchmarks._common import print_table
+
+
+def _populate(series: int):
+    provider = MeterProvider(metric_readers=[PrometheusMetricReader()])
+    meter = provider.get_meter("benchmark")
+    requests = meter.create_counter("bench.requests", unit="{request}")
+    duration = meter.create_histogram("bench.duration", unit="ms")
+    for i in range(series):
+        requests.add(1, {"route": f"/api/v1/resource{i % 500}", "tenant": f"tenant-{i // 500}"})
+    for i in range(max(series // 10, 1)):
+        duration.record(i % 250, {"route": f"/api/v1/resource{i % 500}", "tenant": f"tenant-{i // 500}"})
+    return provider
+
+
+def _time_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _fetch(url: str, gzipped: bool) -> bytes:
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"} if gzipped else {})
+    with urllib.request.urlopen(request) as response:
+        body = response.read()
+        return gzip.decompress(body) if response.headers.get("Content-Encoding") == "gzip" else body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=10000, help="counter series (plus a tenth as many histogram series)")
+    parser.add_argument("--scrapers", type=int, default=8, help="concurrent scrapers per round")
+    parser.add_argument("--scrapes", type=int, default=5, help="rounds of concurrent scrapes")
+    parser.add_argument("--ttl", type=float, default=5.0)
+    args = parser.parse_args()
+
+    _populate(args.series)
+    cache = ScrapeCache(REGISTRY, ttl_seconds=args.ttl)
+    plain = cache.body()
+    packed = cache.body(gzipped=True)
+    repeat = 5
+    rows = [
+        ("render (no cache, every scrape before)", f"{_time_ms(lambda: generate_latest(REGISTRY), repeat):,.2f}", f"{len(plain):,}"),
+        ("render + gzip", f"{_time_ms(lambda: gzip.compress(generate_latest(REGISTRY), compresslevel=6), repeat):,.2f}", f"{len(packed):,}"),
+        ("fresh snapshot", f"{_time_ms(lambda: cache.body(), repeat * 100):,.4f}", f"{len(plain):,}"),
+        ("fresh snapshot, gzip", f"{_time_ms(lambda: cache.body(gzipped=True), repeat * 100):,.4f}", f"{len(packed):,}"),
+    ]
+    lines = plain.count(b"\n")
+    print_table(f"One scrape of {lines:,} exposition lines", rows, ["scrape", "ms (median)", "bytes"])
+
+    # Each round starts with an expired snapshot, as if the scrape interval exceeded the TTL
+    cache = ScrapeCache(REGISTRY, ttl_seconds=args.ttl)
+    server = MetricsServer(cache, host="127.0.0.1", port=0)
+    url = f"http://127.0.0.1:{server.port}/metrics"
+    latencies = []
+    bodies = []
+    lock = threading.Lock()
+
+    def scrape(gzipped: bool):
+        started = time.perf_counter()
+        body = _fetch(url, gzipped)
+        with lock:
+            latencies.append((time.perf_counter() - started) * 1000)
+            bodies.append(body)
+
+    for _ in range(args.scrapes):
+        cache._snapshot = None
+        threads = [threading.Thread(target=scrape, args=(i % 2 == 1,)) for i in range(args.scrapers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    server.shutdown()
+
+    latencies.sort()
+    print_table(
+        f"{args.scrapes} rounds of {args.scrapers} concurrent scrapes over HTTP (half with gzip)",
+        [
+            ("scrapes", f"{len(latencies):,}"),
+            ("renders", f"{cache.rendered:,}"),
+            ("served from the snapshot", f"{cache.cached:,}"),
+            ("p50 latency ms", f"{latencies[len(latencies) // 2]:,.1f}"),
+            ("max latency ms", f"{latencies[-1]:,.1f}"),
+        ],
+        ["", "value"],
+    )
+    # Counters carry created timestamps that differ between renders, so compare within a round
+    ok = cache.rendered == args.scrapes and len(set(bodies[-args.scrapers:])) == 1
+    print(f"\none render per round, identical plain and gzip bodies: {'ok' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Throughput and CPU per request of ObservabilityMiddleware: the baseline from git vs the current pure ASGI one.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_middleware [--duration 2] [--concurrency 16] [--rounds 5] [--baseline REV]
+
+The "before" variant is ``app/middleware/observability_middleware.py`` as
+it is at ``--baseline`` (by default the repository's first commit), loaded
+from git, so both variants run the code that actually shipped. Both sit in
+front of the routes of ``main.py`` with the same logging, tracing and
+FastAPI instrumentation, exporting to a no-op OTLP gRPC sink in this
+process.
+
+The variants alternate for ``--rounds`` rounds and the medians are
+reported: exporter batches and the garbage collector make single runs
+vary by more than the middleware costs. CPU per request (the whole
+process, from sequential requests) is the number to compare; ``/business``
+sleeps 10 ms in the threadpool, so its req/s mostly measures how that
+threadpool is scheduled.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import time
+import types
+
+from benchmarks._common import OtlpGrpcSink, asgi_call, free_port, make_scope, measure_rps, print_table, silence_stdout_logs
+
+_MIDDLEWARE_PATH = "Python/app/middleware/observability_middleware.py"
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout
+
+
+def baseline_middleware(rev: str = None):
+    """``ObservabilityMiddleware`` as of ``rev`` (default: the first commit), loaded from git."""
+    rev = rev or _git("rev-list", "--max-parents=0", "HEAD").split()[-1]
+    source = _git("show", f"{rev}:{_MIDDLEWARE_PATH}")
+    module = types.ModuleType(f"baseline_observability_middleware_{rev[:7]}")
+    module.__package__ = "app.middleware"
+    exec(compile(source, f"{rev[:7]}:{_MIDDLEWARE_PATH}", "exec"), module.__dict__)
+    return module.ObservabilityMiddleware
+
+
+def build_app(middleware_class):
+    """Build an app with the routes from ``main.py`` behind ``middleware_class``."""
+    from fastapi import FastAPI
+
+    import main
+    from app.observability import instrument_app
+
+    app = FastAPI(title="SampleServicePython", version="1.0.0")
+    app.include_router(main.app.router)
+    app.add_middleware(middleware_class)
+    instrument_app(app)
+    return app
+
+
+async def _sequential(app, path: str, count: int):
+    for _ in range(count):
+        await asgi_call(app, make_scope(path))
+
+
+def cpu_per_request(app, path: str, requests: int) -> float:
+    """Process CPU time per request, in microseconds, for ``requests`` sequential requests."""
+    asyncio.run(_sequential(app, path, min(requests, 100)))
+    start = time.process_time()
+    asyncio.run(_sequential(app, path, requests))
+    return (time.process_time() - start) * 1e6 / requests
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per route and round for req/s")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="sequential requests per route and round for CPU")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--baseline", default=None, help="git revision of the baseline middleware (default: first commit)")
+    args = parser.parse_args()
+
+    sink = OtlpGrpcSink(free_port())
+    sink.start()
+    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = f"http://127.0.0.1:{sink.port}"
+    os.environ.setdefault("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+
+    from app.middleware.observability_middleware import ObservabilityMiddleware
+
+    variants = [
+        ("baseline (before)", build_app(baseline_middleware(args.baseline))),
+        ("pure ASGI (after)", build_app(ObservabilityMiddleware)),
+    ]
+    silence_stdout_logs()
+
+    rows = []
+    for path in ("/", "/business"):
+        cpu = {name: [] for name, _ in variants}
+        rps = {name: [] for name, _ in variants}
+        for _ in range(args.rounds):
+            for name, app in variants:
+                cpu[name].append(cpu_per_request(app, path, args.requests))
+                rps[name].append(measure_rps(app, path, args.duration, args.concurrency))
+        baseline_cpu = statistics.median(cpu[variants[0][0]])
+        baseline_rps = statistics.median(rps[variants[0][0]])
+        for name, _ in variants:
+            cpu_us, req_s = statistics.median(cpu[name]), statistics.median(rps[name])
+            rows.append((
+                path,
+                name,
+                f"{cpu_us:,.0f}",
+                f"{baseline_cpu / cpu_us:.2f}x",
+                f"{req_s:,.0f}",
+                f"{req_s / baseline_rps:.2f}x",
+                f"{min(rps[name]):,.0f}-{max(rps[name]):,.0f}",
+            ))
+    sink.stop()
+
+    print_table(
+        f"ObservabilityMiddleware, median of {args.rounds} rounds",
+        rows,
+        ["route", "middleware", "CPU us/req", "CPU speedup", "req/s", "speedup", "req/s range"],
+    )
+
+
+if __name__ == "__main__":
+    main_()
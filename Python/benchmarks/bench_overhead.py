@@ -0,0 +1,256 @@
+"""Per-request cost of observability, from none to full logs+traces+metrics, with a regression gate.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_overhead [--requests 2000] [--ratios 0.1,1.0] [--output overhead-results.json]
+    python -m benchmarks.bench_overhead --update-baseline   # after an intended change
+
+Each profile runs in a fresh interpreter that exports to a no-op OTLP gRPC
+sink in this process, and drives the sample service's routes straight
+through the ASGI app:
+
+* ``off``: the routes alone, nothing initialized
+* ``middleware``: ``ObservabilityMiddleware`` with structlog to stdout
+  (discarded), no tracing or OTLP
+* ``traces-<ratio>``: middleware plus tracing and FastAPI instrumentation
+  at each ``--ratios`` sampling ratio
+* ``span-metrics-<ratio>``: ``traces-<ratio>`` at the lowest ratio with
+  span metrics on, so every unsampled span is recorded as well
+* ``full``: ``main.app`` as deployed (logs, traces at ratio 1.0, metrics)
+
+Per route it reports p50/p99 latency of sequential requests, CPU time per
+request (the whole process, so exporter threads count), req/s at
+``--concurrency`` and the tracemalloc peak and retained bytes per request.
+Results are written as JSON to ``--output``.
+
+The gate compares each profile's CPU per request relative to ``off`` on
+the same run (which keeps it comparable across machines) with
+``--baseline``; the run exits 1 if a ratio grew by more than
+``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks._common import OtlpGrpcSink, asgi_call, free_port, make_scope, measure_rps, print_table, silence_stdout_logs
+
+_DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "overhead_baseline.json")
+_RESULT_PREFIX = "RESULT "
+
+
+def _profile_env(profile: str, endpoint: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "OTEL_EXPORTER_OTLP_ENDPOINT": endpoint,
+        "OBSERVABILITY_FAST_STARTUP": "true",
+        "ENVIRONMENT": "Production",
+        # Anything but "full" starts from nothing and adds its own parts
+        "OBSERVABILITY_INIT_AFTER_FORK": "false" if profile == "full" else "true",
+    })
+    if profile == "full":
+        env["OPEN_TELEMETRY_SAMPLING_RATIO"] = "1.0"
+    elif profile.startswith(("traces-", "span-metrics-")):
+        env["OTEL_PYTHON_DISABLED_INSTRUMENTATIONS"] = "requests,logging"
+        env["SPAN_METRICS_ENABLED"] = "true" if profile.startswith("span-metrics-") else "false"
+    else:
+        env["OTEL_PYTHON_DISABLED_INSTRUMENTATIONS"] = "fastapi,requests,logging"
+    return env
+
+
+def _build_app(profile: str):
+    """The ASGI app for ``profile``, in a child process started with ``_profile_env``."""
+    import main
+
+    if profile == "full":
+        return main.app
+
+    from fastapi import FastAPI
+    from app.middleware.observability_middleware import ObservabilityMiddleware
+    from app.observability import instrument_app
+    from app.observability.logging import init_logging
+    from app.observability.tracing import init_tracing
+
+    app = FastAPI(title="SampleServicePython", version="1.0.0")
+    app.include_router(main.app.router)
+    if profile == "off":
+        return app
+    if profile.startswith(("traces-", "span-metrics-")):
+        init_tracing(sampling_ratio=float(profile.rsplit("-", 1)[1]))
+    init_logging(environment="Production")
+    app.add_middleware(ObservabilityMiddleware)
+    instrument_app(app)
+    return app
+
+
+async def _sequential(app, path: str, count: int) -> list:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        await asgi_call(app, make_scope(path))
+        latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _measure_path(app, path: str, args) -> dict:
+    status = asyncio.run(asgi_call(app, make_scope(path)))
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}")
+    asyncio.run(_sequential(app, path, min(args.requests, 200)))
+
+    cpu_start = time.process_time()
+    latencies = asyncio.run(_sequential(app, path, args.requests))
+    cpu_us = (time.process_time() - cpu_start) * 1e6 / args.requests
+
+    rps = measure_rps(app, path, args.duration, args.concurrency)
+
+    tracemalloc.start()
+    asyncio.run(_sequential(app, path, args.alloc_requests))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "path": path,
+        "p50_us": _percentile(latencies, 0.50) / 1000,
+        "p99_us": _percentile(latencies, 0.99) / 1000,
+        "cpu_us_per_request": cpu_us,
+        "rps": rps,
+        "alloc_peak_kib": peak / 1024,
+        "alloc_retained_bytes_per_request": retained / args.alloc_requests,
+    }
+
+
+def _run_profile(args):
+    silence_stdout_logs()
+    app = _build_app(args.run_profile)
+    results = [_measure_path(app, path, args) for path in args.paths]
+    sys.__stdout__.write(_RESULT_PREFIX + json.dumps(results) + "\n")
+    sys.__stdout__.flush()
+    # Skip provider shutdown; the final flush would only add noise to the parent's wait
+    os._exit(0)
+
+
+def _child_args(args) -> list:
+    return [
+        "--requests", str(args.requests),
+        "--alloc-requests", str(args.alloc_requests),
+        "--duration", str(args.duration),
+        "--concurrency", str(args.concurrency),
+        "--paths", ",".join(args.paths),
+    ]
+
+
+def _measure_profile(profile: str, endpoint: str, args) -> list:
+    command = [sys.executable, "-m", "benchmarks.bench_overhead", "--run-profile", profile] + _child_args(args)
+    result = subprocess.run(command, env=_profile_env(profile, endpoint), capture_output=True, text=True, timeout=600)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith(_RESULT_PREFIX):
+            return json.loads(line[len(_RESULT_PREFIX):])
+    stderr = result.stderr.strip().splitlines()
+    raise RuntimeError(f"profile {profile} failed: {stderr[-1] if stderr else 'no output'}")
+
+
+def _check_baseline(results: list, baseline_path: str, tolerance: float) -> list:
+    """Profiles/routes whose CPU ratio to ``off`` grew past the stored baseline by more than ``tolerance``."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["cpu_overhead_ratio"]
+    regressions = []
+    for r in results:
+        expected = baseline.get(r["profile"], {}).get(r["path"])
+        if expected is not None and r["cpu_overhead_ratio"] > expected * (1 + tolerance):
+            regressions.append(f"{r['profile']} {r['path']}: {r['cpu_overhead_ratio']:.2f}x CPU of off, baseline {expected:.2f}x")
+    return regressions
+
+
+def _write_baseline(results: list, baseline_path: str):
+    ratios = {}
+    for r in results:
+        ratios.setdefault(r["profile"], {})[r["path"]] = round(r["cpu_overhead_ratio"], 2)
+    with open(baseline_path, "w") as f:
+        json.dump({"cpu_overhead_ratio": ratios}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="sequential requests per route for latency and CPU")
+    parser.add_argument("--alloc-requests", type=int, default=500, help="requests per route under tracemalloc")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per route for req/s")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--paths", type=lambda s: [p for p in s.split(",") if p], default=["/", "/weatherforecast/days/3"])
+    parser.add_argument("--ratios", type=lambda s: [float(r) for r in s.split(",") if r], default=[0.1, 1.0])
+    parser.add_argument("--output", default="overhead-results.json")
+    parser.add_argument("--baseline", default=_DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth of a CPU ratio")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run's ratios as the baseline")
+    parser.add_argument("--run-profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        _run_profile(args)
+        return
+
+    profiles = ["off", "middleware"] + [f"traces-{ratio:g}" for ratio in args.ratios]
+    profiles += [f"span-metrics-{min(args.ratios):g}", "full"]
+    sink = OtlpGrpcSink(free_port())
+    sink.start()
+    endpoint = f"http://127.0.0.1:{sink.port}"
+    results = []
+    try:
+        for profile in profiles:
+            for r in _measure_profile(profile, endpoint, args):
+                results.append({"profile": profile, **r})
+    finally:
+        sink.stop()
+
+    off = {r["path"]: r["cpu_us_per_request"] for r in results if r["profile"] == "off"}
+    for r in results:
+        r["cpu_overhead_ratio"] = r["cpu_us_per_request"] / off[r["path"]]
+
+    print_table(
+        f"Observability overhead ({args.requests:,} sequential requests per route, req/s at concurrency {args.concurrency})",
+        [(
+            r["profile"], r["path"], f"{r['p50_us']:,.0f}", f"{r['p99_us']:,.0f}", f"{r['cpu_us_per_request']:,.0f}",
+            f"{r['cpu_overhead_ratio']:.2f}x", f"{r['rps']:,.0f}", f"{r['alloc_peak_kib']:,.0f}",
+            f"{r['alloc_retained_bytes_per_request']:,.0f}",
+        ) for r in results],
+        ["profile", "route", "p50 us", "p99 us", "CPU us/req", "CPU vs off", "req/s", "alloc peak KiB", "retained B/req"],
+    )
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {k: getattr(args, k) for k in ("requests", "alloc_requests", "duration", "concurrency", "paths", "ratios")},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        _write_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one")
+        return
+    regressions = _check_baseline(results, args.baseline, args.tolerance)
+    if regressions:
+        print(f"\nOverhead regressed past the baseline (+{args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"Within {args.tolerance:.0%} of the baseline in {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Hot-path cost of the telemetry pipeline's self-metrics, and what they report under overload.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_pipeline_metrics [--iterations 100000]
+
+Times ``on_end`` of a plain ``BatchSpanProcessor`` and of
+``MonitoredBatchSpanProcessor`` for a sampled span (exporter discards
+batches). Then overloads a monitored processor with a small queue and an
+instrumented exporter that is slow and fails every other call, and prints
+the pipeline metrics read back through an in-memory metric reader: drops
+must equal spans ended minus spans handed to the exporter.
+"""
+import argparse
+import time
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExportResult
+
+from app.observability.pipeline_metrics import InstrumentedExporter, MonitoredBatchSpanProcessor, PipelineMetrics
+from benchmarks._common import NullSpanExporter, measure_ops, print_table
+
+
+class _SlowFlakyExporter(NullSpanExporter):
+    def __init__(self, delay_seconds: float):
+        super().__init__()
+        self._delay = delay_seconds
+        self._calls = 0
+
+    def export(self, spans):
+        self._calls += 1
+        time.sleep(self._delay)
+        if self._calls % 2 == 0:
+            return SpanExportResult.FAILURE
+        return super().export(spans)
+
+
+def _ended_span():
+    provider = TracerProvider()
+    span = provider.get_tracer("benchmark").start_span("GET /weatherforecast/days/{days}")
+    span.end()
+    return span
+
+
+def _hot_path(iterations: int) -> list:
+    span = _ended_span()
+    rows = []
+    baseline = None
+    for name, processor_class in (("BatchSpanProcessor", BatchSpanProcessor), ("MonitoredBatchSpanProcessor", MonitoredBatchSpanProcessor)):
+        processor = processor_class(NullSpanExporter(), max_queue_size=iterations * 2, max_export_batch_size=iterations * 2, schedule_delay_millis=60000)
+        ns = 1e9 / measure_ops(lambda: processor.on_end(span), iterations)
+        processor.shutdown()
+        baseline = baseline or ns
+        rows.append((name, f"{ns:,.0f}", f"{ns - baseline:+,.0f}"))
+    return rows
+
+
+def _overload(spans: int) -> dict:
+    reader = InMemoryMetricReader()
+    pipeline_metrics = PipelineMetrics(meter=MeterProvider(metric_readers=[reader]).get_meter("benchmark"))
+    exporter = _SlowFlakyExporter(delay_seconds=0.02)
+    processor = MonitoredBatchSpanProcessor(
+        InstrumentedExporter(exporter, "traces", pipeline_metrics),
+        max_queue_size=256,
+        max_export_batch_size=64,
+        schedule_delay_millis=10,
+    )
+    pipeline_metrics.watch_processor("traces", processor)
+    span = _ended_span()
+    for _ in range(spans):
+        processor.on_end(span)
+    processor.shutdown()
+
+    values = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    outcome = point.attributes.get("outcome")
+                    name = f"{metric.name}{{outcome={outcome}}}" if outcome else metric.name
+                    values[name] = getattr(point, "value", None) if hasattr(point, "value") else (point.count, point.sum)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--overload-spans", type=int, default=5000)
+    args = parser.parse_args()
+
+    print_table("on_end of a sampled span", _hot_path(args.iterations), ["processor", "ns/span", "added"])
+
+    values = _overload(args.overload_spans)
+    exported = sum(v for k, v in values.items() if k.startswith("otel.pipeline.exported"))
+    dropped = values.get("otel.pipeline.dropped", 0)
+    rows = [(name, value if not isinstance(value, tuple) else f"count={value[0]} sum={value[1]:,.1f}") for name, value in sorted(values.items())]
+    print_table(f"Pipeline metrics after {args.overload_spans:,} spans into a 256-span queue with a slow, flaky exporter", rows, ["metric", "value"])
+    print(f"\nspans ended {args.overload_spans:,} = handed to exporter {exported:,} + dropped {dropped:,}: "
+          f"{'ok' if exported + dropped == args.overload_spans else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
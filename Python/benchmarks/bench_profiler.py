@@ -0,0 +1,126 @@
+"""Throughput cost of the sampling profiler, and what it attributes to each route.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_profiler [--duration 3] [--concurrency 16] [--hz 49,99,499]
+
+Serves a CPU-bound async route and a CPU-bound sync route (run in
+Starlette's threadpool) behind ``ObservabilityMiddleware`` and measures
+requests per second with the profiler off and sampling at each ``--hz``.
+The samples of the last run are written as collapsed stacks; the hottest
+leaf frame of each route must be that route's own work function, which
+shows the event loop and the worker threads are both attributed to the
+request they serve.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+
+from app.middleware.observability_middleware import ObservabilityMiddleware
+from app.observability import instrument_app
+from app.observability.logging import init_logging
+from app.observability.tracing import init_tracing
+from app.observability.profiler import OUTPUT_COLLAPSED, SamplingProfiler
+from benchmarks._common import measure_rps, print_table, silence_stdout_logs
+
+_ASYNC_ROUTE = "/cpu/async/{n}"
+_SYNC_ROUTE = "/cpu/sync/{n}"
+
+
+def _spin_async(n: int) -> int:
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def _spin_sync(n: int) -> int:
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get(_ASYNC_ROUTE)
+    async def cpu_async(n: int):
+        return {"total": _spin_async(n)}
+
+    @app.get(_SYNC_ROUTE)
+    def cpu_sync(n: int):
+        return {"total": _spin_sync(n)}
+
+    app.add_middleware(ObservabilityMiddleware)
+    instrument_app(app)
+    return app
+
+
+def _hottest_leaves(path: str) -> dict:
+    """Route -> (leaf frame with the most samples, its share of the route's samples)."""
+    leaves = {}
+    with open(path) as f:
+        for line in f:
+            stack, count = line.rsplit(" ", 1)
+            frames = stack.split(";")
+            by_leaf = leaves.setdefault(frames[0], {})
+            by_leaf[frames[-1]] = by_leaf.get(frames[-1], 0) + int(count)
+    hottest = {}
+    for route, by_leaf in leaves.items():
+        leaf, count = max(by_leaf.items(), key=lambda item: item[1])
+        hottest[route] = (leaf, count / sum(by_leaf.values()))
+    return hottest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hz", default="49,99,499", help="comma-separated sampling rates")
+    parser.add_argument("--work", type=int, default=20000, help="loop iterations per request")
+    args = parser.parse_args()
+
+    init_tracing(sampling_ratio=1.0)
+    init_logging(environment="Production")
+    silence_stdout_logs()
+    app = build_app()
+    paths = {_ASYNC_ROUTE: f"/cpu/async/{args.work}", _SYNC_ROUTE: f"/cpu/sync/{args.work}"}
+    rates = [None] + [float(hz) for hz in args.hz.split(",") if hz.strip()]
+
+    rows = []
+    output_dir = tempfile.mkdtemp(prefix="bench-profiler-")
+    baselines = {}
+    for hz in rates:
+        profiler = None
+        if hz is not None:
+            profiler = SamplingProfiler(hz=hz, export_interval_seconds=3600, outputs=[OUTPUT_COLLAPSED], output_dir=output_dir)
+            profiler.start()
+        started = time.perf_counter()
+        for route, path in paths.items():
+            rps = measure_rps(app, path, args.duration, args.concurrency)
+            baseline = baselines.setdefault(route, rps)
+            rows.append([route, "off" if hz is None else f"{hz:g} Hz", f"{rps:,.0f}", f"{(baseline - rps) / baseline:+.1%}", ""])
+        if profiler is not None:
+            cpu = profiler.sampling_seconds / (time.perf_counter() - started)
+            profiler.shutdown()
+            rows[-1][4] = f"{profiler.samples:,} samples, {cpu:.2%} of a core"
+    print_table("Throughput with the profiler", rows, ["route", "profiler", "req/s", "slowdown", "sampler"])
+
+    files = sorted(os.listdir(output_dir))
+    hottest = _hottest_leaves(os.path.join(output_dir, files[-1]))
+    expected = {_ASYNC_ROUTE: "_spin_async", _SYNC_ROUTE: "_spin_sync"}
+    rows = []
+    for route in expected:
+        leaf, share = hottest.get(route, ("-", 0.0))
+        rows.append((route, leaf, f"{share:.0%}"))
+    print_table(f"Hottest leaf frame per route at {rates[-1]:g} Hz", rows, ["route", "frame", "share of samples"])
+    ok = all(hottest.get(route, ("", 0.0))[0].startswith(name) for route, name in expected.items())
+    print(f"\nrequests attributed to their route: {'ok' if ok else 'MISMATCH'} ({os.path.join(output_dir, files[-1])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Per-event cost of in-process redaction with the collector's full key list.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_redaction [--iterations 100000] [--keys-file ../config/otel-collector-config.yaml]
+
+Loads the sensitive keys from the collector config, builds a ``Redactor``
+with and without the value scanners, and times the structlog stage on a
+"Request finished" event with nothing to redact and on one carrying an
+e-mail and an auth header, plus the span processor on a server span's
+attributes. Also checks that a clean event's nested dicts are not copied.
+"""
+import argparse
+
+from app.observability.redaction import DEFAULT_KEY_PATTERNS, DEFAULT_KEYS_FILE, DEFAULT_VALUE_SCANNERS, VALUE_SCANNERS, Redactor, load_collector_keys
+from benchmarks._common import measure_ops, print_table
+
+
+def _clean_event() -> dict:
+    return {
+        "event": "Request finished 1.1 GET http://localhost/weatherforecast/days/3 - 200 281 application/json 3.974ms",
+        "level": "info",
+        "logger": "app.middleware.observability_middleware",
+        "traceId": "90d04d2638f6898571921b7d234741a0",
+        "spanId": "ccff6eb875e2d8e6",
+        "http": {
+            "method": "GET", "path": "/weatherforecast/days/3", "scheme": "http", "host": "localhost",
+            "userAgent": "Mozilla/5.0 (X11; Linux x86_64)", "statusCode": 200, "duration": 3.974,
+        },
+        "client": {"ip": "127.0.0.1"},
+        "user": {"id": "42", "tenantId": "acme"},
+        "requestId": "607143f6-a5f2-4653-9b1d-af72ed37e4c9",
+        "Protocol": "HTTP/1.1",
+        "StatusCode": 200,
+        "ContentLength": "281",
+        "ContentType": "application/json",
+        "ElapsedMilliseconds": 3.974,
+        "RequestPath": "/weatherforecast/days/3",
+    }
+
+
+def _sensitive_event() -> dict:
+    event = _clean_event()
+    event["user"] = {"id": "42", "tenantId": "acme", "email": "jane@example.com"}
+    event["http"] = {**event["http"], "headers": {"authorization": "Bearer abc.def.ghi"}}
+    event["event"] = "Password reset requested for jane@example.com"
+    return event
+
+
+def _span_attributes() -> dict:
+    return {
+        "http.method": "GET",
+        "http.route": "/weatherforecast/days/{days}",
+        "http.target": "/weatherforecast/days/3",
+        "http.status_code": 200,
+        "http.scheme": "http",
+        "server.address": "localhost",
+        "net.peer.ip": "127.0.0.1",
+        "user_agent.original": "Mozilla/5.0 (X11; Linux x86_64)",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--keys-file", default=DEFAULT_KEYS_FILE)
+    args = parser.parse_args()
+
+    keys, patterns = load_collector_keys(args.keys_file)
+    patterns = list(DEFAULT_KEY_PATTERNS) + patterns
+    redactors = [
+        ("keys + patterns", Redactor(keys, patterns, value_scanners=())),
+        (f"keys + patterns + {','.join(DEFAULT_VALUE_SCANNERS)}", Redactor(keys, patterns, value_scanners=DEFAULT_VALUE_SCANNERS)),
+        ("keys + patterns + all scanners", Redactor(keys, patterns, value_scanners=tuple(VALUE_SCANNERS))),
+    ]
+
+    clean = _clean_event()
+    nested = clean["http"]
+    redactors[1][1](None, "info", clean)
+    assert clean["http"] is nested, "clean event was copied"
+
+    rows = []
+    for name, redactor in redactors:
+        for case, make_event in (("clean event", _clean_event), ("sensitive event", _sensitive_event)):
+            event = make_event()
+            # Copy per call: the stage replaces top-level keys of the event it is given
+            ops = measure_ops(lambda: redactor(None, "info", dict(event)), args.iterations)
+            baseline = measure_ops(lambda: dict(event), args.iterations)
+            rows.append((name, case, f"{(1 / ops - 1 / baseline) * 1e9:,.0f}"))
+        attributes = _span_attributes()
+        ops = measure_ops(lambda: redactor.redact_mapping(attributes), args.iterations)
+        rows.append((name, "span attributes", f"{1e9 / ops:,.0f}"))
+
+    print_table(
+        f"Redaction with {len(keys)} keys and {len(patterns)} key patterns from {args.keys_file}",
+        rows,
+        ["redactor", "input", "ns/event"],
+    )
+
+
+if __name__ == "__main__":
+    main()
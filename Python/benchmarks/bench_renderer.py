@@ -0,0 +1,102 @@
+"""Render + write cost of the middleware's "Request finished" event per JSON renderer.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_renderer [--iterations 50000]
+
+"render" is the renderer processor alone; "render+write" adds the output
+path: UnicodeDecoder and a stdlib logging handler for ``json``, a bytes
+logger for the fast serializers (both writing to os.devnull).
+"""
+import argparse
+import logging
+import os
+
+import structlog
+
+from app.observability.renderers import (
+    RENDERER_JSON,
+    RENDERER_MSGSPEC,
+    RENDERER_ORJSON,
+    BytesLoggerFactory,
+    get_json_renderer,
+)
+from benchmarks._common import measure_ops, print_table
+
+
+def request_finished_event() -> dict:
+    """The event dict of a "Request finished" line as it reaches the renderer."""
+    http = {
+        "method": "GET",
+        "path": "/weatherforecast/days/5",
+        "scheme": "http",
+        "host": "localhost",
+        "userAgent": "curl/8.4.0",
+        "statusCode": 200,
+        "duration": 1.996,
+    }
+    return {
+        "traceId": "88847db0b8983565f659b12c7cb75e00",
+        "spanId": "64981d8150d2d729",
+        "http": http,
+        "client": {"ip": "127.0.0.1"},
+        "requestId": "fae471c5-c92a-4844-9988-54b213637039",
+        "Protocol": "HTTP/1.1",
+        "StatusCode": 200,
+        "ContentLength": "462",
+        "ContentType": "application/json",
+        "ElapsedMilliseconds": 1.996,
+        "RequestPath": "/weatherforecast/days/5",
+        "message_template_text": "Request finished {Protocol} {Method} {Scheme}://{Host}{Path} - {StatusCode} {ContentLength} {ContentType} {ElapsedMilliseconds}ms",
+        "event": "Request finished 1.1 GET http://localhost/weatherforecast/days/5 - 200 462 application/json 1.996ms",
+        "logger": "app.middleware.observability_middleware",
+        "level": "info",
+        "timestamp": "2025-11-27T08:04:44.039716Z",
+        "trace_id": "88847db0b8983565f659b12c7cb75e00",
+        "TraceId": "88847db0b8983565f659b12c7cb75e00",
+        "span_id": "64981d8150d2d729",
+        "SpanId": "64981d8150d2d729",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    event = request_finished_event()
+
+    stdlib_logger = logging.getLogger("benchmark.renderer")
+    stdlib_logger.propagate = False
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    stdlib_logger.addHandler(handler)
+    decoder = structlog.processors.UnicodeDecoder()
+    bytes_logger = BytesLoggerFactory(open(os.devnull, "wb"))("benchmark.renderer")
+
+    variants = [("json (sorted)", RENDERER_JSON, True), ("json (unsorted)", RENDERER_JSON, False)]
+    for name in (RENDERER_ORJSON, RENDERER_MSGSPEC):
+        variants.append((f"{name} (unsorted)", name, False))
+        variants.append((f"{name} (sorted)", name, True))
+
+    rows = []
+    baseline = None
+    for label, name, sort_keys in variants:
+        renderer, renders_bytes = get_json_renderer(name, sort_keys)
+        if name != RENDERER_JSON and not renders_bytes:
+            rows.append((label, "not installed", "", ""))
+            continue
+
+        render_ops = measure_ops(lambda: renderer(None, "info", dict(event)), args.iterations)
+        if renders_bytes:
+            write_ops = measure_ops(lambda: bytes_logger.info(renderer(None, "info", dict(event))), args.iterations)
+        else:
+            write_ops = measure_ops(lambda: stdlib_logger.info(renderer(None, "info", decoder(None, "info", dict(event)))), args.iterations)
+        baseline = baseline or write_ops
+        rows.append((label, f"{render_ops:,.0f}", f"{write_ops:,.0f}", f"{write_ops / baseline:.2f}x"))
+
+    print_table('"Request finished" payload', rows, ["renderer", "render/s", "render+write/s", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Per-request cost of recording RED metrics.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_request_metrics [--iterations 100000] [--routes 20]
+
+Records requests into an SDK MeterProvider with an in-memory reader and
+compares ``RequestMetrics.record`` (cached attribute sets) with recording the
+same three instruments using a fresh attribute dict per request.
+"""
+import argparse
+import itertools
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View, ExplicitBucketHistogramAggregation
+
+from app.observability.request_metrics import (
+    REQUEST_COUNT,
+    ERROR_COUNT,
+    REQUEST_DURATION,
+    DEFAULT_DURATION_BUCKETS_MS,
+    RequestMetrics,
+)
+from benchmarks._common import measure_ops, print_table
+
+_STATUSES = (200, 200, 200, 201, 404, 500)
+
+
+def _meter():
+    provider = MeterProvider(
+        metric_readers=[InMemoryMetricReader()],
+        views=[View(instrument_name=REQUEST_DURATION, aggregation=ExplicitBucketHistogramAggregation(DEFAULT_DURATION_BUCKETS_MS))],
+    )
+    return provider.get_meter("benchmark")
+
+
+def _uncached(meter):
+    """Same instruments, but attributes built for every request."""
+    requests = meter.create_counter(REQUEST_COUNT)
+    errors = meter.create_counter(ERROR_COUNT)
+    duration = meter.create_histogram(REQUEST_DURATION, unit="ms")
+
+    def record(method, route, status_code, duration_ms):
+        attributes = {
+            "http.request.method": method,
+            "http.status_class": f"{status_code // 100}xx",
+            "http.route": route,
+        }
+        requests.add(1, attributes)
+        duration.record(duration_ms, attributes)
+        if status_code >= 500:
+            errors.add(1, attributes)
+
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--routes", type=int, default=20)
+    args = parser.parse_args()
+
+    requests = itertools.cycle([
+        ("GET", f"/items/{i}/{{item_id}}", status, 1.5 + i)
+        for i in range(args.routes)
+        for status in _STATUSES
+    ])
+
+    variants = [
+        ("fresh attributes per request", _uncached(_meter())),
+        ("RequestMetrics.record", RequestMetrics(_meter()).record),
+    ]
+    rows = []
+    baseline = None
+    for name, record in variants:
+        ops = measure_ops(lambda: record(*next(requests)), args.iterations)
+        baseline = baseline or ops
+        rows.append((name, f"{1e9 / ops:,.0f}", f"{ops:,.0f}", f"{ops / baseline:.2f}x"))
+
+    print_table(f"RED metrics recording ({args.routes} routes)", rows, ["variant", "ns/request", "requests/s", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-request cost of resolving the route template of a path.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_routes [--iterations 100000] [--routes 100]
+
+Builds a FastAPI app with the sample service's routes plus ``--routes``
+synthetic ones (half with a path parameter) and resolves a parameterless
+path, a path with a parameter (cache hit, and with the cache disabled) and
+an unknown path. The baseline is a linear ``route.matches(scope)`` scan,
+which is what the FastAPI instrumentation does to name the server span.
+"""
+import argparse
+
+from fastapi import FastAPI
+from starlette.routing import Match
+
+from app.observability.routes import RouteTemplateResolver
+from benchmarks._common import make_scope, measure_ops, print_table
+
+
+def _build_app(extra_routes: int) -> FastAPI:
+    app = FastAPI()
+
+    def handler():
+        return {}
+
+    for i in range(extra_routes // 2):
+        app.add_api_route(f"/api/v1/resource{i}/{{item_id}}", handler)
+        app.add_api_route(f"/api/v1/resource{i}/summary", handler)
+    for path in ("/", "/health", "/business", "/weatherforecast/days/{days}"):
+        app.add_api_route(path, handler)
+    return app
+
+
+def _linear_scan(app, scope) -> str:
+    """Reference: first full match in routing order, as the instrumentation computes ``http.route``."""
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--routes", type=int, default=100, help="synthetic routes added before the sample routes")
+    args = parser.parse_args()
+
+    app = _build_app(args.routes)
+    resolver = RouteTemplateResolver(app)
+    uncached = RouteTemplateResolver(app, cache_size=0)
+    cases = [
+        ("parameterless (/health)", "/health", "/health"),
+        ("with parameter", "/weatherforecast/days/3", "/weatherforecast/days/{days}"),
+        ("unknown path", "/does/not/exist", None),
+    ]
+
+    rows = []
+    for name, path, expected in cases:
+        scope = make_scope(path)
+        scope["app"] = app
+        assert _linear_scan(app, scope) == expected
+        assert resolver.resolve(scope) == expected and uncached.resolve(scope) == expected
+        baseline = measure_ops(lambda: _linear_scan(app, scope), args.iterations)
+        rows.append((name, "linear route.matches scan", f"{1e9 / baseline:,.0f}", "1.0x"))
+        variants = [("RouteTemplateResolver", resolver)]
+        if path != "/health":
+            variants.append(("RouteTemplateResolver, no cache", uncached))
+        for label, r in variants:
+            ops = measure_ops(lambda: r.resolve(scope), args.iterations)
+            rows.append((name, label, f"{1e9 / ops:,.0f}", f"{ops / baseline:.1f}x"))
+
+    print_table(f"Route template resolution with {len(app.routes)} routes", rows, ["path", "resolver", "ns/request", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Cost of the runtime monitor, and whether it explains a saturated threadpool and a blocked event loop.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_runtime_monitor [--iterations 100000] [--sync-requests 60] [--block-ms 300]
+
+First times the monitor's loop callback and a generation-0 collection
+with and without the GC callback. Then starts an app behind
+``ObservabilityMiddleware`` through ASGI lifespan (which attaches the
+monitor to the loop), sends ``--sync-requests`` concurrent requests to a
+sync handler that sleeps (more than the 40 threads of the pool) and one
+async request that blocks the loop for ``--block-ms``. The metrics must
+show the pool full with the rest queued and the lag of the blocked loop,
+and the watchdog must log the blocking handler's stack with its route.
+"""
+import argparse
+import asyncio
+import gc
+import time
+import types
+
+import structlog
+from fastapi import FastAPI
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from app.middleware.observability_middleware import ObservabilityMiddleware
+from app.observability.runtime_monitor import (
+    GC_PAUSE,
+    LOOP_LAG,
+    LOOP_STALLS,
+    THREADPOOL_IN_USE,
+    THREADPOOL_LIMIT,
+    THREADPOOL_QUEUED,
+    RuntimeMonitor,
+    set_runtime_monitor,
+)
+from benchmarks._common import asgi_call, make_scope, measure_ops, print_table
+
+
+def _costs(iterations: int) -> list:
+    rows = []
+    monitor = RuntimeMonitor(meter=MeterProvider(metric_readers=[InMemoryMetricReader()]).get_meter("benchmark"))
+    monitor._loop = types.SimpleNamespace(time=time.monotonic, call_later=lambda *args: None)
+    monitor._limiter = types.SimpleNamespace(borrowed_tokens=3, statistics=lambda: types.SimpleNamespace(tasks_waiting=0))
+    rows.append(("loop callback (lag + threadpool peaks)", f"{1e9 / measure_ops(lambda: monitor._tick(monitor._loop), iterations):,.0f}"))
+
+    gc_iterations = max(iterations // 10, 1000)
+    monitor.shutdown()
+    rows.append(("gc.collect(0)", f"{1e9 / measure_ops(lambda: gc.collect(0), gc_iterations):,.0f}"))
+    monitor = RuntimeMonitor(meter=MeterProvider(metric_readers=[InMemoryMetricReader()]).get_meter("benchmark"))
+    rows.append(("gc.collect(0) with the pause callback", f"{1e9 / measure_ops(lambda: gc.collect(0), gc_iterations):,.0f}"))
+    monitor.shutdown()
+    return rows
+
+
+def _build_app(block_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync/{n}")
+    def sync_handler(n: int):
+        time.sleep(0.2)
+        return {"n": n}
+
+    @app.get("/blocking")
+    async def blocking_handler():
+        time.sleep(block_ms / 1000)
+        return {}
+
+    app.add_middleware(ObservabilityMiddleware)
+    return app
+
+
+async def _lifespan_startup(app):
+    started = asyncio.Event()
+    stop = asyncio.Event()
+    messages = [{"type": "lifespan.startup"}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await stop.wait()
+        return {"type": "lifespan.shutdown"}
+
+    async def send(message):
+        if message["type"] == "lifespan.startup.complete":
+            started.set()
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    await started.wait()
+    return stop, task
+
+
+async def _scenario(app, sync_requests: int):
+    stop, lifespan = await _lifespan_startup(app)
+    sync = [asyncio.create_task(asgi_call(app, make_scope(f"/sync/{i}"))) for i in range(sync_requests)]
+    await asyncio.sleep(0.1)
+    await asgi_call(app, make_scope("/blocking"))
+    await asyncio.gather(*sync)
+    # Let the watchdog log and the loop callback record the blocked tick
+    await asyncio.sleep(0.3)
+    stop.set()
+    await lifespan
+
+
+def _read(reader: InMemoryMetricReader) -> dict:
+    values = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    if hasattr(point, "max"):
+                        count, peak = values.get(metric.name, (0, 0.0))
+                        values[metric.name] = (count + point.count, max(peak, point.max))
+                    else:
+                        values[metric.name] = values.get(metric.name, 0) + point.value
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--sync-requests", type=int, default=60)
+    parser.add_argument("--block-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print_table("Monitor costs", _costs(args.iterations), ["operation", "ns/call"])
+
+    reader = InMemoryMetricReader()
+    interval_ms = 50
+    monitor = RuntimeMonitor(interval_ms=interval_ms, stall_ms=args.block_ms / 3, meter=MeterProvider(metric_readers=[reader]).get_meter("benchmark"))
+    set_runtime_monitor(monitor)
+    with structlog.testing.capture_logs() as logs:
+        asyncio.run(_scenario(_build_app(args.block_ms), args.sync_requests))
+    gc.collect()
+    values = _read(reader)
+    monitor.shutdown()
+    set_runtime_monitor(None)
+
+    lag_count, lag_max = values.get(LOOP_LAG, (0, 0.0))
+    gc_count, gc_max = values.get(GC_PAUSE, (0, 0.0))
+    limit = values.get(THREADPOOL_LIMIT, 0)
+    print_table(
+        f"{args.sync_requests} sleeping sync requests and one request blocking the loop for {args.block_ms:g} ms",
+        [
+            (THREADPOOL_LIMIT, f"{limit:g}"),
+            (f"{THREADPOOL_IN_USE} (peak)", f"{values.get(THREADPOOL_IN_USE, 0):g}"),
+            (f"{THREADPOOL_QUEUED} (peak)", f"{values.get(THREADPOOL_QUEUED, 0):g}"),
+            (f"{LOOP_LAG} max", f"{lag_max:,.1f} ms over {lag_count} ticks"),
+            (LOOP_STALLS, f"{values.get(LOOP_STALLS, 0):g}"),
+            (f"{GC_PAUSE} max", f"{gc_max:,.2f} ms over {gc_count} collections"),
+        ],
+        ["metric", "value"],
+    )
+
+    stalls = [e for e in logs if e["event"] == "Event loop blocked"]
+    logged = bool(stalls) and "blocking_handler" in stalls[0]["stack"] and stalls[0].get("RequestPath") == "/blocking"
+    if stalls:
+        print(f"\nlogged: blocked {stalls[0]['blockedMilliseconds']} ms in {stalls[0].get('RequestPath')}, stack ends:")
+        print("".join(stalls[0]["stack"].splitlines(keepends=True)[-2:]), end="")
+    ok = (
+        values.get(THREADPOOL_IN_USE) == limit
+        and values.get(THREADPOOL_QUEUED) == args.sync_requests - limit
+        # The block starts up to one interval after the last tick
+        and lag_max >= args.block_ms - interval_ms
+        and values.get(LOOP_STALLS, 0) >= 1
+        and logged
+    )
+    print(f"\nthreadpool saturation, loop lag and blocked stack reported: {'ok' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Per-span cost of span metrics, and whether they stay exact at a low sampling ratio.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_span_metrics [--iterations 100000] [--ratio 0.1] [--threads 4]
+
+First times ``on_end`` of ``SpanMetricsProcessor`` against recording the
+same three instruments directly for each span. Then starts and ends spans
+on ``--threads`` threads under ``RecordUnsampledSampler(ParentBased(
+TraceIdRatioBased(--ratio)))``, with a batch processor that counts exported
+spans, and reads the metrics back through an in-memory reader: calls and
+errors must equal the spans ended, whatever the ratio. It also prints the
+cost of starting and ending a span that is recorded only, next to one the
+sampler drops.
+"""
+import argparse
+import threading
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import Status, StatusCode
+
+from app.observability.sampling import RecordUnsampledSampler
+from app.observability.span_metrics import SPAN_CALLS, SPAN_DURATION, SPAN_ERRORS, SpanMetricsProcessor
+from benchmarks._common import NullSpanExporter, measure_ops, print_table
+
+_SPAN_NAMES = ("GET /weatherforecast/days/{days}", "business.GenerateForecast", "GET /business", "business.ProcessOrder")
+
+
+def _meter(reader=None):
+    return MeterProvider(metric_readers=[reader or InMemoryMetricReader()]).get_meter("benchmark")
+
+
+def _direct(meter):
+    """Reference: the same instruments recorded once per span."""
+    calls = meter.create_counter(SPAN_CALLS)
+    errors = meter.create_counter(SPAN_ERRORS)
+    duration = meter.create_histogram(SPAN_DURATION, unit="ms")
+    attribute_sets = {}
+
+    def on_end(span):
+        attributes = attribute_sets.get((span.name, span.kind))
+        if attributes is None:
+            attributes = attribute_sets[(span.name, span.kind)] = {"span.name": span.name, "span.kind": span.kind.name}
+        calls.add(1, attributes)
+        duration.record((span.end_time - span.start_time) / 1e6, attributes)
+        if span.status.status_code is StatusCode.ERROR:
+            errors.add(1, attributes)
+
+    return on_end
+
+
+def _ended_spans() -> list:
+    tracer = TracerProvider().get_tracer("benchmark")
+    spans = []
+    for name in _SPAN_NAMES:
+        span = tracer.start_span(name)
+        span.end()
+        spans.append(span)
+    return spans
+
+
+def _hot_path(iterations: int) -> list:
+    spans = _ended_spans()
+    rows = []
+    baseline = None
+    for name, on_end in (("instruments per span", _direct(_meter())), ("SpanMetricsProcessor", SpanMetricsProcessor(_meter()).on_end)):
+        i = iter(range(1 << 62))
+        ns = 1e9 / measure_ops(lambda: on_end(spans[next(i) & 3]), iterations)
+        baseline = baseline or ns
+        rows.append((name, f"{ns:,.0f}", f"{baseline / ns:.1f}x"))
+    return rows
+
+
+class _CountingExporter(NullSpanExporter):
+    def __init__(self):
+        super().__init__()
+        self.spans = 0
+
+    def export(self, spans):
+        self.spans += len(spans)
+        return super().export(spans)
+
+
+def _exactness(ratio: float, threads: int, spans_per_thread: int) -> dict:
+    reader = InMemoryMetricReader()
+    span_metrics = SpanMetricsProcessor(_meter(reader), flush_spans=1000)
+    exporter = _CountingExporter()
+    provider = TracerProvider(sampler=RecordUnsampledSampler(ParentBased(TraceIdRatioBased(ratio))))
+    provider.add_span_processor(span_metrics)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    tracer = provider.get_tracer("benchmark")
+
+    def work():
+        for n in range(spans_per_thread):
+            with tracer.start_as_current_span(_SPAN_NAMES[n & 3]) as span:
+                if n % 10 == 0:
+                    span.set_status(Status(StatusCode.ERROR))
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    provider.force_flush()
+
+    totals = {SPAN_CALLS: 0, SPAN_ERRORS: 0, SPAN_DURATION: 0}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    if metric.name in totals:
+                        totals[metric.name] += point.count if metric.name == SPAN_DURATION else point.value
+    provider.shutdown()
+    return {"ended": threads * spans_per_thread, "exported": exporter.spans, **totals}
+
+
+def _span_cost(iterations: int, ratio: float) -> list:
+    rows = []
+    for name, sampler in (
+        ("dropped by the sampler", ParentBased(TraceIdRatioBased(ratio))),
+        ("recorded only, with span metrics", RecordUnsampledSampler(ParentBased(TraceIdRatioBased(0.0)))),
+    ):
+        provider = TracerProvider(sampler=sampler)
+        if isinstance(sampler, RecordUnsampledSampler):
+            provider.add_span_processor(SpanMetricsProcessor(_meter()))
+        tracer = provider.get_tracer("benchmark")
+
+        def start_end():
+            tracer.start_span("business.GenerateForecast").end()
+
+        rows.append((name, f"{1e9 / measure_ops(start_end, iterations):,.0f}"))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--ratio", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--spans-per-thread", type=int, default=20000)
+    args = parser.parse_args()
+
+    print_table("on_end per span (4 span names)", _hot_path(args.iterations), ["variant", "ns/span", "speedup"])
+    print_table("Start and end an unsampled span", _span_cost(args.iterations, args.ratio), ["span", "ns/span"])
+
+    r = _exactness(args.ratio, args.threads, args.spans_per_thread)
+    print_table(
+        f"{r['ended']:,} spans on {args.threads} threads at sampling ratio {args.ratio}",
+        [(name, f"{r[key]:,}") for name, key in (
+            ("spans ended (10% errors)", "ended"),
+            ("spans exported", "exported"),
+            (SPAN_CALLS, SPAN_CALLS),
+            (SPAN_ERRORS, SPAN_ERRORS),
+            (f"{SPAN_DURATION} count", SPAN_DURATION),
+        )],
+        ["", "count"],
+    )
+    exact = r[SPAN_CALLS] == r[SPAN_DURATION] == r["ended"] and r[SPAN_ERRORS] == args.threads * ((args.spans_per_thread + 9) // 10)
+    print(f"\nspan metrics exact: {'ok' if exact else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Cold-start cost of the observability package.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_startup [--runs 5] [--max-import-ms 50] [--max-first-response-ms 3000]
+
+Each measurement runs in a fresh interpreter, once with the default
+settings and once with ``OBSERVABILITY_FAST_STARTUP=true``:
+
+* import: ``import app.observability`` (the package alone, which is lazy)
+* first response: ``import main`` plus one request to ``/`` through the
+  ASGI app, i.e. provider setup, instrumentation and the first request
+
+The minimum over ``--runs`` is reported. ``--importtime`` also prints the
+slowest modules from ``python -X importtime`` for ``import main``. Exits
+non-zero if a minimum exceeds its threshold.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks._common import print_table
+
+_IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.observability
+print((time.perf_counter() - start) * 1000)
+"""
+
+_FIRST_RESPONSE_SCRIPT = """
+import asyncio, os, sys, time
+start = time.perf_counter()
+import main
+
+async def first_request():
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 1), "server": ("localhost", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await main.app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(first_request())
+elapsed = (time.perf_counter() - start) * 1000
+sys.__stdout__.write(f"{elapsed} {status}\\n")
+sys.__stdout__.flush()
+# Skip provider shutdown: the exporters would try to flush to a collector that is not there
+os._exit(0)
+"""
+
+
+def _run(script: str, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    return subprocess.run(command, env=env, capture_output=True, text=True, timeout=120)
+
+
+def _measure(script: str, env: dict, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        result = _run(script, env)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+        value, *rest = result.stdout.strip().splitlines()[-1].split()
+        if rest and rest[0] != "200":
+            raise RuntimeError(f"first request returned {rest[0]}")
+        timings.append(float(value))
+    return min(timings)
+
+
+def _slowest_imports(env: dict, count: int) -> list:
+    """(cumulative ms, module) for the ``count`` slowest imports of ``import main``."""
+    result = _run("import os, main; os._exit(0)", env, importtime=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module>"
+        _, cumulative, module = line.split("|")
+        rows.append((int(cumulative) / 1000, module.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=50.0)
+    parser.add_argument("--max-first-response-ms", type=float, default=3000.0)
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports of main")
+    args = parser.parse_args()
+
+    base_env = {
+        **os.environ,
+        "OTEL_EXPORTER_OTLP_ENDPOINT": "http://127.0.0.1:9",
+        "PYTHONPATH": os.getcwd(),
+    }
+    modes = {
+        "default": base_env,
+        "fast startup": {**base_env, "OBSERVABILITY_FAST_STARTUP": "true"},
+    }
+
+    rows, failed = [], False
+    for mode, env in modes.items():
+        import_ms = _measure(_IMPORT_SCRIPT, env, args.runs)
+        first_response_ms = _measure(_FIRST_RESPONSE_SCRIPT, env, args.runs)
+        failed |= import_ms > args.max_import_ms or first_response_ms > args.max_first_response_ms
+        rows.append((mode, f"{import_ms:.1f}", f"{first_response_ms:.1f}"))
+
+    print_table(
+        f"Cold start, min of {args.runs} fresh interpreters "
+        f"(limits: import {args.max_import_ms:g}ms, first response {args.max_first_response_ms:g}ms)",
+        rows,
+        ["mode", "import app.observability ms", "import main + first response ms"],
+    )
+
+    if args.importtime:
+        print_table(
+            "Slowest imports of main (python -X importtime, cumulative)",
+            [(f"{ms:.1f}", module) for ms, module in _slowest_imports(modes["fast startup"], 15)],
+            ["ms", "module"],
+        )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-span overhead of TailSamplingSpanProcessor in front of the BatchSpanProcessor.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_tail_sampling [--traces 20000]
+
+Each trace is a local root with three children; 1% of traces have an error
+and every trace is otherwise below the latency threshold, so the kept share
+should be about baseline ratio + 1%.
+"""
+import argparse
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.trace import Status, StatusCode
+
+from app.observability.tail_sampling import TailSamplingSpanProcessor
+from benchmarks._common import NullSpanExporter, print_table
+
+SPANS_PER_TRACE = 4
+
+
+def run(processor, traces: int) -> float:
+    """Return seconds spent creating ``traces`` traces with ``processor`` attached."""
+    provider = TracerProvider(sampler=ALWAYS_ON)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer(__name__)
+
+    start = time.perf_counter()
+    for i in range(traces):
+        with tracer.start_as_current_span("GET /business", attributes={"http.route": "/business"}):
+            for child in range(SPANS_PER_TRACE - 1):
+                with tracer.start_as_current_span(f"child-{child}") as span:
+                    if child == 0 and i % 100 == 0:
+                        span.set_status(Status(StatusCode.ERROR))
+    elapsed = time.perf_counter() - start
+    provider.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", type=int, default=20000)
+    parser.add_argument("--baseline-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    spans = args.traces * SPANS_PER_TRACE
+    rows = []
+
+    exporter = NullSpanExporter()
+    batch_only = run(BatchSpanProcessor(exporter, max_queue_size=spans), args.traces)
+    rows.append(("BatchSpanProcessor", f"{batch_only / spans * 1e6:.2f}", "", f"{exporter.exported:,}", "-"))
+
+    exporter = NullSpanExporter()
+    tail = TailSamplingSpanProcessor(
+        BatchSpanProcessor(exporter, max_queue_size=spans),
+        latency_threshold_ms=500,
+        baseline_ratio=args.baseline_ratio,
+    )
+    with_tail = run(tail, args.traces)
+    rows.append((
+        "TailSampling + Batch",
+        f"{with_tail / spans * 1e6:.2f}",
+        f"{(with_tail - batch_only) / spans * 1e6:+.2f}",
+        f"{exporter.exported:,}",
+        f"{tail.traces_kept / args.traces:.1%}",
+    ))
+
+    print_table(
+        f"{args.traces:,} traces x {SPANS_PER_TRACE} spans",
+        rows,
+        ["processor", "us/span", "overhead us/span", "spans exported", "traces kept"],
+    )
+
+
+if __name__ == "__main__":
+    main()
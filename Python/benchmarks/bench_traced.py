@@ -0,0 +1,111 @@
+"""Per-call overhead of TelemetryHelper business spans.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.bench_traced [--iterations 50000]
+
+Compares the previous ``@contextmanager`` ``start_business_span`` (kept
+below as a reference copy) with the current ``start_business_span`` and
+the ``@traced`` decorator on a sync and an ``async def`` function, each
+with two attributes, under an always-on and an always-off sampler. Spans
+go to a BatchSpanProcessor whose exporter discards them.
+"""
+import argparse
+import asyncio
+import time
+from contextlib import contextmanager
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+from opentelemetry.trace.status import Status, StatusCode
+
+from app.observability.telemetry import TelemetryHelper
+from benchmarks._common import NullSpanExporter, measure_ops, print_table
+
+
+def _legacy_business_span(tracer):
+    """Reference copy of ``start_business_span`` before it became a class-based scope."""
+
+    @contextmanager
+    def start_business_span(span_name, attributes=None):
+        with tracer.start_as_current_span(f"business.{span_name}") as span:
+            if attributes:
+                for k, v in attributes.items():
+                    try:
+                        span.set_attribute(k, str(v))
+                    except Exception:
+                        pass
+            try:
+                yield span
+            except Exception as exc:
+                try:
+                    span.record_exception(exc)
+                    span.set_status(Status(StatusCode.ERROR, str(exc)))
+                except Exception:
+                    pass
+                raise
+
+    return start_business_span
+
+
+def _measure_async(fn, iterations: int) -> float:
+    async def loop(n):
+        for _ in range(n):
+            await fn()
+
+    asyncio.run(loop(min(iterations, 1000)))
+    start = time.perf_counter()
+    asyncio.run(loop(iterations))
+    return iterations / (time.perf_counter() - start)
+
+
+def _variants(provider):
+    telemetry = TelemetryHelper("benchmark", tracer_provider=provider)
+    legacy = _legacy_business_span(provider.get_tracer("benchmark"))
+
+    def legacy_call(days=3):
+        with legacy("GenerateWeatherForecast", {"days": days, "unit": "celsius"}):
+            return days
+
+    def scope_call(days=3):
+        with telemetry.start_business_span("GenerateWeatherForecast", {"days": days, "unit": "celsius"}):
+            return days
+
+    @telemetry.traced("GenerateWeatherForecast", attributes={"unit": "celsius"}, attributes_from=lambda days=3: {"days": days})
+    def traced_call(days=3):
+        return days
+
+    @telemetry.traced("GenerateWeatherForecast", attributes={"unit": "celsius"}, attributes_from=lambda days=3: {"days": days})
+    async def traced_async_call(days=3):
+        return days
+
+    return [
+        ("@contextmanager (before)", legacy_call, False),
+        ("start_business_span", scope_call, False),
+        ("@traced sync", traced_call, False),
+        ("@traced async", traced_async_call, True),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    rows = []
+    for sampling, sampler in (("sampled", ALWAYS_ON), ("not sampled", ALWAYS_OFF)):
+        provider = TracerProvider(sampler=sampler)
+        provider.add_span_processor(BatchSpanProcessor(NullSpanExporter(), max_queue_size=args.iterations * 2))
+        baseline = None
+        for name, fn, is_async in _variants(provider):
+            ops = _measure_async(fn, args.iterations) if is_async else measure_ops(fn, args.iterations)
+            baseline = baseline or ops
+            rows.append((sampling, name, f"{1e6 / ops:.2f}", f"{ops / baseline:.2f}x"))
+        provider.shutdown()
+
+    print_table("Business span per call", rows, ["sampling", "API", "us/call", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Convergence simulation of AdaptiveRateSampler under bursty synthetic load.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.sim_adaptive_sampler [--target 10]
+
+Feeds Poisson arrivals through a simulated clock (steady traffic, a 20x
+surge, a quiet night) and checks that, once each phase has settled, sampled
+traces per second stay within ``--tolerance`` of ``min(target, arrival rate)``.
+Exits non-zero if any phase misses. Also reports the per-decision cost.
+"""
+import argparse
+import random
+import sys
+import time
+
+from app.observability.sampling import AdaptiveRateSampler
+from benchmarks._common import measure_ops, print_table
+
+# (name, arrivals per second, duration in seconds)
+PHASES = [
+    ("steady", 50.0, 60.0),
+    ("20x surge", 1000.0, 30.0),
+    ("steady", 50.0, 60.0),
+    ("night", 2.0, 120.0),
+]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(target: float, window: float, interval: float, seed: int) -> list:
+    """Return ``(phase, arrival_rate, expected_per_s, sampled_per_s)`` for the settled part of each phase."""
+    rng = random.Random(seed)
+    clock = _Clock()
+    sampler = AdaptiveRateSampler(target, window_seconds=window, adjust_interval_seconds=interval, clock=clock)
+
+    results = []
+    for name, rate, duration in PHASES:
+        start = clock.now
+        settle = start + min(window * 2, duration / 2)
+        sampled = 0
+        while True:
+            clock.now += rng.expovariate(rate)
+            if clock.now >= start + duration:
+                break
+            decision = sampler.should_sample(None, rng.getrandbits(128), "GET /").decision
+            if clock.now >= settle and decision.is_sampled():
+                sampled += 1
+        clock.now = start + duration
+        results.append((name, rate, min(target, rate), sampled / (start + duration - settle)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", type=float, default=10.0, help="target sampled traces per second")
+    parser.add_argument("--window", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = []
+    failed = False
+    for name, rate, expected, actual in simulate(args.target, args.window, args.interval, args.seed):
+        ok = abs(actual - expected) <= args.tolerance * expected
+        failed = failed or not ok
+        rows.append((name, f"{rate:g}", f"{expected:g}", f"{actual:.2f}", "ok" if ok else "MISS"))
+    print_table(f"Adaptive sampler convergence (target {args.target:g}/s)", rows, ["phase", "arrivals/s", "expected/s", "sampled/s", ""])
+
+    sampler = AdaptiveRateSampler(args.target)
+    trace_id = random.getrandbits(128)
+    ops = measure_ops(lambda: sampler.should_sample(None, trace_id, "GET /"), 200_000)
+    print(f"\nshould_sample: {1e9 / ops:.0f} ns/decision ({time.get_clock_info('monotonic').implementation} clock)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
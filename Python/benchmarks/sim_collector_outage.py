@@ -0,0 +1,92 @@
+"""Collector outage simulation for the OTLP disk spill buffer.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.sim_collector_outage [--spans 5000] [--outage 5]
+
+Starts a stand-in OTLP gRPC receiver that counts the spans it is sent,
+exports spans through ``BatchSpanProcessor`` and ``SpillingSpanExporter``,
+stops the receiver for ``--outage`` seconds mid-run and starts it again.
+Exits non-zero unless every span reaches the receiver once it is back.
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+from app.observability.spill import SIGNAL_TRACES, GrpcReplaySender, SegmentStore, SpillingSpanExporter
+from benchmarks._common import OtlpGrpcReceiver, free_port, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=5000, help="spans per phase (before, during, after the outage)")
+    parser.add_argument("--outage", type=float, default=5.0, help="seconds the receiver is down")
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    endpoint = f"http://127.0.0.1:{port}"
+    receiver = OtlpGrpcReceiver(port)
+    receiver.start()
+
+    spill_dir = tempfile.mkdtemp(prefix="otlp-spill-")
+    exporter = SpillingSpanExporter(
+        OTLPSpanExporter(endpoint=endpoint, insecure=True, timeout=1),
+        SegmentStore(spill_dir, max_bytes=64 * 1024 * 1024, segment_bytes=1024 * 1024),
+        GrpcReplaySender(endpoint, SIGNAL_TRACES, timeout_seconds=1.0),
+        replay_per_second=200.0,
+        retry_interval_seconds=0.5,
+    )
+    provider = TracerProvider()
+    # The first export to fail waits out its timeout before spilling starts; a
+    # queue that holds a whole phase keeps losses down to the spill alone
+    provider.add_span_processor(BatchSpanProcessor(exporter, schedule_delay_millis=100, max_queue_size=args.spans))
+    tracer = provider.get_tracer(__name__)
+
+    def emit(n: int):
+        for i in range(n):
+            with tracer.start_as_current_span("request", attributes={"i": i}):
+                pass
+
+    emit(args.spans)
+    provider.force_flush()
+
+    receiver.stop()
+    outage_end = time.monotonic() + args.outage
+    emit(args.spans)
+    while time.monotonic() < outage_end:
+        time.sleep(0.1)
+    provider.force_flush()
+    spilled = exporter.spilled
+    receiver.start()
+
+    emit(args.spans)
+    provider.force_flush()
+    expected = args.spans * 3
+    deadline = time.monotonic() + args.drain_timeout
+    while receiver.spans < expected and time.monotonic() < deadline:
+        time.sleep(0.1)
+    drain_seconds = args.drain_timeout - max(deadline - time.monotonic(), 0)
+
+    rows = [
+        ("spans emitted", expected),
+        ("spans received", receiver.spans),
+        ("batches spilled to disk", spilled),
+        ("batches replayed", exporter.replayed),
+        ("seconds to drain after restart", f"{drain_seconds:.1f}"),
+    ]
+    print_table(f"Collector outage of {args.outage:g}s", rows, ["", "value"])
+
+    provider.shutdown()
+    receiver.stop()
+    if receiver.spans < expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Multi-worker metrics aggregation check.
+
+Run from the ``Python`` directory::
+
+    python -m benchmarks.sim_multiworker [--workers 3] [--requests 300]
+
+Starts ``main.py`` with ``--workers`` uvicorn workers and a fresh
+``METRICS_MULTIPROCESS_DIR``, sends ``--requests`` requests to ``/`` over
+new connections so they spread across workers, then scrapes ``/metrics``
+until the merged request counter matches. Exits non-zero if it never
+does, or if fewer than two workers served requests.
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._common import free_port, print_table
+
+_REQUEST_COUNT = re.compile(r'^http_server_request_count_total\{(?P<labels>[^}]*)\} (?P<value>\S+)$', re.M)
+_SNAPSHOT_FILES = re.compile(r"^metrics-.+\.json$")
+
+
+def _get(port: int, path: str) -> tuple:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read().decode()
+    finally:
+        connection.close()
+
+
+def _wait_ready(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _get(port, "/metrics")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError("workers did not start")
+
+
+def _root_request_count(body: str) -> float:
+    return sum(
+        float(m.group("value"))
+        for m in _REQUEST_COUNT.finditer(body)
+        if 'http_route="/"' in m.group("labels")
+    )
+
+
+def _per_worker_counts(metrics_dir: str) -> list:
+    """Requests to ``/`` in each worker's own snapshot file."""
+    counts = []
+    for name in sorted(os.listdir(metrics_dir)):
+        if not _SNAPSHOT_FILES.match(name):
+            continue
+        with open(os.path.join(metrics_dir, name)) as f:
+            snapshot = json.load(f)
+        counts.append(sum(
+            point["value"]
+            for metric in snapshot["metrics"] if metric["name"] == "http.server.request.count"
+            for point in metric["points"] if point["attributes"].get("http.route") == "/"
+        ))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    metrics_dir = tempfile.mkdtemp(prefix="metrics-multiprocess-")
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "METRICS_MULTIPROCESS_DIR": metrics_dir,
+        "METRICS_MULTIPROCESS_INTERVAL": "500",
+        "OTEL_EXPORTER_OTLP_ENDPOINT": "http://127.0.0.1:9",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port, args.timeout)
+        for _ in range(args.requests):
+            status, _ = _get(port, "/")
+            assert status == 200, status
+
+        deadline = time.monotonic() + args.timeout
+        counted = 0.0
+        while time.monotonic() < deadline:
+            counted = _root_request_count(_get(port, "/metrics")[1])
+            if counted >= args.requests:
+                break
+            time.sleep(0.5)
+        per_worker = _per_worker_counts(metrics_dir)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    rows = [
+        ("requests sent", args.requests),
+        ("requests counted at /metrics", f"{counted:g}"),
+        ("requests per worker snapshot", " ".join(f"{c:g}" for c in per_worker)),
+    ]
+    print_table(f"Multi-worker metrics ({args.workers} workers)", rows, ["", "value"])
+
+    if counted != args.requests or sum(1 for c in per_worker if c) < min(2, args.workers):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
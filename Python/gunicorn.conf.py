@@ -0,0 +1,32 @@
+"""gunicorn settings for running the app with several workers.
+
+Run from the ``Python`` directory (gunicorn reads ``./gunicorn.conf.py``)::
+
+    gunicorn main:app
+
+Workers, port and ``METRICS_MULTIPROCESS_DIR`` come from the same
+environment variables as ``python main.py``. With a metrics directory, the
+master clears snapshots left by a previous run at startup and folds the
+snapshot of every worker that exits into ``metrics-exited.json``, so the
+directory does not grow as workers are restarted.
+"""
+import os
+
+from app.observability.config import get_worker_config
+from app.observability.workers import clear_multiprocess_dir, compact_multiprocess_dir
+
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = get_worker_config()["workers"]
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+
+def on_starting(server):
+    metrics_dir = get_worker_config()["metrics_dir"]
+    if metrics_dir:
+        clear_multiprocess_dir(metrics_dir)
+
+
+def child_exit(server, worker):
+    metrics_dir = get_worker_config()["metrics_dir"]
+    if metrics_dir:
+        compact_multiprocess_dir(metrics_dir)
@@ -5,12 +5,17 @@ import structlog
 os.environ.setdefault("OTEL_SERVICE_NAME", "SampleServicePython")
 os.environ.setdefault("ENVIRONMENT", "Production")
 os.environ.setdefault("SERVICE_VERSION", "1.0.0")
-os.environ.setdefault("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
 
-from app.observability import init_observability, instrument_app, TelemetryHelper
+from app.observability import init_observability, instrument_app, TelemetryHelper, get_request_context
+from app.observability.config import get_worker_config
 from app.middleware.observability_middleware import ObservabilityMiddleware
 
-init_observability()
+worker_config = get_worker_config()
+
+# With several workers the process started as __main__ only supervises them;
+# each worker imports this module and initializes its own providers
+if __name__ != "__main__" or worker_config["workers"] <= 1:
+    init_observability()
 
 app = FastAPI(title="SampleServicePython", version="1.0.0")
 
@@ -39,26 +44,18 @@ def health():
 @app.get("/weatherforecast/days/{days}")
 def get_weather_forecast(days: int):
     """Get weather forecast for specified number of days (max 5)"""
-    import random
-    from datetime import datetime, timedelta
-    from opentelemetry import trace
-    
     if days > 5:
         log = structlog.get_logger("main.controllers.WeatherForecastController")
-        
-        span = trace.get_current_span()
-        ctx = span.get_span_context() if span else None
-        trace_id = format(ctx.trace_id, "032x") if ctx and ctx.trace_id != 0 else None
-        span_id = format(ctx.span_id, "016x") if ctx and ctx.span_id != 0 else None
+        request_context = get_request_context()
         
         log.error(
             f"Validation failed in WeatherForecastController.GetByDays: days={days}",
-            traceId=trace_id,
-            spanId=span_id,
+            traceId=request_context.trace_id if request_context else None,
+            spanId=request_context.span_id if request_context else None,
             Days=days,
             Action="GetByDays",
             Controller="WeatherForecastController",
-            RequestPath=f"/weatherforecast/days/{days}",
+            RequestPath="/weatherforecast/days/{days}",
             error={
                 "type": "ValidationException",
                 "message": f"Days must be 5 or less. Requested: {days}",
@@ -72,21 +69,29 @@ def get_weather_forecast(days: int):
         )
         raise HTTPException(status_code=400, detail=f"Days must be 5 or less. Requested: {days}")
     
-    with telemetry.start_business_span("GenerateWeatherForecast", {"days": days}):
-        forecasts = []
-        summaries = ["Freezing", "Bracing", "Chilly", "Cool", "Mild", "Warm", "Balmy", "Hot", "Sweltering", "Scorching"]
-        
-        for i in range(days):
-            date = datetime.now() + timedelta(days=i)
-            temp_c = random.randint(-20, 55)
-            forecasts.append({
-                "date": date.isoformat(),
-                "temperatureC": temp_c,
-                "temperatureF": 32 + int(temp_c * 1.8),
-                "summary": random.choice(summaries)
-            })
-        
-        return forecasts
+    return generate_weather_forecast(days)
+
+
+@telemetry.traced("GenerateWeatherForecast", attributes_from=lambda days: {"days": days})
+def generate_weather_forecast(days: int):
+    """Generate ``days`` random forecasts inside a business span"""
+    import random
+    from datetime import datetime, timedelta
+
+    forecasts = []
+    summaries = ["Freezing", "Bracing", "Chilly", "Cool", "Mild", "Warm", "Balmy", "Hot", "Sweltering", "Scorching"]
+
+    for i in range(days):
+        date = datetime.now() + timedelta(days=i)
+        temp_c = random.randint(-20, 55)
+        forecasts.append({
+            "date": date.isoformat(),
+            "temperatureC": temp_c,
+            "temperatureF": 32 + int(temp_c * 1.8),
+            "summary": random.choice(summaries)
+        })
+
+    return forecasts
 
 
 @app.get("/business")
@@ -105,4 +110,11 @@ def business():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    port = int(os.getenv("PORT", "8000"))
+    if worker_config["workers"] > 1:
+        from app.observability.workers import clear_multiprocess_dir
+        if worker_config["metrics_dir"]:
+            clear_multiprocess_dir(worker_config["metrics_dir"])
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=worker_config["workers"])
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
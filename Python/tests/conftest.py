@@ -0,0 +1,117 @@
+"""Shared pytest fixtures.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests
+"""
+import ipaddress
+import struct
+
+import pytest
+
+_METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+_UINT16, _UINT32, _UINT64 = 5, 6, 9
+
+
+class FakeClock:
+    """Monotonic clock the test advances by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _control(type_id: int, size: int) -> bytes:
+    """MMDB data section control byte(s) for a field of ``type_id`` and ``size``."""
+    if size < 29:
+        head, extra = size, b""
+    elif size < 285:
+        head, extra = 29, bytes([size - 29])
+    else:
+        head, extra = 30, struct.pack(">H", size - 285)
+    if type_id <= 7:
+        return bytes([(type_id << 5) | head]) + extra
+    return bytes([head, type_id - 7]) + extra
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, str):
+        data = value.encode()
+        return _control(2, len(data)) + data
+    if isinstance(value, tuple):
+        # (type_id, n): unsigned integer of an explicit type, as the metadata requires
+        type_id, n = value
+        data = n.to_bytes(8, "big").lstrip(b"\0")
+        return _control(type_id, len(data)) + data
+    if isinstance(value, list):
+        return _control(11, len(value)) + b"".join(_encode(v) for v in value)
+    if isinstance(value, dict):
+        return _control(7, len(value)) + b"".join(_encode(k) + _encode(v) for k, v in value.items())
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def _write_country_mmdb(path: str, networks: dict):
+    """Write an IPv4 MaxMind-format database mapping each CIDR in ``networks`` to ``{"country": {"iso_code": ...}}``."""
+    data, offsets = bytearray(), {}
+    nodes = [[None, None]]
+    # Shorter prefixes first, so a more specific network is never overwritten
+    for cidr, iso_code in sorted(networks.items(), key=lambda item: ipaddress.IPv4Network(item[0]).prefixlen):
+        if iso_code not in offsets:
+            offsets[iso_code] = len(data)
+            data += _encode({"country": {"iso_code": iso_code}})
+        network = ipaddress.IPv4Network(cidr)
+        bits, node = int(network.network_address), 0
+        for depth in range(network.prefixlen):
+            bit = (bits >> (31 - depth)) & 1
+            if depth == network.prefixlen - 1:
+                nodes[node][bit] = ("data", offsets[iso_code])
+            else:
+                child = nodes[node][bit]
+                if not isinstance(child, int):
+                    # a shorter network already covers this one; keep the more specific entry below it
+                    nodes.append([child, child])
+                    child = nodes[node][bit] = len(nodes) - 1
+                node = child
+
+    node_count = len(nodes)
+
+    def record(value) -> int:
+        if value is None:
+            return node_count
+        if isinstance(value, int):
+            return value
+        return node_count + 16 + value[1]
+
+    tree = b"".join(record(left).to_bytes(3, "big") + record(right).to_bytes(3, "big") for left, right in nodes)
+    metadata = {
+        "binary_format_major_version": (_UINT16, 2),
+        "binary_format_minor_version": (_UINT16, 0),
+        "build_epoch": (_UINT64, 1700000000),
+        "database_type": "Test-Country",
+        "description": {"en": "Generated test fixture"},
+        "ip_version": (_UINT16, 4),
+        "languages": ["en"],
+        "node_count": (_UINT32, node_count),
+        "record_size": (_UINT16, 24),
+    }
+    with open(path, "wb") as f:
+        f.write(tree + b"\0" * 16 + bytes(data) + _METADATA_MARKER + _encode(metadata))
+
+
+@pytest.fixture
+def country_mmdb(tmp_path):
+    """Factory writing a small country database for ``{cidr: iso_code}``; returns its path."""
+
+    def write(networks: dict) -> str:
+        path = str(tmp_path / "country.mmdb")
+        _write_country_mmdb(path, networks)
+        return path
+
+    return write
@@ -0,0 +1,65 @@
+"""OTLP exporter construction: endpoints per protocol and the shared gRPC channel.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_exporters.py
+"""
+import pytest
+
+from app.observability import exporters
+from app.observability.config import get_exporter_config, get_otlp_endpoint
+
+
+@pytest.fixture(autouse=True)
+def otlp_env(monkeypatch):
+    for name in ("OTEL_EXPORTER_OTLP_ENDPOINT", "OpenTelemetry__OtlpEndpoint", "OTEL_EXPORTER_OTLP_PROTOCOL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OTEL_PIPELINE_METRICS_ENABLED", "false")
+    monkeypatch.setenv("OTLP_SPILL_ENABLED", "false")
+    monkeypatch.setattr(exporters, "_grpc_channels", {})
+
+
+@pytest.mark.parametrize("protocol, endpoint", [
+    ("grpc", "http://localhost:4317"),
+    ("http/protobuf", "http://localhost:4318"),
+])
+def test_default_endpoint_follows_the_protocol(monkeypatch, protocol, endpoint):
+    monkeypatch.setenv("OTEL_EXPORTER_OTLP_PROTOCOL", protocol)
+    assert get_otlp_endpoint() == endpoint
+
+
+def test_http_exporter_posts_to_the_signal_path_on_4318(monkeypatch):
+    monkeypatch.setenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http/protobuf")
+    exporter = exporters.create_exporter("traces", get_otlp_endpoint(), get_exporter_config())
+    assert exporter._endpoint == "http://localhost:4318/v1/traces"
+
+
+def test_grpc_exporters_share_one_channel():
+    config = get_exporter_config()
+    traces = exporters.create_exporter("traces", get_otlp_endpoint(), config)
+    logs = exporters.create_exporter("logs", get_otlp_endpoint(), config)
+    assert traces._channel is logs._channel
+    traces.shutdown()
+    logs.shutdown()
+
+
+def test_unexpected_grpc_internals_keep_a_channel_of_their_own(monkeypatch, capsys):
+    exporter_class = exporters._exporter_class
+
+    def changed_exporter_class(protocol, signal):
+        class ChangedExporter(exporter_class(protocol, signal)):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self._stub = self._changed_stub
+
+            def _changed_stub(self, channel):
+                raise TypeError("unexpected channel")
+
+        return ChangedExporter
+
+    monkeypatch.setattr(exporters, "_exporter_class", changed_exporter_class)
+    exporter = exporters.create_exporter("traces", get_otlp_endpoint(), get_exporter_config())
+    assert "could not share the OTLP gRPC channel" in capsys.readouterr().err
+    assert not isinstance(exporter._channel, exporters._SharedChannel)
+    assert exporters._grpc_channels == {}
+    exporter.shutdown()
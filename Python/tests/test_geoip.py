@@ -0,0 +1,57 @@
+"""GeoIP country lookups against a small generated MaxMind-format database.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_geoip.py
+"""
+import pytest
+
+pytest.importorskip("maxminddb")
+
+from app.observability.geoip import GeoIpLookup, create_geoip_lookup
+
+NETWORKS = {
+    "8.8.0.0/16": "US",
+    "8.8.4.0/24": "DE",
+    "81.2.69.0/24": "GB",
+    "133.0.0.0/8": "JP",
+}
+
+
+@pytest.fixture
+def lookup(country_mmdb):
+    lookup = GeoIpLookup(country_mmdb(NETWORKS), cache_size=16)
+    yield lookup
+    lookup.close()
+
+
+@pytest.mark.parametrize("ip, country", [
+    ("8.8.8.8", "US"),
+    # The more specific network wins over the /16 around it
+    ("8.8.4.4", "DE"),
+    ("81.2.69.142", "GB"),
+    ("133.11.0.1", "JP"),
+    ("1.1.1.1", None),
+])
+def test_country_of_public_addresses(lookup, ip, country):
+    assert lookup.country(ip) == country
+
+
+@pytest.mark.parametrize("ip", ["127.0.0.1", "10.0.3.7", "192.168.1.20", "169.254.0.1", "unknown", "2001:4860:4860::8888"])
+def test_private_invalid_and_ipv6_addresses_have_no_country(lookup, ip):
+    assert lookup.country(ip) is None
+
+
+def test_repeated_lookups_are_cached(lookup):
+    for _ in range(3):
+        lookup.country("8.8.8.8")
+    lookup.country("81.2.69.142")
+
+    stats = lookup.stats
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+
+def test_missing_database_disables_lookup(tmp_path, capsys):
+    assert create_geoip_lookup({"database": str(tmp_path / "missing.mmdb"), "cache_size": 16}) is None
+    assert "could not open GeoIP database" in capsys.readouterr().err
+    assert create_geoip_lookup({"database": None, "cache_size": 16}) is None
@@ -0,0 +1,45 @@
+"""Log sampling: kept and dropped events are all counted.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_log_sampling.py
+"""
+import threading
+
+import structlog
+
+from app.observability.log_sampling import REASON_SAMPLED, LogSamplingProcessor, LogSamplingRule
+
+
+def _event(level: str, path: str) -> dict:
+    return {"level": level, "logger": "app", "event": "Request finished", "RequestPath": path, "requestId": None}
+
+
+def test_kept_events_from_many_threads_are_all_counted():
+    processor = LogSamplingProcessor()
+
+    def run():
+        for _ in range(5000):
+            processor(None, "info", _event("info", "/"))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    processor(None, "info", _event("info", "/"))
+
+    assert processor.kept == 8 * 5000 + 1
+
+
+def test_dropped_events_are_not_counted_as_kept():
+    processor = LogSamplingProcessor(rules=[LogSamplingRule(route="/health", rate=0.0)])
+
+    for path in ("/health", "/", "/health"):
+        try:
+            processor(None, "info", _event("info", path))
+        except structlog.DropEvent:
+            pass
+
+    assert processor.kept == 1
+    assert processor.dropped[REASON_SAMPLED] == 2
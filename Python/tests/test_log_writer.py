@@ -0,0 +1,76 @@
+"""Async log writer: no event is lost or stuck when the writer shuts down.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_log_writer.py
+"""
+import threading
+import time
+
+import pytest
+import structlog
+
+from app.observability.log_writer import OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, AsyncLogWriter
+
+
+class _GatedStream:
+    """Text stream whose writes from the writer thread wait for ``gate``."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.lines = []
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if threading.current_thread().name == "AsyncLogWriter":
+            self.gate.wait(5.0)
+        with self._lock:
+            self.lines.extend(text.splitlines())
+
+    def flush(self):
+        pass
+
+
+def _log(writer, event: str):
+    with pytest.raises(structlog.DropEvent):
+        writer(None, "info", {"event": event})
+
+
+def _writer(stream, policy: str) -> AsyncLogWriter:
+    return AsyncLogWriter([lambda logger, method_name, event_dict: event_dict["event"]], stream=stream, queue_size=1, overflow_policy=policy)
+
+
+def test_shutdown_releases_a_producer_blocked_on_a_full_queue():
+    stream = _GatedStream()
+    writer = _writer(stream, OVERFLOW_BLOCK)
+    _log(writer, "first")
+    # Taken by the writer, which now waits on the stream
+    while writer._queue.qsize():
+        time.sleep(0.001)
+    _log(writer, "second")
+
+    blocked = threading.Thread(target=_log, args=(writer, "third"))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+
+    shutdown = threading.Thread(target=writer.shutdown)
+    shutdown.start()
+    # Written inline once the queue is closed, without waiting for the writer
+    blocked.join(5.0)
+    assert not blocked.is_alive()
+    assert stream.lines == ["third"]
+
+    stream.gate.set()
+    shutdown.join(5.0)
+    assert sorted(stream.lines) == ["first", "second", "third"]
+
+
+def test_events_after_shutdown_are_written_inline():
+    stream = _GatedStream()
+    stream.gate.set()
+    writer = _writer(stream, OVERFLOW_DROP_OLDEST)
+    _log(writer, "queued")
+    writer.shutdown()
+    _log(writer, "late")
+    assert stream.lines == ["queued", "late"]
@@ -0,0 +1,48 @@
+"""Metric reader selection: metrics are never handed to a reader nothing reads.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_metrics.py
+"""
+import pytest
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+from app.observability.config import _PROM_AVAILABLE
+from app.observability.metrics import create_metric_reader
+from app.observability.workers import WorkerSnapshotExporter
+
+
+@pytest.fixture(autouse=True)
+def default_env(monkeypatch):
+    for name in ("METRICS_ENDPOINT_ENABLED", "METRICS_MULTIPROCESS_DIR"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_default_env_pushes_over_otlp():
+    reader = create_metric_reader("http://localhost:4317")
+    try:
+        assert isinstance(reader, PeriodicExportingMetricReader)
+        assert not isinstance(reader._exporter, WorkerSnapshotExporter)
+    finally:
+        reader.shutdown(timeout_millis=100)
+
+
+@pytest.mark.skipif(not _PROM_AVAILABLE, reason="opentelemetry-exporter-prometheus is not installed")
+def test_enabled_endpoint_uses_the_prometheus_reader(monkeypatch):
+    from opentelemetry.exporter.prometheus import PrometheusMetricReader
+
+    monkeypatch.setenv("METRICS_ENDPOINT_ENABLED", "true")
+    reader = create_metric_reader("http://localhost:4317")
+    try:
+        assert isinstance(reader, PrometheusMetricReader)
+    finally:
+        reader.shutdown()
+
+
+def test_multiprocess_dir_writes_worker_snapshots(monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROCESS_DIR", str(tmp_path))
+    reader = create_metric_reader("http://localhost:4317")
+    try:
+        assert isinstance(reader._exporter, WorkerSnapshotExporter)
+    finally:
+        reader.shutdown(timeout_millis=100)
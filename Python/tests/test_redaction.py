@@ -0,0 +1,71 @@
+"""Redaction: keys come from the collector config, and exception text is masked.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_redaction.py
+"""
+import structlog
+
+from app.observability.config import get_redaction_config
+from app.observability.logging import init_logging
+from app.observability.redaction import (
+    DEFAULT_KEYS_FILE,
+    DEFAULT_SENSITIVE_KEYS,
+    build_redactor,
+    load_collector_keys,
+)
+
+
+def test_built_in_keys_match_the_collector_config():
+    keys, _ = load_collector_keys(DEFAULT_KEYS_FILE)
+    assert sorted(keys) == sorted(DEFAULT_SENSITIVE_KEYS)
+
+
+def test_keys_are_loaded_from_the_collector_config_by_default(monkeypatch, tmp_path):
+    keys_file = tmp_path / "collector.yaml"
+    keys_file.write_text(
+        "processors:\n"
+        "  attributes:\n"
+        "    actions:\n"
+        "      - key: customer.tax_id\n"
+        "        action: delete\n"
+    )
+    monkeypatch.setenv("REDACTION_ENABLED", "true")
+    monkeypatch.setattr("app.observability.redaction.DEFAULT_KEYS_FILE", str(keys_file))
+
+    redactor = build_redactor(get_redaction_config())
+    redacted = redactor.redact_mapping({"customer.tax_id": "123", "ssn": "456"})
+
+    assert redacted["customer.tax_id"] == "[REDACTED]"
+    # Not in that collector config, and not matched by a key pattern
+    assert redacted["ssn"] == "456"
+
+
+def test_missing_default_file_falls_back_to_the_built_in_keys(monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv("REDACTION_ENABLED", "true")
+    monkeypatch.setattr("app.observability.redaction.DEFAULT_KEYS_FILE", str(tmp_path / "missing.yaml"))
+
+    redactor = build_redactor(get_redaction_config())
+
+    assert redactor.redact_mapping({"ssn": "456"})["ssn"] == "[REDACTED]"
+    assert capsys.readouterr().err == ""
+
+
+def test_exception_text_is_redacted(monkeypatch, caplog):
+    for name in ("LOG_ASYNC", "LOG_SAMPLING_ENABLED", "FLIGHT_RECORDER_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("REDACTION_ENABLED", "true")
+    log = init_logging()
+    try:
+        try:
+            raise ConnectionError("could not connect to postgresql://app:s3cr3t@db:5432/orders")
+        except ConnectionError:
+            log.exception("Database unavailable")
+    finally:
+        structlog.reset_defaults()
+
+    (record,) = [r for r in caplog.records if "Database unavailable" in r.getMessage()]
+    assert "postgresql://[REDACTED]@db:5432/orders" in record.getMessage()
+    assert "s3cr3t" not in record.getMessage()
+    # A handler would append this traceback to the line, unredacted
+    assert record.exc_info is None
@@ -0,0 +1,66 @@
+"""Span metrics: bucketed durations read back like durations recorded one by one.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_span_metrics.py
+"""
+import random
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+
+from app.observability.request_metrics import DEFAULT_DURATION_BUCKETS_MS
+from app.observability.span_metrics import SPAN_CALLS, SPAN_DURATION, SpanMetricsProcessor
+
+
+def _points(reader) -> dict:
+    points = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                points[metric.name] = metric.data.data_points[0]
+    return points
+
+
+def test_histogram_matches_recording_every_duration():
+    rng = random.Random(5)
+    durations_ms = [rng.lognormvariate(3.0, 1.5) for _ in range(2000)]
+
+    reader = InMemoryMetricReader()
+    processor = SpanMetricsProcessor(meter=MeterProvider(metric_readers=[reader]).get_meter("test"))
+    direct_reader = InMemoryMetricReader()
+    direct = MeterProvider(metric_readers=[direct_reader]).get_meter("test").create_histogram(SPAN_DURATION)
+
+    tracer = TracerProvider().get_tracer("test")
+    for duration_ms in durations_ms:
+        span = tracer.start_span("GET /", start_time=0)
+        span.end(end_time=int(duration_ms * 1e6))
+        processor.on_end(span)
+        direct.record(int(duration_ms * 1e6) / 1e6)
+
+    points = _points(reader)
+    expected = _points(direct_reader)[SPAN_DURATION]
+    processor.shutdown()
+
+    histogram = points[SPAN_DURATION]
+    assert points[SPAN_CALLS].value == len(durations_ms)
+    assert histogram.count == expected.count
+    assert list(histogram.bucket_counts) == list(expected.bucket_counts)
+    assert histogram.sum == pytest.approx(expected.sum)
+    assert (histogram.min, histogram.max) == (expected.min, expected.max)
+
+
+def test_series_memory_does_not_grow_with_spans():
+    processor = SpanMetricsProcessor(meter=MeterProvider(metric_readers=[InMemoryMetricReader()]).get_meter("test"))
+    tracer = TracerProvider().get_tracer("test")
+    for i in range(1000):
+        span = tracer.start_span("GET /", start_time=0)
+        span.end(end_time=i * 100_000)
+        processor.on_end(span)
+
+    (stats,) = processor._local.table.stats.values()
+    processor.shutdown()
+    assert len(stats.counts) == len(DEFAULT_DURATION_BUCKETS_MS) + 1
+    assert sum(stats.counts) == 1000
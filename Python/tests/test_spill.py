@@ -0,0 +1,140 @@
+"""OTLP disk spill: every span of a failed export is replayed exactly once.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_spill.py
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+
+from app.observability.spill import SegmentStore, SpillingSpanExporter
+
+_PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Collector(SpanExporter):
+    """Stands in for both the live exporter and the replay sender; records span names and can be taken down."""
+
+    def __init__(self):
+        self.up = True
+        self.names = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        if not self.up:
+            return SpanExportResult.FAILURE
+        with self._lock:
+            self.names.extend(span.name for span in spans)
+        return SpanExportResult.SUCCESS
+
+    def __call__(self, payload: bytes):
+        if not self.up:
+            raise ConnectionError("collector down")
+        request = ExportTraceServiceRequest.FromString(payload)
+        with self._lock:
+            self.names.extend(
+                span.name
+                for resource_spans in request.resource_spans
+                for scope_spans in resource_spans.scope_spans
+                for span in scope_spans.spans
+            )
+
+
+def _spilling(collector: _Collector, directory: str, adopt_from=None) -> SpillingSpanExporter:
+    return SpillingSpanExporter(
+        collector,
+        SegmentStore(directory, max_bytes=16 * 1024 * 1024, segment_bytes=4096),
+        collector,
+        replay_per_second=0,
+        retry_interval_seconds=0.05,
+        adopt_from=adopt_from,
+    )
+
+
+def _emit(exporter, names):
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    for name in names:
+        with tracer.start_as_current_span(name):
+            pass
+
+
+def _wait_for(predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_outage_is_replayed_without_loss_or_duplicates(tmp_path):
+    collector = _Collector()
+    exporter = _spilling(collector, str(tmp_path / "own"))
+    names = [f"span-{i}" for i in range(300)]
+
+    _emit(exporter, names[:100])
+    collector.up = False
+    _emit(exporter, names[100:200])
+    assert exporter.spilled >= 100
+    collector.up = True
+    _emit(exporter, names[200:])
+
+    assert _wait_for(lambda: len(collector.names) >= len(names))
+    exporter.shutdown()
+    assert sorted(collector.names) == sorted(names)
+
+
+def test_replay_resumes_from_the_cursor_after_a_restart(tmp_path):
+    directory = str(tmp_path / "own")
+    store = SegmentStore(directory, segment_bytes=4096)
+    collector = _Collector()
+    for i in range(50):
+        request = ExportTraceServiceRequest()
+        request.resource_spans.add().scope_spans.add().spans.add(name=f"span-{i}")
+        store.append(request.SerializeToString())
+    for _ in range(20):
+        collector(store.peek())
+        store.advance()
+    store.close()
+
+    exporter = _spilling(collector, directory)
+    assert _wait_for(lambda: len(collector.names) >= 50)
+    exporter.shutdown()
+    assert sorted(collector.names) == sorted(f"span-{i}" for i in range(50))
+
+
+def test_backlog_of_a_dead_process_is_adopted(tmp_path):
+    parent = tmp_path / "traces"
+    # A worker that spilled and died before replaying; its lock dies with it
+    code = (
+        "import sys\n"
+        "from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest\n"
+        "from app.observability.spill import SegmentStore\n"
+        "store = SegmentStore(sys.argv[1])\n"
+        "for i in range(30):\n"
+        "    request = ExportTraceServiceRequest()\n"
+        "    request.resource_spans.add().scope_spans.add().spans.add(name=f'dead-{i}')\n"
+        "    store.append(request.SerializeToString())\n"
+    )
+    subprocess.run([sys.executable, "-c", code, str(parent / "dead-worker")], check=True, cwd=_PYTHON_DIR)
+    # A live worker's directory is locked and left alone
+    live = SegmentStore(str(parent / "live-worker"))
+    live.append(b"not a request")
+
+    collector = _Collector()
+    exporter = _spilling(collector, str(parent / "own"), adopt_from=str(parent))
+    assert _wait_for(lambda: len(collector.names) >= 30)
+    assert _wait_for(lambda: not (parent / "dead-worker").exists())
+    exporter.shutdown()
+    live.close()
+
+    assert sorted(collector.names) == sorted(f"dead-{i}" for i in range(30))
+    assert exporter.adopted == 1
+    assert (parent / "live-worker").exists()
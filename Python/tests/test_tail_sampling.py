@@ -0,0 +1,59 @@
+"""Tail sampling: each local root's spans are kept or dropped together.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_tail_sampling.py
+"""
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import NonRecordingSpan, SpanContext, Status, StatusCode, TraceFlags
+
+from app.observability.tail_sampling import TailSamplingSpanProcessor
+
+TRACE_ID = 0x5B8EFFF798038103D269B633813FC60C
+
+
+def _tracer(**kwargs):
+    exporter = InMemorySpanExporter()
+    processor = TailSamplingSpanProcessor(SimpleSpanProcessor(exporter), baseline_ratio=0.0, **kwargs)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__), processor, exporter
+
+
+def _remote_parent(span_id: int):
+    """Context continuing the upstream trace ``TRACE_ID`` from span ``span_id``."""
+    parent = SpanContext(TRACE_ID, span_id, is_remote=True, trace_flags=TraceFlags(TraceFlags.SAMPLED))
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+
+def _request(tracer, name: str, span_id: int, error: bool = False):
+    with tracer.start_as_current_span(name, context=_remote_parent(span_id)):
+        with tracer.start_as_current_span(f"{name} child") as child:
+            if error:
+                child.set_status(Status(StatusCode.ERROR))
+
+
+def test_later_local_root_of_the_same_trace_is_decided_on_its_own():
+    tracer, processor, exporter = _tracer()
+
+    _request(tracer, "first", 0x1111)
+    _request(tracer, "second", 0x2222, error=True)
+
+    assert sorted(span.name for span in exporter.get_finished_spans()) == ["second", "second child"]
+    assert (processor.traces_kept, processor.traces_dropped) == (1, 1)
+
+
+def test_child_ending_after_its_root_follows_the_decision():
+    tracer, processor, exporter = _tracer(route_allowlist=["kept"])
+
+    for name in ("kept", "dropped"):
+        root = tracer.start_span(name, context=_remote_parent(0x3333), attributes={"http.route": name})
+        child = tracer.start_span(f"{name} late child", context=trace.set_span_in_context(root))
+        root.end()
+        child.end()
+
+    assert sorted(span.name for span in exporter.get_finished_spans()) == ["kept", "kept late child"]
+    assert processor.buffered_spans == 0
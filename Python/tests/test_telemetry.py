@@ -0,0 +1,72 @@
+"""Business spans from ``TelemetryHelper.traced``.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_telemetry.py
+"""
+import asyncio
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from app.observability.telemetry import TelemetryHelper
+
+
+def _telemetry():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return TelemetryHelper("test", tracer_provider=provider), exporter
+
+
+def test_call_attributes_are_added_to_the_span():
+    telemetry, exporter = _telemetry()
+
+    @telemetry.traced("Forecast", attributes_from=lambda days: {"forecast.days": days})
+    def forecast(days):
+        return days * 2
+
+    assert forecast(3) == 6
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "business.Forecast"
+    assert span.attributes["forecast.days"] == 3
+
+
+def test_failing_attributes_callback_does_not_fail_the_call(capsys):
+    telemetry, exporter = _telemetry()
+
+    def broken(**kwargs):
+        return kwargs["missing"]
+
+    @telemetry.traced("Sync", attributes_from=broken)
+    def sync_call(days):
+        return days + 1
+
+    @telemetry.traced("Async", attributes_from=broken)
+    async def async_call(days):
+        return days + 2
+
+    assert sync_call(1) == 2
+    assert asyncio.run(async_call(1)) == 3
+    assert "Error computing attributes for span 'business.Sync'" in capsys.readouterr().err
+    spans = exporter.get_finished_spans()
+    assert [span.name for span in spans] == ["business.Sync", "business.Async"]
+    assert all(span.status.status_code is StatusCode.UNSET for span in spans)
+
+
+def test_exception_of_the_function_is_recorded():
+    telemetry, exporter = _telemetry()
+
+    @telemetry.traced
+    def fail():
+        raise ValueError("no forecast")
+
+    try:
+        fail()
+    except ValueError:
+        pass
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code is StatusCode.ERROR
+    assert span.events[0].name == "exception"
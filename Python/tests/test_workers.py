@@ -0,0 +1,160 @@
+"""Merged multi-worker metrics: totals across live, exited and compacted worker snapshots, and the scrape of live workers.
+
+Run from the ``Python`` directory::
+
+    python -m pytest tests/test_workers.py
+"""
+import multiprocessing
+import os
+
+import pytest
+
+from opentelemetry import metrics
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.observability.metrics_endpoint import ScrapeCache, metrics_registry
+from app.observability.workers import (
+    _LABEL_INVALID,
+    MultiprocessCollector,
+    WorkerSnapshotExporter,
+    _prometheus_name,
+    _prometheus_unit,
+    compact_multiprocess_dir,
+)
+
+
+def _worker(directory: str, requests: int):
+    # Shutting the reader down writes the final snapshot, as a worker does on exit
+    reader = PeriodicExportingMetricReader(WorkerSnapshotExporter(directory), export_interval_millis=60_000)
+    provider = MeterProvider(metric_readers=[reader])
+    meter = provider.get_meter("test")
+    counter = meter.create_counter("test.requests", unit="{request}")
+    duration = meter.create_histogram("test.duration", unit="ms")
+    for i in range(requests):
+        route = "/a" if i % 2 else "/b"
+        counter.add(1, {"route": route})
+        duration.record(i % 100, {"route": route})
+    provider.shutdown()
+
+
+def _run_workers(directory: str, *requests: int):
+    context = multiprocessing.get_context("fork")
+    for n in requests:
+        process = context.Process(target=_worker, args=(directory, n))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+
+def _totals(directory: str) -> dict:
+    totals = {}
+    for family in MultiprocessCollector(directory).collect():
+        for sample in family.samples:
+            if sample.name.endswith(("_total", "_count")):
+                key = (sample.name, sample.labels.get("route"))
+                totals[key] = totals.get(key, 0) + sample.value
+    return totals
+
+
+def test_counters_and_histograms_sum_over_exited_workers(tmp_path):
+    _run_workers(str(tmp_path), 10, 20, 31)
+
+    totals = _totals(str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 3
+    assert totals[("test_requests_total", "/a")] == 5 + 10 + 15
+    assert totals[("test_requests_total", "/b")] == 5 + 10 + 16
+    assert totals[("test_duration_milliseconds_count", "/a")] + totals[("test_duration_milliseconds_count", "/b")] == 61
+
+
+def test_compaction_keeps_totals(tmp_path):
+    directory = str(tmp_path)
+    _run_workers(directory, 10, 20)
+    before = _totals(directory)
+
+    compact_multiprocess_dir(directory)
+    assert os.listdir(directory) == ["metrics-exited.json"]
+    assert _totals(directory) == before
+
+    _run_workers(directory, 4)
+    compact_multiprocess_dir(directory)
+    assert os.listdir(directory) == ["metrics-exited.json"]
+    assert _totals(directory)[("test_requests_total", "/a")] == before[("test_requests_total", "/a")] + 2
+
+
+def test_live_worker_snapshot_is_not_compacted(tmp_path):
+    directory = str(tmp_path)
+    _run_workers(directory, 6)
+    _worker(directory, 8)
+
+    compact_multiprocess_dir(directory)
+    assert sorted(os.listdir(directory))[0] == "metrics-exited.json"
+    assert len(os.listdir(directory)) == 2
+    assert _totals(directory)[("test_requests_total", "/b")] == 3 + 4
+
+
+def _live_worker(directory: str, requests: int, ready, stop):
+    reader = PeriodicExportingMetricReader(WorkerSnapshotExporter(directory), export_interval_millis=60_000)
+    provider = MeterProvider(metric_readers=[reader])
+    meter = provider.get_meter("test")
+    counter = meter.create_counter("test.requests", unit="{request}")
+    duration = meter.create_histogram("test.duration", unit="ms")
+    active = meter.create_up_down_counter("test.active", unit="{request}")
+    meter.create_observable_gauge("test.queue.depth", callbacks=[lambda options: [metrics.Observation(requests)]])
+    for i in range(requests):
+        route = "/a" if i % 2 else "/b"
+        counter.add(1, {"http.route": route})
+        duration.record(i % 100, {"http.route": route})
+    active.add(requests)
+    reader.force_flush()
+    ready.set()
+    stop.wait(10.0)
+    provider.shutdown()
+
+
+def test_scrape_merges_live_workers(monkeypatch, tmp_path):
+    context = multiprocessing.get_context("fork")
+    stop = context.Event()
+    workers = []
+    for n in (10, 20):
+        ready = context.Event()
+        process = context.Process(target=_live_worker, args=(str(tmp_path), n, ready, stop))
+        process.start()
+        workers.append((process, ready))
+    try:
+        for _, ready in workers:
+            assert ready.wait(10.0)
+        monkeypatch.setenv("METRICS_MULTIPROCESS_DIR", str(tmp_path))
+        body = ScrapeCache(metrics_registry(), ttl_seconds=0).body()
+    finally:
+        stop.set()
+        for process, _ in workers:
+            process.join(10.0)
+
+    samples = {}
+    for family in text_string_to_metric_families(body.decode()):
+        for sample in family.samples:
+            samples.setdefault(sample.name, []).append(sample)
+
+    def total(name, **labels):
+        return sum(s.value for s in samples[name] if all(s.labels.get(k) == v for k, v in labels.items()))
+
+    assert total("test_requests_total", http_route="/a") == 5 + 10
+    assert total("test_requests_total", http_route="/b") == 5 + 10
+    assert total("test_duration_milliseconds_count") == 30
+    assert total("test_duration_milliseconds_bucket", le="+Inf") == 30
+    assert total("test_active") == 30
+    # Gauges are reported per live worker
+    assert sorted((s.labels["pid"], s.value) for s in samples["test_queue_depth"]) == sorted(
+        (str(process.pid), float(n)) for (process, _), n in zip(workers, (10, 20))
+    )
+
+
+def test_names_and_units_match_the_prometheus_exporter():
+    mapping = pytest.importorskip("opentelemetry.exporter.prometheus._mapping")
+    for name in ("http.server.request.duration", "1st.metric", "a:b.c-d", "log.queue.size"):
+        assert _prometheus_name(name) == mapping.sanitize_full_name(name)
+        assert _prometheus_name(name, _LABEL_INVALID) == mapping.sanitize_attribute(name)
+    for unit in ("ms", "s", "By", "1", "%", "{request}", "m/s", "By/s", "{event}/s", "/s", "x/", "kB", ""):
+        assert _prometheus_unit(unit) == mapping.map_unit(unit)